@@ -2,30 +2,65 @@
 high level Api
 """
 import asyncio
+import contextlib
 import datetime as dt
 import logging
+import time
+from collections import defaultdict
+from collections import deque
+from itertools import cycle
 from itertools import product
+from typing import AsyncIterator
+from typing import Deque
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Sequence
+from typing import Set
 from typing import Tuple
+from typing import Union
 
+import numpy as np
 import pandas as pd
 
+from .bars import BarAggregator
+from .base_request import RequestBase
+from .cache import NegativeCache
+from .cache import ReferenceDataCache
 from .enums import ErrorBehaviour
+from .enums import OverflowPolicy
 from .enums import SecurityIdType
+from .enums import SlowConsumerPolicy
 from .errors import BloombergErrors
 from .handlers import RequestHandler
 from .handlers import SubscriptionHandler
+from .identifiers import ID_FIELDS
+from .identifiers import SecurityIdMap
 from .instruments_requests import CurveLookupRequest
 from .instruments_requests import GovernmentLookupRequest
 from .instruments_requests import SecurityLookupRequest
+from .market_data import Tick
+from .market_data import TickConsumer
+from .market_data import TickStream
+from .metrics import BloombergMetrics
+from .monitor import Monitor
+from .parser import BAR_DTYPES
+from .parser import TICK_DTYPES
+from .parser import to_naive_utc
+from .profiling import RequestProfiler
+from .recording import TickRecorder
 from .requests import FieldSearchRequest
 from .requests import HistoricalDataRequest
+from .requests import IntradayBarRequest
+from .requests import IntradayTickRequest
 from .requests import ReferenceDataRequest
 from .requests import Subscription
 from .utils import log
+from .utils.exc import BloombergException
+from .utils.hash_ring import ConsistentHashRing
+from .utils.misc import get_securities_and_fields
 from .utils.misc import split_into_chunks
+from .utils.misc import split_time_range
 
 # pylint: disable=ungrouped-imports
 try:
@@ -36,9 +71,64 @@ except ImportError:
 LOGGER = log.get_logger()
 
 
+def merge_results(
+        result_df: pd.DataFrame,
+        requests_result: List[Tuple[pd.DataFrame, BloombergErrors]],
+        ) -> BloombergErrors:
+    """
+    Put data of all requests into `result_df` and return all their errors
+    """
+    errors = BloombergErrors()
+
+    for data, error in requests_result:
+        result_df.loc[data.index, data.columns] = data
+        errors += error
+
+    return errors
+
+
+def merge_intraday_data(
+        data: List[Tuple[str, pd.DataFrame]],
+        dtypes: Dict[str, Union[str, type]],
+        ) -> pd.DataFrame:
+    """
+    Put (security, time-indexed frame) pairs into one frame with
+    (security, time) index; columns are concatenated as arrays, so their
+    types are kept. Frames of one security must follow each other
+    """
+    if not data:
+        return pd.DataFrame(
+            {column: np.empty(0, dtype)
+             for column, dtype in dtypes.items()
+             if column != 'time'},
+            index=pd.MultiIndex.from_arrays([[], []],
+                                            names=['security', 'time']))
+
+    securities = [security for security, _ in data]
+    frames = [frame for _, frame in data]
+
+    counts = [len(frame) for frame in frames]
+    index = pd.MultiIndex.from_arrays(
+        [np.repeat(securities, counts),
+         np.concatenate([frame.index.values for frame in frames])],
+        names=['security', 'time'])
+
+    return pd.DataFrame({column: np.concatenate([frame[column].values
+                                                 for frame in frames])
+                         for column in frames[0].columns},
+                        index=index)
+
+
 class AsyncBloomberg:
     """
     Async wrapper of blpapi
+
+    If `metrics` are provided, all sessions report their metrics there;
+    use `PrometheusEndpoint` or other `MetricsSink` to export them.
+    If `monitor` is provided, it watches loop lag, time spent in Bloomberg
+    callbacks and request queues (see `Monitor`). If `profiler` is
+    provided, parsing and assembly of all requests are profiled
+    (see `RequestProfiler`)
     """
 
     # pylint: disable=too-many-arguments
@@ -51,6 +141,15 @@ class AsyncBloomberg:
                  max_sessions: int = 5,
                  max_securities_per_request: int = 100,
                  max_fields_per_request: int = 50,
+                 max_subscription_sessions: int = 1,
+                 id_map: Optional[SecurityIdMap] = None,
+                 negative_cache: Optional[NegativeCache] = None,
+                 reference_cache: Optional[ReferenceDataCache] = None,
+                 slow_consumer_policy: SlowConsumerPolicy =
+                 SlowConsumerPolicy.CONFLATE,
+                 metrics: Optional[BloombergMetrics] = None,
+                 monitor: Optional[Monitor] = None,
+                 profiler: Optional[RequestProfiler] = None,
                  ):
         try:
             self._loop = loop or asyncio.get_running_loop()
@@ -62,13 +161,37 @@ class AsyncBloomberg:
         self._max_securities_per_request = max_securities_per_request
         self._max_sessions = max_sessions
         self._error_behaviour = error_behaviour
+        self._id_map = id_map
+        self._negative_cache = negative_cache
+        self._reference_cache = reference_cache
+        self._slow_consumer_policy = slow_consumer_policy
+        self._metrics = metrics
+        self._monitor = monitor
+        self._profiler = profiler
 
         self._session_options = blpapi.SessionOptions()
         self._session_options.setServerHost(host)
         self._session_options.setServerPort(port)
 
         self._request_handlers: List[RequestHandler] = []
-        self._subscription_handler: Optional[SubscriptionHandler] = None
+        # subscriptions are distributed between sessions using
+        # consistent hashing of security ids
+        self._subscription_handlers: Dict[int, SubscriptionHandler] = {}
+        self._subscription_ring = ConsistentHashRing(
+            range(max_subscription_sessions))
+
+        # {subscription returned by `subscribe`: [(shard, part)]}; the
+        # subscription is its only part until sessions are added or removed
+        # and some of its securities are moved to other sessions
+        self._subscription_parts: Dict[Subscription,
+                                       List[Tuple[int, Subscription]]] = {}
+
+        # {tick consumer: is raw} of consumers that are added to all
+        # subscription handlers
+        self._tick_consumers: Dict[TickConsumer, bool] = {}
+
+        # tasks that are run in background, e.g. cache refresh
+        self._background_tasks: Set[asyncio.Task] = set()
 
         log.set_logger(log_level)
 
@@ -83,20 +206,29 @@ class AsyncBloomberg:
         This method waits for all handlers to successfully
         stop their sessions.
         """
+        for task in self._background_tasks:
+            task.cancel()
+
+        for consumer in self._tick_consumers:
+            if isinstance(consumer, TickRecorder):
+                consumer.close()
+
         for handler in self._request_handlers:
             handler.stop_session()
 
-        if self._subscription_handler:
-            self._subscription_handler.stop_session()
-            all_events = [self._subscription_handler.session_stopped.wait()]
-        else:  # pragma: no cover
-            all_events = []
+        all_events = []
+        for handler in self._subscription_handlers.values():
+            handler.stop_session()
+            all_events.append(handler.session_stopped.wait())
 
         all_events.extend(handler.session_stopped.wait()
                           for handler in self._request_handlers)
 
         await asyncio.gather(*all_events)
 
+        if self._id_map is not None and self._id_map.path is not None:
+            self._id_map.save()
+
     async def get_reference_data(
             self,
             securities: List[str],
@@ -106,8 +238,197 @@ class AsyncBloomberg:
             ) -> Tuple[pd.DataFrame, BloombergErrors]:
         """
         Return reference data from Bloomberg
+
+        If `reference_cache` was provided, fresh cached values are returned
+        without requests to Bloomberg; stale values are either returned
+        immediately and refreshed in background or requested again,
+        depending on the cache mode
         """
-        chunks = self._split_requests(securities, fields)
+        if self._reference_cache is None:
+            return await self._request_reference_data(securities,
+                                                      fields,
+                                                      security_id_type,
+                                                      overrides)
+
+        data, stale, missing = self._reference_cache.get(securities,
+                                                         fields,
+                                                         security_id_type,
+                                                         overrides)
+        errors = BloombergErrors()
+
+        if stale:
+            self._refresh_reference_data(stale, security_id_type, overrides)
+
+        if missing:
+            missing_securities, missing_fields = get_securities_and_fields(
+                missing)
+
+            missing_data, errors = await self._request_reference_data(
+                missing_securities,
+                missing_fields,
+                security_id_type,
+                overrides)
+
+            self._reference_cache.update(missing_data,
+                                         errors,
+                                         security_id_type,
+                                         overrides)
+
+            data.loc[missing_data.index, missing_data.columns] = missing_data
+
+        return data, errors
+
+    def _refresh_reference_data(
+            self,
+            pairs: List[Tuple[str, str]],
+            security_id_type: Optional[SecurityIdType] = None,
+            overrides=None):
+        """
+        Request given (security, field) pairs in background and update
+        reference cache. Pairs that are already being refreshed are skipped
+        """
+        pairs = self._reference_cache.start_refresh(pairs,
+                                                    security_id_type,
+                                                    overrides)
+        if not pairs:
+            return
+
+        async def refresh():
+            securities, fields = get_securities_and_fields(pairs)
+
+            try:
+                data, errors = await self._request_reference_data(
+                    securities,
+                    fields,
+                    security_id_type,
+                    overrides)
+
+                self._reference_cache.update(data,
+                                             errors,
+                                             security_id_type,
+                                             overrides)
+            except Exception as exception:  # pylint: disable=broad-except
+                LOGGER.error('%s: failed to refresh reference data: %s',
+                             self.__class__.__name__,
+                             exception)
+            finally:
+                self._reference_cache.finish_refresh(pairs,
+                                                     security_id_type,
+                                                     overrides)
+
+        task = asyncio.create_task(refresh())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _request_reference_data(
+            self,
+            securities: List[str],
+            fields: List[str],
+            security_id_type: Optional[SecurityIdType] = None,
+            overrides=None,
+            ) -> Tuple[pd.DataFrame, BloombergErrors]:
+        """
+        Request reference data from Bloomberg
+
+        If `id_map` was provided, securities are requested using their
+        preferred identifiers (if known) and the map is updated with all
+        identifiers found in the response
+        """
+        if self._id_map is None:
+            return await self._get_reference_data(securities,
+                                                  fields,
+                                                  security_id_type,
+                                                  overrides)
+
+        query_ids = self._id_map.rewrite(securities, security_id_type)
+        unique_query_ids = list(dict.fromkeys(query_ids.values()))
+        original_ids = {query_id: security
+                        for security, query_id in query_ids.items()}
+
+        try:
+            data, errors = await self._get_reference_data(unique_query_ids,
+                                                          fields,
+                                                          None,
+                                                          overrides)
+        except BloombergException as exception:
+            if exception.args and isinstance(exception.args[0],
+                                             BloombergErrors):
+                raise BloombergException(exception.args[0].rename_securities(
+                    original_ids)) from exception
+            raise
+
+        data = data.loc[[query_ids[security] for security in securities]]
+        data.index = securities
+        errors = errors.rename_securities(original_ids)
+
+        self._id_map.update_from_frame(data, security_id_type)
+
+        return data, errors
+
+    async def translate_securities(
+            self,
+            securities: List[str],
+            from_type: SecurityIdType,
+            to_type: SecurityIdType,
+            ) -> Dict[str, Optional[str]]:
+        """
+        Translate security ids of `from_type` into ids of `to_type`.
+        Bloomberg is asked only about securities that are not in `id_map`
+        yet; all known id fields are requested at once, so that subsequent
+        translations into other types don't need requests at all.
+
+        Return {security: translated id}, translated id is None if
+        Bloomberg doesn't know the security
+        """
+        if self._id_map is None:
+            raise RuntimeError('Please provide `id_map` to translate '
+                               'securities')
+
+        missing = [security
+                   for security in securities
+                   if self._id_map.get(security, to_type, from_type) is None]
+
+        if missing:
+            await self.get_reference_data(missing,
+                                          list(ID_FIELDS.values()),
+                                          from_type)
+
+        return {security: self._id_map.get(security, to_type, from_type)
+                for security in securities}
+
+    async def _get_reference_data(
+            self,
+            securities: List[str],
+            fields: List[str],
+            security_id_type: Optional[SecurityIdType] = None,
+            overrides=None,
+            ) -> Tuple[pd.DataFrame, BloombergErrors]:
+        """
+        Split reference data request into chunks, send them and merge
+        the results.
+
+        If `negative_cache` was provided, known invalid securities and fields
+        are not sent to Bloomberg; their errors are taken from the cache
+        """
+        error_behaviour = self._error_behaviour
+        query_securities, query_fields = securities, fields
+        cached_errors = BloombergErrors()
+
+        if self._negative_cache is not None:
+            query_securities, query_fields, cached_errors = \
+                self._negative_cache.filter(securities,
+                                            fields,
+                                            security_id_type)
+
+            if error_behaviour == ErrorBehaviour.RAISE and cached_errors:
+                raise BloombergException(cached_errors)
+
+            # errors are required to fill the cache even if user ignores
+            # them; if user wants them raised, they are raised after
+            # the cache is filled
+            error_behaviour = ErrorBehaviour.RETURN
+
+        chunks = self._split_requests(query_securities, query_fields)
         request_tasks = []
 
         for security_chunk, fields_chunk in chunks:
@@ -117,19 +438,27 @@ class AsyncBloomberg:
                                            fields_chunk,
                                            security_id_type,
                                            overrides,
-                                           self._error_behaviour,
+                                           error_behaviour,
                                            self._loop)
 
-            request_tasks.append(asyncio.create_task(request.process()))
+            request_tasks.append(asyncio.create_task(self._process(request)))
             asyncio.create_task(handler.send_requests([request]))
 
         requests_result = await asyncio.gather(*request_tasks)
-        result_df = pd.DataFrame(index=securities, columns=fields)
-        errors = BloombergErrors()
 
-        for data, error in requests_result:
-            result_df.loc[data.index, data.columns] = data
-            errors += error
+        with self._profile_assembly(ReferenceDataRequest):
+            result_df = pd.DataFrame(index=securities, columns=fields)
+            errors = merge_results(result_df, requests_result)
+
+        if self._negative_cache is not None:
+            self._negative_cache.add(errors, security_id_type)
+            errors += cached_errors
+
+            if self._error_behaviour == ErrorBehaviour.RAISE and errors:
+                raise BloombergException(errors)
+
+        if self._error_behaviour == ErrorBehaviour.IGNORE:
+            errors = BloombergErrors()
 
         return result_df, errors
 
@@ -149,7 +478,7 @@ class AsyncBloomberg:
 
         asyncio.create_task(handler.send_requests([request]))
 
-        requests_result = await request.process()
+        requests_result = await self._process(request)
 
         data, _ = requests_result
 
@@ -183,59 +512,488 @@ class AsyncBloomberg:
                                             self._error_behaviour,
                                             self._loop)
 
-            tasks.append(asyncio.create_task(request.process()))
+            tasks.append(asyncio.create_task(self._process(request)))
             asyncio.create_task(handler.send_requests([request]))
 
         requests_result = await asyncio.gather(*tasks)
 
-        all_dates = pd.date_range(start_date, end_date)
-        index = pd.MultiIndex.from_product([all_dates, securities],
-                                           names=['date', 'security'])
+        with self._profile_assembly(HistoricalDataRequest):
+            all_dates = pd.date_range(start_date, end_date)
+            index = pd.MultiIndex.from_product([all_dates, securities],
+                                               names=['date', 'security'])
+
+            result_df = pd.DataFrame(index=index,
+                                     columns=fields)
+            errors = merge_results(result_df, requests_result)
+
+        return result_df, errors
+
+    async def get_intraday_bars(
+            self,
+            securities: List[str],
+            start_datetime: dt.datetime,
+            end_datetime: dt.datetime,
+            interval: int = 1,
+            event_type: str = 'TRADE',
+            security_id_type: Optional[SecurityIdType] = None,
+            options: Optional[Dict] = None,
+            ) -> Tuple[pd.DataFrame, BloombergErrors]:
+        """
+        Return intraday bars from Bloomberg: open, high, low, close,
+        volume and numEvents of every `interval` minutes; datetimes are
+        in UTC.
+
+        Bloomberg accepts one security per request, so requests of all
+        securities are sent in parallel. Result has (security, time)
+        index; securities without bars are missing, invalid securities
+        are reported according to `error_behaviour`
+        """
+        tasks = []
 
-        result_df = pd.DataFrame(index=index,
-                                 columns=fields)
+        for security in securities:
+            handler = self._choose_handler()
+
+            request = IntradayBarRequest(security,
+                                         start_datetime,
+                                         end_datetime,
+                                         interval,
+                                         event_type,
+                                         security_id_type,
+                                         options,
+                                         self._error_behaviour,
+                                         self._loop)
+
+            tasks.append(asyncio.create_task(self._process(request)))
+            asyncio.create_task(handler.send_requests([request]))
+
+        requests_result = await asyncio.gather(*tasks)
+
+        with self._profile_assembly(IntradayBarRequest):
+            result_df = merge_intraday_data(
+                [(security, data)
+                 for security, (data, _) in zip(securities, requests_result)],
+                BAR_DTYPES)
+
+        errors = BloombergErrors()
+        for _, error in requests_result:
+            errors += error
+
+        return result_df, errors
+
+    async def get_intraday_ticks(
+            self,
+            securities: List[str],
+            start_datetime: dt.datetime,
+            end_datetime: dt.datetime,
+            event_types: Sequence[str] = ('TRADE',),
+            window: dt.timedelta = dt.timedelta(hours=1),
+            parallel_windows: Optional[int] = None,
+            security_id_type: Optional[SecurityIdType] = None,
+            options: Optional[Dict] = None,
+            ) -> Tuple[pd.DataFrame, BloombergErrors]:
+        """
+        Return intraday ticks from Bloomberg: type, value and size of every
+        event of `event_types`; datetimes are in UTC.
+
+        Result has (security, time) index and is built from the windows
+        returned by `stream_intraday_ticks`; securities without ticks are
+        missing, errors of all windows are merged
+        """
+        data = []
         errors = BloombergErrors()
 
-        for data, error in requests_result:
-            result_df.loc[data.index, data.columns] = data
-            errors += BloombergErrors()
+        async for security, ticks, window_errors in self.stream_intraday_ticks(
+                securities,
+                start_datetime,
+                end_datetime,
+                event_types,
+                window,
+                parallel_windows,
+                security_id_type,
+                options):
+            data.append((security, ticks))
+            errors += window_errors
+
+        with self._profile_assembly(IntradayTickRequest):
+            result_df = merge_intraday_data(data, TICK_DTYPES)
 
         return result_df, errors
 
+    async def stream_intraday_ticks(
+            self,
+            securities: List[str],
+            start_datetime: dt.datetime,
+            end_datetime: dt.datetime,
+            event_types: Sequence[str] = ('TRADE',),
+            window: dt.timedelta = dt.timedelta(hours=1),
+            parallel_windows: Optional[int] = None,
+            security_id_type: Optional[SecurityIdType] = None,
+            options: Optional[Dict] = None,
+            ) -> AsyncIterator[Tuple[str, pd.DataFrame, BloombergErrors]]:
+        """
+        Return intraday ticks of every security split into time windows
+        of size `window`:
+
+            stream = bloomberg.stream_intraday_ticks(
+                securities, start, end, window=dt.timedelta(minutes=30))
+            async for security, ticks, errors in stream:
+                print(security, len(ticks))
+
+        Every window is a separate IntradayTickRequest; up to
+        `parallel_windows` requests (`max_sessions` by default) are sent
+        at the same time and distributed between sessions round-robin.
+        Windows are returned in order: all windows of the first security,
+        then of the second one and so on; windows without ticks and errors
+        are skipped. Errors of every window are returned or raised
+        according to `error_behaviour`
+        """
+        parallel_windows = parallel_windows or self._max_sessions
+
+        requests = (
+            IntradayTickRequest(security,
+                                window_start,
+                                window_end,
+                                event_types,
+                                security_id_type,
+                                options,
+                                self._error_behaviour,
+                                self._loop)
+            for security in securities
+            for window_start, window_end in split_time_range(start_datetime,
+                                                             end_datetime,
+                                                             window)
+            )
+        handlers = cycle(self._choose_handlers(parallel_windows))
+
+        # (request, its handler, process task, send task)
+        pending: Deque[Tuple[IntradayTickRequest,
+                             RequestHandler,
+                             asyncio.Task,
+                             asyncio.Task]] = deque()
+
+        def send_next_request():
+            request = next(requests, None)
+            if request is None:
+                return
+
+            handler = next(handlers)
+            pending.append((
+                request,
+                handler,
+                asyncio.create_task(self._process(request)),
+                asyncio.create_task(handler.send_requests([request])),
+                ))
+
+        for _ in range(parallel_windows):
+            send_next_request()
+
+        try:
+            while pending:
+                request, _, process_task, _ = pending[0]
+                data, errors = await process_task
+                pending.popleft()
+                send_next_request()
+
+                # Bloomberg includes ticks at endDateTime, they belong
+                # to the next window
+                if request.end_datetime < end_datetime:
+                    data = data[data.index
+                                < to_naive_utc(request.end_datetime)]
+
+                if not data.empty or errors:
+                    yield request.security, data, errors
+        finally:
+            for request, handler, process_task, send_task in pending:
+                process_task.cancel()
+                send_task.cancel()
+                handler.cancel_requests([request])
+
     async def subscribe(
             self,
             securities: List[str],
             fields: List[str],
             security_id_type: Optional[SecurityIdType] = None,
             overrides=None,
-            ) -> None:
+            interval: Optional[float] = None,
+            options: Optional[Union[List[str], Dict[str, str]]] = None,
+            conflation_interval: Optional[float] = None,
+            history_size: int = 0,
+            priority: int = 0,
+            delta: bool = False,
+            ) -> List[Subscription]:
         """
         Subscribe to receive periodical updates from Bloomberg
+
+        `interval` and `options` are sent to Bloomberg, e.g. `interval=1`
+        means that Bloomberg sends not more than one update per second.
+        `conflation_interval` is applied on the client side: all updates
+        received within this interval are merged into one tick before
+        they are sent to tick streams.
+
+        If `history_size` is positive, the last `history_size` values of
+        every numeric field are kept (see `read_tick_history`)
+
+        Securities are distributed between `max_subscription_sessions`
+        sessions using consistent hashing; sessions can be added or removed
+        later (see `add_subscription_session`)
+
+        Subscriptions with negative `priority` are shed when the client is
+        slow and `slow_consumer_policy` is SHED
+
+        If `delta` is True, tick streams receive only changed fields
+
+        Return created subscriptions; they can be passed to `unsubscribe`
+        and `modify_subscription`
         """
 
-        subscription = Subscription(securities,
-                                    fields,
-                                    security_id_type,
-                                    overrides,
-                                    self._error_behaviour,
-                                    self._loop)
+        shards = defaultdict(list)
+        for security in securities:
+            shards[self._get_shard(security, security_id_type)].append(
+                security)
+
+        subscriptions = []
+        all_subscriptions = []
+
+        for shard, shard_securities in shards.items():
+            subscription = Subscription(
+                shard_securities,
+                fields,
+                security_id_type,
+                overrides,
+                self._error_behaviour,
+                self._loop,
+                interval=interval,
+                options=options,
+                conflation_interval=conflation_interval,
+                history_size=history_size,
+                priority=priority,
+                delta=delta)
+
+            handler = self._get_subscription_handler(shard)
+            all_subscriptions.append(handler.subscribe([subscription]))
+            subscriptions.append(subscription)
+            self._subscription_parts[subscription] = [(shard, subscription)]
+
+        await asyncio.gather(*all_subscriptions)
+
+        return subscriptions
+
+    async def unsubscribe(self, subscriptions: List[Subscription]):
+        """
+        Cancel subscriptions returned by `subscribe`. Bloomberg topics that
+        are not used by other subscriptions are unsubscribed and the last
+        values of their securities are deleted
+        """
+        for shard, shard_subscriptions in self._group_by_shard(
+                subscriptions).items():
+            self._subscription_handlers[shard].unsubscribe(shard_subscriptions)
 
-        if self._subscription_handler is None:
-            self._subscription_handler = SubscriptionHandler(
-                self._session_options,
-                self._loop)
+        for subscription in subscriptions:
+            del self._subscription_parts[subscription]
 
-        await self._subscription_handler.subscribe([subscription])
+    async def modify_subscription(self,
+                                  subscriptions: List[Subscription],
+                                  fields: List[str]):
+        """
+        Change fields of subscriptions returned by `subscribe`
+        """
+        all_modifications = []
+
+        for shard, shard_subscriptions in self._group_by_shard(
+                subscriptions).items():
+            handler = self._subscription_handlers[shard]
+
+            all_modifications.extend(
+                handler.modify_subscription(subscription, fields)
+                for subscription in shard_subscriptions)
+
+        await asyncio.gather(*all_modifications)
+
+        # parts are modified by handlers, subscriptions returned
+        # by `subscribe` may be not subscribed themselves
+        for subscription in subscriptions:
+            subscription.fields = fields
+
+    async def add_subscription_session(self) -> int:
+        """
+        Add new subscription session and return its number. Securities
+        that now belong to the new session are unsubscribed from their
+        old sessions and subscribed in the new one; their last values and
+        history are started anew
+        """
+        shard = max(self._subscription_ring.nodes, default=-1) + 1
+
+        self._subscription_ring.add_node(shard)
+        await self._rebalance_subscriptions()
+
+        return shard
+
+    async def remove_subscription_session(self, shard: int):
+        """
+        Move securities of the given subscription session to the remaining
+        sessions and stop it
+        """
+        if shard not in self._subscription_ring.nodes:
+            raise ValueError(f'Unknown subscription session: {shard}')
+
+        if len(self._subscription_ring) == 1:
+            raise ValueError('The last subscription session can not '
+                             'be removed')
+
+        self._subscription_ring.remove_node(shard)
+        await self._rebalance_subscriptions()
+
+        handler = self._subscription_handlers.pop(shard, None)
+        if handler is not None:
+            handler.stop_session()
+            await handler.session_stopped.wait()
 
     async def read_subscriptions(self) -> pd.DataFrame:
         """
         Receive all currently available subscription data
         """
-        if self._subscription_handler is None:
+        if not self._subscription_handlers:
             raise RuntimeError('You have to subscribe before reading '
                                'subscription data')
 
-        return await self._subscription_handler.read_subscribers()
+        all_data = [await handler.read_subscribers()
+                    for handler in self._subscription_handlers.values()]
+
+        if len(all_data) == 1:
+            return all_data[0]
+
+        return pd.concat(all_data, sort=False)
+
+    def read_tick_history(
+            self,
+            security: str,
+            field: str,
+            size: Optional[int] = None,
+            ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return receive times and values of the last `size` ticks of the
+        given security and field; security must be subscribed with
+        positive `history_size`.
+
+        Returned arrays are views of the history buffer and are overwritten
+        when new ticks arrive; copy them if you need to keep them
+        """
+        handler = self._subscription_handlers.get(self._get_shard(security))
+
+        if handler is None:
+            raise RuntimeError('You have to subscribe before reading '
+                               'subscription data')
+
+        return handler.tick_history.window(security, field, size)
+
+    async def stream_subscriptions(
+            self,
+            securities: Optional[List[str]] = None,
+            fields: Optional[List[str]] = None,
+            maxsize: int = 10000,
+            overflow: OverflowPolicy = OverflowPolicy.CONFLATE,
+            ) -> AsyncIterator[Tick]:
+        """
+        Return ticks of the subscribed securities as soon as they are
+        received:
+
+            async for tick in bloomberg.stream_subscriptions():
+                print(tick.security, tick.values)
+
+        Only given `securities` and `fields` are returned if they are
+        provided. No more than `maxsize` ticks are kept for the consumer;
+        when this limit is reached, `overflow` policy is applied
+        """
+        if not self._subscription_handlers:
+            raise RuntimeError('You have to subscribe before reading '
+                               'subscription data')
+
+        stream = TickStream(securities, fields, maxsize, overflow, self._loop)
+        self._add_tick_consumer(stream)
+
+        try:
+            async for tick in stream:
+                yield tick
+        finally:
+            self._remove_tick_consumer(stream)
+            stream.close()
+
+    async def stream_bars(
+            self,
+            bar_size: float = 60,
+            securities: Optional[List[str]] = None,
+            price_field: str = 'LAST_PRICE',
+            size_field: str = 'SIZE_LAST_TRADE',
+            maxsize: int = 10000,
+            ) -> AsyncIterator[Tick]:
+        """
+        Return completed OHLCV bars of the subscribed securities:
+
+            async for bar in bloomberg.stream_bars(bar_size=1):
+                print(bar.security, bar.time, bar.values['close'])
+
+        Each bar is a tick with `BAR_FIELDS` values and bar start time;
+        bars are built from `price_field` and `size_field` updates, so these
+        fields must be subscribed. If consumer doesn't keep up, the oldest
+        bars are dropped after `maxsize` bars
+        """
+        if not self._subscription_handlers:
+            raise RuntimeError('You have to subscribe before reading '
+                               'subscription data')
+
+        stream = TickStream(maxsize=maxsize,
+                            overflow=OverflowPolicy.DROP_OLDEST,
+                            loop=self._loop)
+        aggregator = BarAggregator(stream,
+                                   bar_size,
+                                   price_field,
+                                   size_field,
+                                   securities)
+
+        async def flush_bars():
+            while True:
+                now = time.time()
+                bar_end = now - now % bar_size + bar_size
+                await asyncio.sleep(bar_end - now)
+
+                # loop clock may wake up before wall clock reaches bar end
+                aggregator.flush(max(time.time(), bar_end))
+
+        # bars must include every trade, so the aggregator receives ticks
+        # before delta filtering and conflation
+        self._add_tick_consumer(aggregator, raw=True)
+        flush_task = asyncio.create_task(flush_bars())
+
+        try:
+            async for bar in stream:
+                yield bar
+        finally:
+            flush_task.cancel()
+            self._remove_tick_consumer(aggregator)
+            stream.close()
+
+    def start_recording(self,
+                        path: str,
+                        batch_size: int = 1000,
+                        max_file_size: int = 64 * 1024 * 1024,
+                        ) -> TickRecorder:
+        """
+        Start writing all subscription ticks to disk; recorded ticks can be
+        replayed later using `TickReplay`.
+
+        Ticks are recorded after client-side conflation
+        """
+        recorder = TickRecorder(path, batch_size, max_file_size)
+        self._add_tick_consumer(recorder)
+
+        return recorder
+
+    def stop_recording(self, recorder: TickRecorder):
+        """
+        Stop recording and write the remaining ticks to disk
+        """
+        self._remove_tick_consumer(recorder)
+        recorder.close()
 
     async def security_lookup(self,
                               query: str,
@@ -247,7 +1005,7 @@ class AsyncBloomberg:
         request = SecurityLookupRequest(query, max_results, options,
                                         self._error_behaviour, self._loop)
 
-        task = asyncio.create_task(request.process())
+        task = asyncio.create_task(self._process(request))
         asyncio.create_task(handler.send_requests([request]))
 
         return await task
@@ -262,7 +1020,7 @@ class AsyncBloomberg:
         request = CurveLookupRequest(query, max_results, options,
                                      self._error_behaviour, self._loop)
 
-        task = asyncio.create_task(request.process())
+        task = asyncio.create_task(self._process(request))
         asyncio.create_task(handler.send_requests([request]))
 
         return await task
@@ -277,11 +1035,50 @@ class AsyncBloomberg:
         request = GovernmentLookupRequest(query, max_results, options,
                                           self._error_behaviour, self._loop)
 
-        task = asyncio.create_task(request.process())
+        task = asyncio.create_task(self._process(request))
         asyncio.create_task(handler.send_requests([request]))
 
         return await task
 
+    def _process(self, request: RequestBase):
+        """
+        Return `request.process()`, profiled if profiler was provided
+        """
+        if self._profiler is None:
+            return request.process()
+
+        return self._profiler.wrap(request.__class__.__name__,
+                                   request.process())
+
+    def _profile_assembly(self, request_class):
+        if self._profiler is None:
+            return contextlib.nullcontext()
+
+        return self._profiler.profile(request_class.__name__)
+
+    def _create_request_handler(self) -> RequestHandler:
+        handler = RequestHandler(self._session_options,
+                                 self._loop,
+                                 self._metrics,
+                                 self._monitor)
+        self._request_handlers.append(handler)
+        return handler
+
+    def _choose_handlers(self, num_handlers: int) -> List[RequestHandler]:
+        """
+        Return up to `num_handlers` handlers with the smallest load,
+        creating new ones if `max_sessions` is not reached. Unlike
+        `_choose_handler`, it can be used to spread several requests that
+        are created at once, before any of them is sent
+        """
+        num_handlers = min(num_handlers, self._max_sessions)
+
+        while len(self._request_handlers) < num_handlers:
+            self._create_request_handler()
+
+        return sorted(self._request_handlers,
+                      key=lambda handler: handler.current_load)[:num_handlers]
+
     def _choose_handler(self) -> RequestHandler:
         """
         Return the most suitable handler to handle new request using
@@ -301,13 +1098,122 @@ class AsyncBloomberg:
             return free_handlers[0]
 
         if len(self._request_handlers) < self._max_sessions:
-            handler = RequestHandler(self._session_options, self._loop)
-            self._request_handlers.append(handler)
-            return handler
+            return self._create_request_handler()
 
         return min([handler for handler in self._request_handlers],
                    key=lambda handler: handler.current_load)
 
+    def _get_shard(self,
+                   security: str,
+                   security_id_type: Optional[SecurityIdType] = None) -> int:
+        """
+        Return number of the subscription session that the given security
+        belongs to
+        """
+        if security_id_type is not None:
+            security = security_id_type.add_type(security)
+
+        return self._subscription_ring.get_node(security)
+
+    def _group_by_shard(
+            self,
+            subscriptions: List[Subscription],
+            ) -> Dict[int, List[Subscription]]:
+        """
+        All securities of the subscription created by `subscribe` belong
+        to the same shard
+        """
+        shards = defaultdict(list)
+
+        for subscription in subscriptions:
+            parts = self._subscription_parts.get(subscription)
+
+            if parts is None:
+                raise RuntimeError('Subscription was not created by this '
+                                   'AsyncBloomberg instance')
+
+            for shard, part in parts:
+                shards[shard].append(part)
+
+        return shards
+
+    async def _rebalance_subscriptions(self):
+        """
+        Move securities whose shard was changed by adding or removing
+        a subscription session. Each moved part is split by new shards;
+        new parts are subscribed before the old part is unsubscribed, so
+        securities that stay in the same session share their topics and
+        are not resubscribed in Bloomberg
+        """
+        old_parts = defaultdict(list)
+        new_parts = defaultdict(list)
+
+        for subscription, parts in self._subscription_parts.items():
+            rebalanced_parts = []
+
+            for shard, part in parts:
+                part_shards = defaultdict(list)
+                for security in part.securities:
+                    part_shards[self._get_shard(security)].append(security)
+
+                if list(part_shards) == [shard]:
+                    rebalanced_parts.append((shard, part))
+                    continue
+
+                old_parts[shard].append(part)
+
+                for new_shard, securities in part_shards.items():
+                    new_part = part.copy(securities)
+                    new_parts[new_shard].append(new_part)
+                    rebalanced_parts.append((new_shard, new_part))
+
+            parts[:] = rebalanced_parts
+
+        await asyncio.gather(*[
+            self._get_subscription_handler(shard).subscribe(shard_parts)
+            for shard, shard_parts in new_parts.items()])
+
+        for shard, shard_parts in old_parts.items():
+            self._subscription_handlers[shard].unsubscribe(shard_parts)
+
+        LOGGER.debug('%s: %s subscriptions moved between sessions',
+                     self.__class__.__name__,
+                     sum(map(len, old_parts.values())))
+
+    def _get_subscription_handler(self, shard: int) -> SubscriptionHandler:
+        """
+        Return subscription handler of the given shard; create new one if
+        it doesn't exist yet
+        """
+        handler = self._subscription_handlers.get(shard)
+
+        if handler is None:
+            handler = SubscriptionHandler(
+                self._session_options,
+                self._loop,
+                slow_consumer_policy=self._slow_consumer_policy,
+                metrics=self._metrics,
+                monitor=self._monitor)
+
+            for consumer, raw in self._tick_consumers.items():
+                handler.add_consumer(consumer, raw)
+
+            self._subscription_handlers[shard] = handler
+
+        return handler
+
+    def _add_tick_consumer(self, consumer: TickConsumer, raw: bool = False):
+        self._tick_consumers[consumer] = raw
+
+        for handler in self._subscription_handlers.values():
+            handler.add_consumer(consumer, raw)
+
+    def _remove_tick_consumer(self, consumer: TickConsumer):
+        del self._tick_consumers[consumer]
+
+        for handler in self._subscription_handlers.values():
+            handler.remove_consumer(consumer)
+
     def _split_requests(self,
                         securities: List[str],
                         fields: List[str]):
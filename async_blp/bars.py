@@ -0,0 +1,156 @@
+"""
+Real-time OHLCV bars built from subscription ticks
+"""
+import threading
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+
+import numpy as np
+
+from .market_data import Tick
+from .market_data import TickConsumer
+
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'num_events')
+
+
+class BarAggregator(TickConsumer):
+    """
+    Aggregates ticks of every security into bars of `bar_size` seconds.
+
+    Price is taken from `price_field` and volume from `size_field`; ticks
+    without price are ignored. Current bars are stored in preallocated
+    numpy arrays, one row per security, and are updated in place.
+
+    Completed bars are sent to `output` as ticks with `BAR_FIELDS` values
+    and bar start time as tick time. Bar is completed when the first tick
+    of the next bar arrives or when `flush` is called after the bar end
+    """
+
+    # pylint: disable=too-many-arguments, too-many-instance-attributes
+    def __init__(self,
+                 output: TickConsumer,
+                 bar_size: float = 60,
+                 price_field: str = 'LAST_PRICE',
+                 size_field: str = 'SIZE_LAST_TRADE',
+                 securities: Optional[Iterable[str]] = None,
+                 ):
+        if bar_size <= 0:
+            raise ValueError('bar_size must be positive')
+
+        self._output = output
+        self.bar_size = bar_size
+        self._price_field = price_field
+        self._size_field = size_field
+        self._securities = set(securities) if securities else None
+
+        self._lock = threading.Lock()
+
+        # {security: row}
+        self._rows: Dict[str, int] = {}
+
+        self._start = np.zeros(0, dtype=np.float64)
+        self._prices = np.zeros((0, 4), dtype=np.float64)  # OHLC
+        self._volume = np.zeros(0, dtype=np.float64)
+        self._num_events = np.zeros(0, dtype=np.int64)
+
+        self._resize(16)
+
+    def put(self, tick: Tick):
+        if self._securities is not None and \
+                tick.security not in self._securities:
+            return
+
+        price = tick.values.get(self._price_field)
+        if not isinstance(price, (int, float)):
+            return
+
+        size = tick.values.get(self._size_field, 0)
+        if not isinstance(size, (int, float)):
+            size = 0
+
+        bar_start = tick.time - tick.time % self.bar_size
+        completed_bar = None
+
+        with self._lock:
+            row = self._rows.get(tick.security)
+            if row is None:
+                row = self._add_security(tick.security)
+
+            if self._num_events[row] and self._start[row] != bar_start:
+                completed_bar = self._complete_bar(tick.security, row)
+
+            prices = self._prices[row]
+
+            if self._num_events[row]:
+                if price > prices[1]:
+                    prices[1] = price
+                if price < prices[2]:
+                    prices[2] = price
+                prices[3] = price
+                self._volume[row] += size
+                self._num_events[row] += 1
+            else:
+                self._start[row] = bar_start
+                prices[:] = price
+                self._volume[row] = size
+                self._num_events[row] = 1
+
+        if completed_bar is not None:
+            self._output.put(completed_bar)
+
+    def flush(self, now: float):
+        """
+        Send all bars that ended before `now`
+        """
+        with self._lock:
+            completed_bars = [self._complete_bar(security, row)
+                              for security, row in self._rows.items()
+                              if self._num_events[row]
+                              and self._start[row] + self.bar_size <= now]
+
+        for bar in completed_bars:
+            self._output.put(bar)
+
+    def _complete_bar(self, security: str, row: int) -> Tick:
+        """
+        Return bar as a tick and reset it; must be called under `self._lock`
+        """
+        open_, high, low, close = self._prices[row].tolist()
+        values = {
+            'open':       open_,
+            'high':       high,
+            'low':        low,
+            'close':      close,
+            'volume':     float(self._volume[row]),
+            'num_events': int(self._num_events[row]),
+            }
+
+        self._num_events[row] = 0
+        return Tick(security, values, float(self._start[row]))
+
+    def _add_security(self, security: str) -> int:
+        row = len(self._rows)
+        if row >= len(self._start):
+            self._resize(2 * len(self._start))
+
+        self._rows[security] = row
+        return row
+
+    def _resize(self, size: int):
+        old_size = len(self._start)
+
+        start = np.zeros(size, dtype=np.float64)
+        prices = np.zeros((size, 4), dtype=np.float64)
+        volume = np.zeros(size, dtype=np.float64)
+        num_events = np.zeros(size, dtype=np.int64)
+
+        start[:old_size] = self._start
+        prices[:old_size] = self._prices
+        volume[:old_size] = self._volume
+        num_events[:old_size] = self._num_events
+
+        self._start = start
+        self._prices = prices
+        self._volume = volume
+        self._num_events = num_events
@@ -3,6 +3,8 @@ abstract Handler for typing
 """
 
 import asyncio
+import time
+from collections import Counter
 from collections import defaultdict
 from typing import Callable
 from typing import Dict
@@ -11,8 +13,11 @@ from typing import Optional
 from typing import Union
 
 from .base_request import RequestBase
+from .metrics import BloombergMetrics
+from .monitor import Monitor
 from .utils import log
 from .utils.exc import BloombergException
+from .utils.log import TRACE
 
 # pylint: disable=ungrouped-imports
 try:
@@ -37,14 +42,30 @@ class HandlerBase:
         This method is called from Bloomberg session in a separate thread
         for each incoming event.
         """
-        LOGGER.debug('%s: event with type %s received',
-                     self.__class__.__name__,
-                     event.eventType())
-        self._method_map[event.eventType()](event)
+        if TRACE.enabled:
+            TRACE('%s: event with type %s received',
+                  self.__class__.__name__,
+                  event.eventType())
+
+        if self._metrics is not None:
+            self._metrics.on_event(self.metrics_name, event)
+
+        if self._monitor is None:
+            self._method_map[event.eventType()](event)
+            return
+
+        start_time = time.perf_counter()
+        try:
+            self._method_map[event.eventType()](event)
+        finally:
+            self._monitor.on_callback(event.eventType(),
+                                      time.perf_counter() - start_time)
 
     def __init__(self,
                  session_options: blpapi.SessionOptions,
-                 loop: asyncio.AbstractEventLoop = None):
+                 loop: asyncio.AbstractEventLoop = None,
+                 metrics: Optional[BloombergMetrics] = None,
+                 monitor: Optional[Monitor] = None):
 
         try:
             self._loop = loop or asyncio.get_running_loop()
@@ -56,12 +77,6 @@ class HandlerBase:
         self.session_started = asyncio.Event()
         self.session_stopped = asyncio.Event()
 
-        # Bloomberg session, each session get its own handler instance
-        self._session = blpapi.Session(options=session_options,
-                                       eventHandler=self)
-        self._session.startAsync()
-        LOGGER.debug('%s: session started', self.__class__.__name__)
-
         # requests that are currently in process
         self._current_requests: Dict[blpapi.CorrelationId, RequestBase] = {}
 
@@ -72,6 +87,9 @@ class HandlerBase:
                                                               loop=self._loop)
                                                           )
 
+        # when services were requested to open for the first time
+        self._service_open_times: Dict[str, float] = {}
+
         # each event type is processed by its own method
         # for event description see BLPAPI-Core-Developer-Guide, section 9.2
         self._method_map: Dict[int, Callable[[blpapi.Event], None]] = {
@@ -86,13 +104,33 @@ class HandlerBase:
             blpapi.Event.UNKNOWN:              self._raise_exception
             }
 
+        # number of received admin messages of every type
+        self.admin_events: Counter = Counter()
+
+        # True after SlowConsumerWarning or DataLoss until
+        # SlowConsumerWarningCleared is received
+        self.is_slow = False
+
+        self._metrics = metrics
+        self._monitor = monitor
+        self.metrics_name = (metrics.add_handler(self)
+                             if metrics is not None else None)
+
+        # Bloomberg session, each session get its own handler instance;
+        # session events can arrive right after the start, so it is
+        # started when everything else is ready
+        self._session = blpapi.Session(options=session_options,
+                                       eventHandler=self)
+        self._session.startAsync()
+        LOGGER.debug('%s: session started', self.__class__.__name__)
+
     def stop_session(self):  # pragma: no cover
         """
         Close all requests and begin the process to stop session.
         Application must wait for the `session_stopped` event to be set
         before deleting this handler, otherwise the main thread can hang forever
         """
-        self._close_requests(self._current_requests.keys())
+        self._close_requests(list(self._current_requests))
         self._session.stopAsync()
 
     def _close_requests(self, corr_ids: Iterable[blpapi.CorrelationId]):
@@ -127,6 +165,17 @@ class HandlerBase:
         if not service_event.is_set():
             self._session.openServiceAsync(service_name)
 
+            if service_name not in self._service_open_times:
+                start_time = time.monotonic()
+                self._service_open_times[service_name] = start_time
+                await service_event.wait()
+
+                if self._metrics is not None:
+                    self._metrics.service_open_time.observe(
+                        time.monotonic() - start_time,
+                        handler=self.metrics_name,
+                        service=service_name)
+
         # wait until ServiceOpened event is received
         await self._services[service_name].wait()
 
@@ -161,6 +210,11 @@ class HandlerBase:
 
         elif msg_name == 'SessionTerminated':
             LOGGER.debug('%s: session stopped', self.__class__.__name__)
+
+            if self._metrics is not None:
+                self._loop.call_soon_threadsafe(self._metrics.remove_handler,
+                                                self.metrics_name)
+
             self._loop.call_soon_threadsafe(self.session_stopped.set)
 
         elif msg_name in {'SessionConnectionUp',
@@ -198,7 +252,7 @@ class HandlerBase:
             # ServiceOpenedFailure
             self._raise_exception(msg)
 
-    def _admin_handler(self, event_):  # pragma: no cover
+    def _admin_handler(self, event_):
         """
         Process blpapi.Event.ADMIN events. This includes warnings about slow
         consumer and possible data loss
@@ -206,22 +260,30 @@ class HandlerBase:
 
         for msg in event_:
             msg_name = msg.asElement().name()
+            self.admin_events[msg_name] += 1
+
+            if self._metrics is not None:
+                self._metrics.admin_events.inc(handler=self.metrics_name,
+                                               message=msg_name)
 
             if msg_name == 'SlowConsumerWarning':
                 LOGGER.warning('%s: Client is slow.',
                                self.__class__.__name__)
                 LOGGER.debug(msg)
+                self._set_slow(True)
 
             elif msg_name == 'SlowConsumerWarningCleared':
                 LOGGER.warning('%s: Client is not slow anymore',
                                self.__class__.__name__)
                 LOGGER.debug(msg)
+                self._set_slow(False)
 
             elif msg_name == 'DataLoss':
                 LOGGER.warning('%s: some data have been lost due to event '
                                'queue overflowing',
                                self.__class__.__name__)
                 LOGGER.debug(msg)
+                self._set_slow(True)
 
             elif msg_name in ('RequestTemplateAvailable',
                               'RequestTemplatePending',
@@ -230,3 +292,26 @@ class HandlerBase:
 
             else:
                 self._raise_exception(msg)
+
+    def _set_slow(self, is_slow: bool):
+        if is_slow == self.is_slow:
+            return
+
+        self.is_slow = is_slow
+
+        if is_slow:
+            self._on_slow_consumer()
+        else:
+            self._on_slow_consumer_cleared()
+
+    def _on_slow_consumer(self):
+        """
+        Called from Bloomberg thread when the client becomes slow;
+        handlers can reduce their work here
+        """
+
+    def _on_slow_consumer_cleared(self):
+        """
+        Called from Bloomberg thread when the client is not slow anymore;
+        handlers should restore normal mode here
+        """
@@ -1,11 +1,18 @@
 import abc
 import asyncio
+import time
+from collections import deque
 from typing import Any
+from typing import Callable
+from typing import Deque
 from typing import Dict
 from typing import Optional
+from typing import Tuple
 
 from async_blp.enums import ErrorBehaviour
+from async_blp.enums import RequestStage
 from async_blp.utils import log
+from async_blp.utils.log import TRACE
 
 # pylint: disable=ungrouped-imports
 try:
@@ -15,11 +22,40 @@ except ImportError:
 
 LOGGER = log.get_logger()
 
+LifecycleCallback = Callable[['RequestBase', RequestStage, float], None]
+
+# called on every stage of every request; tuple is replaced on change,
+# so it can be safely iterated from Bloomberg thread
+_LIFECYCLE_CALLBACKS: Tuple[LifecycleCallback, ...] = ()
+
+
+def add_lifecycle_callback(callback: LifecycleCallback):
+    """
+    Call `callback(request, stage, timestamp)` when any request reaches
+    a new stage. Timestamps are `time.monotonic()` values.
+
+    Some stages are reached in Bloomberg thread, so callback must be
+    thread-safe and fast
+    """
+    global _LIFECYCLE_CALLBACKS  # pylint: disable=global-statement
+    _LIFECYCLE_CALLBACKS = _LIFECYCLE_CALLBACKS + (callback,)
+
+
+def remove_lifecycle_callback(callback: LifecycleCallback):
+    global _LIFECYCLE_CALLBACKS  # pylint: disable=global-statement
+    _LIFECYCLE_CALLBACKS = tuple(existing_callback
+                                 for existing_callback in _LIFECYCLE_CALLBACKS
+                                 if existing_callback is not callback)
+
 
 class RequestBase(metaclass=abc.ABCMeta):
     service_name = None
     request_name = None
 
+    # if True, messages with responseError are sent to the request before
+    # it is closed; single-security requests report invalid security so
+    receives_response_errors = False
+
     def __init__(self,
                  request_options: Dict[str, Any],
                  error_behavior: ErrorBehaviour = ErrorBehaviour.RETURN,
@@ -35,6 +71,66 @@ class RequestBase(metaclass=abc.ABCMeta):
         self._error_behaviour = error_behavior
         self._request_options = request_options or {}
 
+        # when messages that are still in the queue were received
+        self._enqueue_times: Deque[float] = deque()
+
+        # {stage: time.monotonic() when the stage was reached}
+        self.timestamps: Dict[RequestStage, float] = {}
+        self.mark(RequestStage.CREATED)
+
+    def mark(self, stage: RequestStage):
+        """
+        Remember when the request reached the given stage and notify
+        lifecycle callbacks; repeated stages are ignored
+        """
+        if stage in self.timestamps:
+            return
+
+        timestamp = time.monotonic()
+        self.timestamps[stage] = timestamp
+
+        for callback in _LIFECYCLE_CALLBACKS:
+            try:
+                callback(self, stage, timestamp)
+            except Exception as exception:  # pylint: disable=broad-except
+                LOGGER.error('%s: lifecycle callback failed: %s',
+                             self.__class__.__name__,
+                             exception)
+
+    @property
+    def is_processed(self) -> bool:
+        return RequestStage.PROCESSED in self.timestamps
+
+    @property
+    def queue_age(self) -> float:
+        """
+        How long the oldest message waits in the queue; 0 if it is empty
+        """
+        try:
+            return time.monotonic() - self._enqueue_times[0]
+        except IndexError:
+            return 0.
+
+    def get_stage_durations(self) -> Dict[RequestStage, float]:
+        """
+        Return how long it took to reach every stage from the previous
+        reached one, e.g. {SERVICE_READY: time spent opening service}
+        """
+        durations = {}
+        previous_time = None
+
+        for stage in RequestStage:
+            timestamp = self.timestamps.get(stage)
+            if timestamp is None:
+                continue
+
+            if previous_time is not None:
+                durations[stage] = timestamp - previous_time
+
+            previous_time = timestamp
+
+        return durations
+
     def send_queue_message(self, msg):
         """
         Thread-safe method that put the given msg into async queue
@@ -43,19 +139,26 @@ class RequestBase(metaclass=abc.ABCMeta):
             raise RuntimeError('Please create request inside async loop or set '
                                'loop explicitly if you want to use async')
 
+        self._enqueue_times.append(time.monotonic())
         self._loop.call_soon_threadsafe(self._msg_queue.put_nowait, msg)
-        LOGGER.debug('%s: message sent', self.__class__.__name__)
+
+        if TRACE.enabled:
+            TRACE('%s: message sent', self.__class__.__name__)
 
     async def _get_message_from_queue(self):
-        LOGGER.debug('%s: waiting for messages', self.__class__.__name__)
+        if TRACE.enabled:
+            TRACE('%s: waiting for messages', self.__class__.__name__)
+
         msg: blpapi.Message = await self._msg_queue.get()
+        if self._enqueue_times:
+            self._enqueue_times.popleft()
 
         if msg is None:
             LOGGER.debug('%s: last message received, processing is '
                          'finished',
                          self.__class__.__name__)
-
-        LOGGER.debug('%s: message received', self.__class__.__name__)
+        elif TRACE.enabled:
+            TRACE('%s: message received', self.__class__.__name__)
 
         return msg
 
@@ -70,6 +173,7 @@ class RequestBase(metaclass=abc.ABCMeta):
             raise RuntimeError('Current message queue is not empty')
 
         self._msg_queue = asyncio.Queue()
+        self._enqueue_times.clear()
         LOGGER.debug('%s: loop has been changed', self.__class__.__name__)
 
     def create(self, service: blpapi.Service) -> blpapi.Request:
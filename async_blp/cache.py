@@ -0,0 +1,318 @@
+"""
+Caches that allow to avoid sending the same requests to Bloomberg
+"""
+import time
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+import pandas as pd
+
+from .enums import SecurityIdType
+from .errors import BloombergErrors
+from .errors import ErrorType
+
+# these errors don't depend on the security, i.e. if field is not valid for
+# one security, it is not valid for all of them
+FIELD_ERRORS = (ErrorType.INVALID_FIELD,
+                ErrorType.INVALID_FIELD_HISTORICAL)
+
+
+def get_cache_key(security: str,
+                  security_id_type: Optional[SecurityIdType] = None) -> str:
+    """
+    Securities of different types are stored separately
+    """
+    if security_id_type is None:
+        return security
+
+    return security_id_type.add_type(security)
+
+
+class NegativeCache:
+    """
+    Remembers securities and fields that Bloomberg reported as invalid,
+    so that they are not requested again until `ttl` seconds pass.
+    """
+
+    def __init__(self, ttl: float = 24 * 60 * 60):
+        self._ttl = ttl
+
+        # {security: expiration time}
+        self._securities: Dict[str, float] = {}
+
+        # {field: (expiration time, error)}
+        self._fields: Dict[str, Tuple[float, str]] = {}
+
+        # {(security, field): (expiration time, error)}
+        self._security_fields: Dict[Tuple[str, str], Tuple[float, str]] = {}
+
+    def __len__(self):
+        return (len(self._securities)
+                + len(self._fields)
+                + len(self._security_fields))
+
+    def add(self,
+            errors: BloombergErrors,
+            security_id_type: Optional[SecurityIdType] = None):
+        """
+        Remember all errors reported by Bloomberg
+        """
+        expiration_time = time.monotonic() + self._ttl
+
+        for security in errors.invalid_securities:
+            key = get_cache_key(security, security_id_type)
+            self._securities[key] = expiration_time
+
+        for (security, field_name), error in errors.invalid_fields.items():
+            if error in FIELD_ERRORS:
+                self._fields[field_name] = (expiration_time, error)
+            else:
+                key = get_cache_key(security, security_id_type)
+                self._security_fields[(key, field_name)] = (expiration_time,
+                                                            error)
+
+    def filter(self,
+               securities: List[str],
+               fields: List[str],
+               security_id_type: Optional[SecurityIdType] = None,
+               ) -> Tuple[List[str], List[str], BloombergErrors]:
+        """
+        Remove known invalid securities and fields.
+
+        Field is removed if it is invalid for all remaining securities.
+        Return securities and fields that should be requested from Bloomberg
+        and errors for everything that was found in cache
+        """
+        now = time.monotonic()
+        errors = BloombergErrors()
+
+        valid_securities = []
+        for security in securities:
+            key = get_cache_key(security, security_id_type)
+
+            if self._is_expired(self._securities, key, now):
+                valid_securities.append(security)
+            else:
+                errors.invalid_securities.append(security)
+
+        valid_fields = []
+        for field_name in fields:
+            field_error = self._get_error(self._fields, field_name, now)
+
+            if field_error is not None:
+                errors.invalid_fields.update({
+                    (security, field_name): field_error
+                    for security in valid_securities
+                    })
+                continue
+
+            invalid_securities = 0
+            for security in valid_securities:
+                key = get_cache_key(security, security_id_type)
+                error = self._get_error(self._security_fields,
+                                        (key, field_name),
+                                        now)
+
+                if error is not None:
+                    errors.invalid_fields[(security, field_name)] = error
+                    invalid_securities += 1
+
+            if invalid_securities < len(valid_securities):
+                valid_fields.append(field_name)
+
+        return valid_securities, valid_fields, errors
+
+    @staticmethod
+    def _is_expired(cache: Dict, key, now: float) -> bool:
+        expiration_time = cache.get(key)
+
+        if expiration_time is None:
+            return True
+
+        if expiration_time <= now:
+            del cache[key]
+            return True
+
+        return False
+
+    @staticmethod
+    def _get_error(cache: Dict, key, now: float) -> Optional[str]:
+        try:
+            expiration_time, error = cache[key]
+        except KeyError:
+            return None
+
+        if expiration_time <= now:
+            del cache[key]
+            return None
+
+        return error
+
+
+def get_overrides_key(overrides: Optional[Dict]) -> Optional[str]:
+    """
+    Values requested with different overrides are stored separately
+    """
+    if not overrides:
+        return None
+
+    return repr(sorted(overrides.items()))
+
+
+class ReferenceDataCache:
+    """
+    Stores reference data values received from Bloomberg.
+
+    Values younger than `soft_ttl` seconds are fresh and are returned without
+    requests to Bloomberg. Values older than `hard_ttl` are not used at all.
+    Values in between are stale: if `stale_while_revalidate` is True, they are
+    returned immediately and refreshed in background, otherwise they are
+    requested again.
+    """
+
+    def __init__(self,
+                 soft_ttl: float = 60,
+                 hard_ttl: Optional[float] = None,
+                 stale_while_revalidate: bool = True,
+                 ):
+        if hard_ttl is not None and hard_ttl < soft_ttl:
+            raise ValueError('hard_ttl must be greater than soft_ttl')
+
+        self._soft_ttl = soft_ttl
+        self._hard_ttl = hard_ttl
+        self.stale_while_revalidate = stale_while_revalidate
+
+        # {(security, field, overrides): (update time, value)}
+        self._values: Dict[Tuple[str, str, Optional[str]],
+                           Tuple[float, Any]] = {}
+
+        # values that are being refreshed in background right now
+        self._refreshing: Set[Tuple[str, str, Optional[str]]] = set()
+
+    def __len__(self):
+        return len(self._values)
+
+    def get(self,
+            securities: List[str],
+            fields: List[str],
+            security_id_type: Optional[SecurityIdType] = None,
+            overrides: Optional[Dict] = None,
+            ) -> Tuple[pd.DataFrame,
+                       List[Tuple[str, str]],
+                       List[Tuple[str, str]]]:
+        """
+        Return data frame with all cached values, list of stale
+        (security, field) pairs and list of missing (security, field) pairs.
+
+        If `stale_while_revalidate` is False, stale pairs are returned
+        as missing ones
+        """
+        now = time.monotonic()
+        overrides_key = get_overrides_key(overrides)
+
+        data = pd.DataFrame(index=securities, columns=fields)
+        stale = []
+        missing = []
+
+        for security in securities:
+            security_key = get_cache_key(security, security_id_type)
+
+            for field_name in fields:
+                key = (security_key, field_name, overrides_key)
+
+                try:
+                    update_time, value = self._values[key]
+                except KeyError:
+                    missing.append((security, field_name))
+                    continue
+
+                age = now - update_time
+
+                if self._hard_ttl is not None and age >= self._hard_ttl:
+                    del self._values[key]
+                    missing.append((security, field_name))
+                    continue
+
+                if age >= self._soft_ttl:
+                    if not self.stale_while_revalidate:
+                        missing.append((security, field_name))
+                        continue
+
+                    stale.append((security, field_name))
+
+                data.at[security, field_name] = value
+
+        return data, stale, missing
+
+    def update(self,
+               data: pd.DataFrame,
+               errors: BloombergErrors,
+               security_id_type: Optional[SecurityIdType] = None,
+               overrides: Optional[Dict] = None):
+        """
+        Store all values received from Bloomberg except the invalid ones.
+        Missing (NaN) values are not stored, so they are requested again
+        """
+        now = time.monotonic()
+        overrides_key = get_overrides_key(overrides)
+        invalid_securities = set(errors.invalid_securities)
+
+        for security, row in data.iterrows():
+            if security in invalid_securities:
+                continue
+
+            security_key = get_cache_key(security, security_id_type)
+
+            for field_name, value in row.items():
+                if (security, field_name) in errors.invalid_fields:
+                    continue
+
+                key = (security_key, field_name, overrides_key)
+
+                if pd.api.types.is_scalar(value) and pd.isna(value):
+                    self._values.pop(key, None)
+                    continue
+
+                self._values[key] = (now, value)
+
+    def start_refresh(self,
+                      pairs: List[Tuple[str, str]],
+                      security_id_type: Optional[SecurityIdType] = None,
+                      overrides: Optional[Dict] = None,
+                      ) -> List[Tuple[str, str]]:
+        """
+        Mark given (security, field) pairs as being refreshed; return
+        only pairs that were not being refreshed yet
+        """
+        overrides_key = get_overrides_key(overrides)
+        new_pairs = []
+
+        for security, field_name in pairs:
+            key = (get_cache_key(security, security_id_type),
+                   field_name,
+                   overrides_key)
+
+            if key not in self._refreshing:
+                self._refreshing.add(key)
+                new_pairs.append((security, field_name))
+
+        return new_pairs
+
+    def finish_refresh(self,
+                       pairs: List[Tuple[str, str]],
+                       security_id_type: Optional[SecurityIdType] = None,
+                       overrides: Optional[Dict] = None):
+        """
+        Mark given (security, field) pairs as refreshed
+        """
+        overrides_key = get_overrides_key(overrides)
+
+        for security, field_name in pairs:
+            self._refreshing.discard((get_cache_key(security,
+                                                    security_id_type),
+                                      field_name,
+                                      overrides_key))
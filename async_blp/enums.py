@@ -14,7 +14,7 @@ class SecurityIdType(enum.Enum):
     BL_SECURITY_IDENTIFIER = '/bsid/'
     BL_SECURITY_SYMBOL = '/bsym/'
     BL_UNIQUE_IDENTIFIER = '/buid/'
-    BL_GLOBAL_IDENTIFIER = '/bbgid'
+    BL_GLOBAL_IDENTIFIER = '/bbgid/'
 
     def __str__(self):
         return self.value
@@ -37,3 +37,61 @@ class ErrorBehaviour(enum.Enum):
     RAISE = 'raise'
     RETURN = 'return'
     IGNORE = 'ignore'
+
+
+class OverflowPolicy(enum.Enum):
+    """
+    What to do when consumer's queue is full.
+
+    CONFLATE - merge new values into the queued tick of the same security;
+               if there is none, drop the oldest tick
+    DROP_OLDEST - drop the oldest tick
+    BLOCK - wait until consumer reads some ticks; this blocks Bloomberg
+            thread and may cause slow consumer warnings. Ticks that are
+            put inside the loop thread (e.g. delayed by conflation or
+            replayed) can't wait, so the oldest tick is dropped instead
+    """
+    CONFLATE = 'conflate'
+    DROP_OLDEST = 'drop_oldest'
+    BLOCK = 'block'
+
+
+class SlowConsumerPolicy(enum.Enum):
+    """
+    What to do when Bloomberg reports that the client is slow
+    (SlowConsumerWarning or DataLoss admin messages).
+
+    LOG - only log the warning
+    CONFLATE - conflate ticks of all subscriptions before sending them
+               to consumers
+    SHED - conflate ticks and skip ticks of low-priority subscriptions
+           without parsing them
+    Normal mode is restored on SlowConsumerWarningCleared
+    """
+    LOG = 'log'
+    CONFLATE = 'conflate'
+    SHED = 'shed'
+
+
+class RequestStage(enum.Enum):
+    """
+    Stages of request lifecycle in the order they happen.
+
+    CREATED - request object is created
+    DISPATCHED - request is passed to the handler
+    SESSION_READY - handler session is started
+    SERVICE_READY - required service is opened
+    SENT - request is sent to Bloomberg
+    FIRST_RESPONSE - the first response message is received
+    LAST_RESPONSE - the final response is received or request is closed
+                    because of error
+    PROCESSED - all messages are parsed and `process` returns the result
+    """
+    CREATED = 'created'
+    DISPATCHED = 'dispatched'
+    SESSION_READY = 'session_ready'
+    SERVICE_READY = 'service_ready'
+    SENT = 'sent'
+    FIRST_RESPONSE = 'first_response'
+    LAST_RESPONSE = 'last_response'
+    PROCESSED = 'processed'
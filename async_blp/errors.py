@@ -37,6 +37,9 @@ class BloombergErrors:
     # { (security, field) : error }
     invalid_fields: Dict[Tuple[str, str], str] = field(default_factory=dict)
 
+    def __bool__(self):
+        return bool(self.invalid_securities or self.invalid_fields)
+
     def get_errors_by_security(self,
                                security_id: str,
                                ) -> Union[ErrorType, Dict[str, ErrorType]]:
@@ -59,6 +62,19 @@ class BloombergErrors:
 
         return field_errors
 
+    def rename_securities(self,
+                          names: Dict[str, str]) -> 'BloombergErrors':
+        """
+        Return errors where securities are replaced according to
+        {security: new name}; securities without new names are kept
+        """
+        return BloombergErrors(
+            [names.get(security, security)
+             for security in self.invalid_securities],
+            {(names.get(security, security), field_name): error
+             for (security, field_name), error
+             in self.invalid_fields.items()})
+
     def __add__(self, other: 'BloombergErrors'):
         invalid_securities = list(set(self.invalid_securities
                                       + other.invalid_securities))
@@ -3,14 +3,34 @@ File contains handler for ReferenceDataRequest
 """
 
 import asyncio
+import time
 import uuid
+from collections import defaultdict
 from typing import Dict
+from typing import FrozenSet
+from typing import Iterable
 from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+import pandas as pd
 
 from .base_handler import HandlerBase
 from .base_request import RequestBase
+from .enums import RequestStage
+from .enums import SlowConsumerPolicy
+from .market_data import Conflator
+from .market_data import LastValueCache
+from .market_data import Tick
+from .market_data import TickConsumer
+from .market_data import TickHistory
+from .metrics import BloombergMetrics
+from .monitor import Monitor
+from .parser import parse_market_data
 from .requests import Subscription
 from .utils.blp_name import RESPONSE_ERROR
+from .utils.log import TRACE
 from .utils.log import get_logger
 
 # pylint: disable=ungrouped-imports
@@ -32,9 +52,11 @@ class RequestHandler(HandlerBase):
 
     def __init__(self,
                  session_options: blpapi.SessionOptions,
-                 loop: asyncio.AbstractEventLoop = None):
+                 loop: asyncio.AbstractEventLoop = None,
+                 metrics: Optional[BloombergMetrics] = None,
+                 monitor: Optional[Monitor] = None):
 
-        super().__init__(session_options, loop)
+        super().__init__(session_options, loop, metrics, monitor)
 
         local_methods = {
             blpapi.Event.RESPONSE:         self._response_handler,
@@ -54,20 +76,30 @@ class RequestHandler(HandlerBase):
         Wait until session is started and required service is opened,
         then send requests
         """
+        for request in requests:
+            request.mark(RequestStage.DISPATCHED)
+
+            if self._monitor is not None:
+                self._monitor.add_request(request)
+
         await self.session_started.wait()
 
         for request in requests:
+            request.mark(RequestStage.SESSION_READY)
             corr_id = blpapi.CorrelationId(uuid.uuid4())
             self._current_requests[corr_id] = request
 
             # wait until the necessary service is opened
             service = await self._get_service(request.service_name)
+            request.mark(RequestStage.SERVICE_READY)
 
             blp_request = request.create(service)
+            request.mark(RequestStage.SENT)
             self._session.sendRequest(blp_request, correlationId=corr_id)
-            LOGGER.debug('%s: request send:\n%s',
-                         self.__class__.__name__,
-                         blp_request)
+            if TRACE.enabled:
+                TRACE('%s: request send:\n%s',
+                      self.__class__.__name__,
+                      blp_request)
 
     @classmethod
     def _is_error_msg(cls, msg: blpapi.Message) -> bool:
@@ -92,12 +124,23 @@ class RequestHandler(HandlerBase):
         for msg in event_:
 
             if self._is_error_msg(msg):
+                for cor_id in msg.correlationIds():
+                    request = self._current_requests.get(cor_id)
+                    if (request is not None
+                            and request.receives_response_errors):
+                        request.send_queue_message(msg)
+
                 self._close_requests(msg.correlationIds())
                 continue
 
             for cor_id in msg.correlationIds():
 
-                request = self._current_requests[cor_id]
+                # responses of cancelled requests can still arrive
+                request = self._current_requests.get(cor_id)
+                if request is None:
+                    continue
+
+                request.mark(RequestStage.FIRST_RESPONSE)
                 request.send_queue_message(msg)
 
     def _response_handler(self, event_: blpapi.Event):
@@ -111,23 +154,117 @@ class RequestHandler(HandlerBase):
         for msg in event_:
             self._close_requests(msg.correlationIds())
 
+    def cancel_requests(self, requests: List[RequestBase]):
+        """
+        Cancel the given requests if they were sent and forget them;
+        their responses are not processed anymore
+        """
+        corr_ids = [corr_id
+                    for corr_id, request in self._current_requests.items()
+                    if any(request is cancelled for cancelled in requests)]
+
+        for corr_id in corr_ids:
+            del self._current_requests[corr_id]
+            self._session.cancel(corr_id)
+
+        LOGGER.debug('%s: %s requests cancelled',
+                     self.__class__.__name__,
+                     len(corr_ids))
+
+    def _close_requests(self, corr_ids: Iterable[blpapi.CorrelationId]):
+        corr_ids = list(corr_ids)
+
+        for corr_id in corr_ids:
+            request = self._current_requests.get(corr_id)
+            if request is None:
+                continue
+
+            request.mark(RequestStage.LAST_RESPONSE)
+
+            if (self._metrics is not None
+                    and RequestStage.SENT in request.timestamps):
+                self._metrics.request_latency.observe(
+                    request.timestamps[RequestStage.LAST_RESPONSE]
+                    - request.timestamps[RequestStage.SENT],
+                    request_type=request.request_name)
+
+        super()._close_requests(corr_ids)
+
 
-class SubscriptionHandler(HandlerBase):
+class SubscriptionHandler(HandlerBase, TickConsumer):
     """
     Handler gets response events from Bloomberg from other thread,
     then puts it to request queue. Each handler opens its own session
 
     Used for handling subscription requests and responses
+
+    When Bloomberg reports that the client is slow, `slow_consumer_policy`
+    is applied: ticks of all subscriptions without their own conflation
+    interval are conflated with `slow_conflation_interval` and/or ticks
+    of subscriptions with priority below `shed_priority` are skipped
     """
 
+    # pylint: disable=too-many-instance-attributes
     def __init__(self,
                  session_options: blpapi.SessionOptions,
-                 loop: asyncio.AbstractEventLoop = None):
-        super().__init__(session_options, loop)
+                 loop: asyncio.AbstractEventLoop = None,
+                 slow_consumer_policy: SlowConsumerPolicy =
+                 SlowConsumerPolicy.CONFLATE,
+                 slow_conflation_interval: float = 1,
+                 shed_priority: int = 0,
+                 metrics: Optional[BloombergMetrics] = None,
+                 monitor: Optional[Monitor] = None,
+                 ):
+        super().__init__(session_options, loop, metrics, monitor)
+
+        self.slow_consumer_policy = slow_consumer_policy
+        self.slow_conflation_interval = slow_conflation_interval
+        self.shed_priority = shed_priority
 
         # only for typing
         self._current_requests: Dict[blpapi.CorrelationId, Subscription] = {}
 
+        # each subscribed security (topic) has its own correlation id
+        self._topics: Dict[blpapi.CorrelationId, str] = {}
+
+        # {topic key: correlation id}; subscriptions with the same security,
+        # fields and options share one Bloomberg topic
+        self._topic_ids: Dict[Tuple[str, Tuple[str, ...], Tuple[str, ...]],
+                              blpapi.CorrelationId] = {}
+
+        # all subscriptions that use the topic
+        self._subscribers: Dict[blpapi.CorrelationId,
+                                List[Subscription]] = defaultdict(list)
+
+        # last received values of all subscriptions
+        self.last_values = LastValueCache()
+
+        # the last values of subscriptions with `history_size`
+        self.tick_history = TickHistory()
+
+        # everyone who receives parsed ticks, e.g. tick streams;
+        # tuple is replaced on change, so it can be safely iterated
+        # from Bloomberg thread
+        self._consumers: Tuple[TickConsumer, ...] = ()
+
+        # consumers that receive every tick before delta filtering and
+        # conflation, e.g. bar aggregators that need all trades
+        self._raw_consumers: Tuple[TickConsumer, ...] = ()
+
+        # securities whose consumers receive only changed fields
+        self._delta_securities: Set[str] = set()
+
+        # client-side conflation of ticks sent to consumers
+        self._conflator = Conflator()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+        # securities that are conflated only while the client is slow
+        self._slow_conflated: List[str] = []
+
+        # correlation ids whose messages are skipped while the client is slow
+        self._shed_topics: FrozenSet[blpapi.CorrelationId] = frozenset()
+        self.shed_messages = 0
+
         local_methods = {
             blpapi.Event.SUBSCRIPTION_STATUS: self._subscriber_status_handler,
             blpapi.Event.SUBSCRIPTION_DATA:   self._subscriber_data_handler,
@@ -137,11 +274,143 @@ class SubscriptionHandler(HandlerBase):
 
     def _subscriber_data_handler(self, event_: blpapi.Event):
         """
-        Redirect data to the request queue.
+        Parse data and update the last values of the subscribed securities
         """
+        receive_time = time.time()
+        shed_topics = self._shed_topics
+
         for msg in event_:
+            if shed_topics and all(cor_id in shed_topics
+                                   for cor_id in msg.correlationIds()):
+                self.shed_messages += 1
+                continue
+
+            values = parse_market_data(msg)
+
+            # one message can be sent to several topics of the same
+            # security, but the security must receive it only once
+            securities = {}
+
             for cor_id in msg.correlationIds():
-                self._current_requests[cor_id].send_queue_message(msg)
+                # Bloomberg can still send data of unsubscribed topics
+                security = self._topics.get(cor_id)
+                if security is None:
+                    if TRACE.enabled:
+                        TRACE('%s: data of unknown topic %s is skipped',
+                              self.__class__.__name__,
+                              cor_id)
+                    continue
+
+                securities[security] = None
+
+            for security in securities:
+                self.put(Tick(security, values, receive_time))
+
+    def put(self, tick: Tick):
+        """
+        Update the last values and send the tick to consumers; this is
+        also used to feed recorded ticks (see `TickReplay`)
+        """
+        changed = self.last_values.put(tick)
+        self.tick_history.put(tick)
+
+        for consumer in self._raw_consumers:
+            consumer.put(tick)
+
+        if tick.security in self._delta_securities:
+            if not changed:
+                return
+
+            tick = Tick(tick.security, changed, tick.time)
+
+        tick = self._conflator.offer(tick)
+        if tick is None:
+            return
+
+        for consumer in self._consumers:
+            consumer.put(tick)
+
+    def _on_slow_consumer(self):
+        if self.slow_consumer_policy == SlowConsumerPolicy.LOG:
+            return
+
+        for security in set(self._topics.values()):
+            if self._conflator.get_interval(security) is None:
+                self._conflator.set_interval(security,
+                                             self.slow_conflation_interval)
+                self._slow_conflated.append(security)
+
+        if self.slow_consumer_policy == SlowConsumerPolicy.SHED:
+            self._shed_topics = frozenset(
+                cor_id
+                for cor_id, subscribers in list(self._subscribers.items())
+                if subscribers and max(subscription.priority
+                                       for subscription in subscribers)
+                < self.shed_priority)
+
+        LOGGER.warning('%s: %s securities are conflated, %s are shed',
+                       self.__class__.__name__,
+                       len(self._slow_conflated),
+                       len(self._shed_topics))
+
+        self._loop.call_soon_threadsafe(self._schedule_flush)
+
+    def _on_slow_consumer_cleared(self):
+        self._shed_topics = frozenset()
+
+        # delayed ticks are sent by the already scheduled flush
+        for security in self._slow_conflated:
+            self._conflator.set_interval(security, None)
+
+        self._slow_conflated = []
+
+    def stop_session(self):  # pragma: no cover
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        super().stop_session()
+
+    def _flush_conflated_ticks(self):
+        """
+        Send ticks delayed by conflation and schedule the next flush
+        """
+        self._flush_handle = None
+
+        for tick in self._conflator.flush(time.time()):
+            for consumer in self._consumers:
+                consumer.put(tick)
+
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        interval = self._conflator.min_interval
+
+        if interval is not None and self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(
+                interval, self._flush_conflated_ticks)
+
+    def add_consumer(self, consumer: TickConsumer, raw: bool = False):
+        """
+        Start sending all received ticks to the given consumer; `raw`
+        consumer receives ticks before delta filtering and conflation
+        """
+        if raw:
+            self._raw_consumers = self._raw_consumers + (consumer,)
+        else:
+            self._consumers = self._consumers + (consumer,)
+
+    def remove_consumer(self, consumer: TickConsumer):
+        """
+        Stop sending ticks to the given consumer
+        """
+        self._consumers = tuple(existing_consumer
+                                for existing_consumer in self._consumers
+                                if existing_consumer is not consumer)
+        self._raw_consumers = tuple(existing_consumer
+                                    for existing_consumer
+                                    in self._raw_consumers
+                                    if existing_consumer is not consumer)
 
     def _subscriber_status_handler(self, event_: blpapi.Event):
         """
@@ -157,32 +426,266 @@ class SubscriptionHandler(HandlerBase):
         """
         Send subscriptions to Bloomberg
 
-        Wait until session is started, then send subscription
+        Wait until session is started, then send all subscriptions in one
+        subscription list. Each security gets its own correlation id.
+
+        Topics (security, fields and options) that are already subscribed
+        are not sent again: the new subscription shares the existing topic
+        until all its subscriptions are unsubscribed
         """
         await self.session_started.wait()
 
+        subscription_list = blpapi.SubscriptionList()
+
         for subscription in subscriptions:
-            corr_id = blpapi.CorrelationId(str(uuid.uuid4()))
-            self._current_requests[corr_id] = subscription
+            corr_ids = {}
+
+            for security in subscription.securities:
+                corr_id = self._attach(subscription, security)
+                if corr_id is not None:
+                    corr_ids[security] = corr_id
+
+            subscription.create_subscription(corr_ids, subscription_list)
+            self.last_values.add(subscription.securities, subscription.fields)
+            self._update_settings(subscription.securities)
 
-            blp_subscription = subscription.create_subscription(corr_id)
-            self._session.subscribe(blp_subscription)
+        if subscription_list.size():
+            self._session.subscribe(subscription_list)
 
             LOGGER.debug('%s: subscription send:\n%s',
                          self.__class__.__name__,
-                         blp_subscription)
+                         subscription_list)
+
+        self._schedule_flush()
+
+    def unsubscribe(self, subscriptions: List[Subscription]):
+        """
+        Detach subscriptions from their topics; topics that have no
+        subscriptions left are unsubscribed from Bloomberg, and the last
+        values, history and conflation state of securities without topics
+        are deleted. Settings of securities that are still subscribed are
+        recalculated from the remaining subscriptions
+        """
+        subscription_list = blpapi.SubscriptionList()
+        securities = []
+
+        for subscription in subscriptions:
+            for security in subscription.securities:
+                corr_id = self._detach(subscription, security)
+                securities.append(security)
+
+                if corr_id is not None:
+                    subscription_list.add(security, correlationId=corr_id)
+
+        if subscription_list.size():
+            self._session.unsubscribe(subscription_list)
+
+            LOGGER.debug('%s: %s topics unsubscribed',
+                         self.__class__.__name__,
+                         subscription_list.size())
+
+        self._update_settings(securities)
+        self._free_securities(securities)
+
+    async def modify_subscription(self,
+                                  subscription: Subscription,
+                                  fields: List[str]):
+        """
+        Change fields of the subscription. Topics that are used only by
+        this subscription are resubscribed with the same correlation ids,
+        shared topics are left to other subscriptions
+        """
+        await self.session_started.wait()
+
+        old_keys = {security: subscription.get_topic_key(security)
+                    for security in subscription.securities}
+        subscription.fields = fields
+
+        subscribe_ids = {}
+        resubscribe_ids = {}
+        unsubscribe_list = blpapi.SubscriptionList()
+
+        for security, old_key in old_keys.items():
+            new_key = subscription.get_topic_key(security)
+            if new_key == old_key:
+                continue
+
+            corr_id = self._topic_ids.get(old_key)
+
+            if (corr_id is not None
+                    and self._subscribers[corr_id] == [subscription]
+                    and new_key not in self._topic_ids):
+                del self._topic_ids[old_key]
+                self._topic_ids[new_key] = corr_id
+                resubscribe_ids[security] = corr_id
+                continue
+
+            corr_id = self._detach(subscription, security, old_key)
+            if corr_id is not None:
+                unsubscribe_list.add(security, correlationId=corr_id)
+
+            corr_id = self._attach(subscription, security)
+            if corr_id is not None:
+                subscribe_ids[security] = corr_id
+
+        self.last_values.add(subscription.securities, subscription.fields)
+        self._update_settings(subscription.securities)
+
+        if resubscribe_ids:
+            self._session.resubscribe(
+                subscription.create_subscription(resubscribe_ids))
+
+        if unsubscribe_list.size():
+            self._session.unsubscribe(unsubscribe_list)
+
+        if subscribe_ids:
+            self._session.subscribe(
+                subscription.create_subscription(subscribe_ids))
+
+        LOGGER.debug('%s: subscription fields changed to %s',
+                     self.__class__.__name__,
+                     subscription.fields)
+
+    def _attach(self,
+                subscription: Subscription,
+                security: str) -> Optional[blpapi.CorrelationId]:
+        """
+        Attach subscription to the topic of the given security; return
+        correlation id if the topic is new and must be subscribed
+        """
+        topic_key = subscription.get_topic_key(security)
+        corr_id = self._topic_ids.get(topic_key)
+        is_new = corr_id is None
+
+        if is_new:
+            corr_id = blpapi.CorrelationId(str(uuid.uuid4()))
+
+            self._topic_ids[topic_key] = corr_id
+            self._current_requests[corr_id] = subscription
+            self._topics[corr_id] = security
+
+        self._subscribers[corr_id].append(subscription)
+
+        return corr_id if is_new else None
+
+    def _detach(self,
+                subscription: Subscription,
+                security: str,
+                topic_key: Optional[Tuple] = None,
+                ) -> Optional[blpapi.CorrelationId]:
+        """
+        Detach subscription from the topic of the given security; return
+        correlation id if the topic has no subscriptions left and must be
+        unsubscribed
+        """
+        topic_key = topic_key or subscription.get_topic_key(security)
+        corr_id = self._topic_ids.get(topic_key)
+        if corr_id is None:
+            return None
+
+        subscribers = self._subscribers[corr_id]
+        if subscription in subscribers:
+            subscribers.remove(subscription)
+
+        if subscribers:
+            # others still use this topic
+            self._current_requests[corr_id] = subscribers[0]
+            return None
+
+        del self._topic_ids[topic_key]
+        del self._subscribers[corr_id]
+        del self._topics[corr_id]
+        self._current_requests.pop(corr_id, None)
+
+        return corr_id
+
+    def _get_subscriptions(self, security: str) -> List[Subscription]:
+        """
+        Return all subscriptions that use topics of the given security
+        """
+        subscriptions = []
+
+        for corr_id, subscribers in self._subscribers.items():
+            if self._topics.get(corr_id) != security:
+                continue
+
+            for subscription in subscribers:
+                if subscription not in subscriptions:
+                    subscriptions.append(subscription)
 
-    async def read_subscribers(self, security_id: str = None):
+        return subscriptions
+
+    def _update_settings(self, securities: Iterable[str]):
+        """
+        Apply delta, conflation and history settings of all subscriptions
+        of the given securities. Ticks of a security are shared by all its
+        subscriptions, so the least restrictive settings win: ticks are
+        sent as deltas or conflated only if every subscription asks for it,
+        and history is kept while any subscription needs it
+        """
+        for security in set(securities):
+            subscriptions = self._get_subscriptions(security)
+            if not subscriptions:
+                # state of securities without topics is deleted
+                # by `_free_securities`
+                continue
+
+            if all(subscription.delta for subscription in subscriptions):
+                self._delta_securities.add(security)
+            else:
+                self._delta_securities.discard(security)
+
+            intervals = [subscription.conflation_interval
+                         for subscription in subscriptions]
+
+            if None not in intervals:
+                if security in self._slow_conflated:
+                    self._slow_conflated.remove(security)
+
+                self._conflator.set_interval(security, min(intervals))
+
+            elif security not in self._slow_conflated:
+                self._conflator.set_interval(security, None)
+
+            with_history = [subscription
+                            for subscription in subscriptions
+                            if subscription.history_size > 0]
+
+            if with_history:
+                self.tick_history.track(
+                    security,
+                    max(subscription.history_size
+                        for subscription in with_history),
+                    {field
+                     for subscription in with_history
+                     for field in subscription.fields})
+            else:
+                self.tick_history.untrack(security)
+
+    def _free_securities(self, securities: List[str]):
         """
-        You can check what are already come from Bloomberg
+        Delete all state of the given securities that don't have
+        subscribed topics anymore
+        """
+        subscribed = set(self._topics.values())
+        securities = [security
+                      for security in set(securities)
+                      if security not in subscribed]
+
+        self.last_values.remove(securities)
+
+        for security in securities:
+            self.tick_history.untrack(security)
+            self._conflator.remove(security)
+            self._delta_securities.discard(security)
+
+    async def read_subscribers(self,
+                               security_id: str = None) -> pd.DataFrame:
+        """
+        Return the last received values of all subscriptions or
+        of the given security
         """
         if security_id is None:
-            tasks = [asyncio.create_task(request.process())
-                     for request in self._current_requests.values()]
-        else:
-            tasks = [asyncio.create_task(request.process())
-                     for request in self._current_requests.values() if
-                     security_id in request.securities]
+            return self.last_values.snapshot()
 
-        requests_result = await asyncio.gather(*tasks)
-        return requests_result
+        return self.last_values.snapshot([security_id])
@@ -0,0 +1,234 @@
+"""
+Bidirectional map between different types of security identifiers
+(ticker, ISIN, CUSIP, BBGID etc.)
+"""
+import json
+import os
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import pandas as pd
+
+from .enums import SecurityIdType
+from .utils import log
+
+LOGGER = log.get_logger()
+
+# Bloomberg fields that contain the security id of the given type
+ID_FIELDS: Dict[SecurityIdType, str] = {
+    SecurityIdType.TICKER:               'PARSEKYABLE_DES',
+    SecurityIdType.ISIN:                 'ID_ISIN',
+    SecurityIdType.CUSIP:                'ID_CUSIP',
+    SecurityIdType.SEDOL:                'ID_SEDOL1',
+    SecurityIdType.BL_UNIQUE_IDENTIFIER: 'ID_BB_UNIQUE',
+    SecurityIdType.BL_GLOBAL_IDENTIFIER: 'ID_BB_GLOBAL',
+    }
+
+
+def split_security_id(
+        security: str,
+        security_id_type: Optional[SecurityIdType] = None,
+        ) -> Tuple[SecurityIdType, str]:
+    """
+    Return security id type and security id without type prefix.
+
+    If `security_id_type` is not provided, type is taken from the prefix
+    of the security id; securities without prefix are treated as tickers
+    """
+    if security_id_type is not None:
+        return security_id_type, security
+
+    for id_type in SecurityIdType:
+        if security.startswith(id_type.value):
+            return id_type, id_type.remove_type(security)
+
+    return SecurityIdType.TICKER, security
+
+
+class SecurityIdMap:
+    """
+    Keeps all known identifiers of every security, so that any of them can
+    be translated into any other without asking Bloomberg.
+
+    The map is filled from reference data responses that contain id fields
+    (see `ID_FIELDS`) and can be saved to and loaded from a json file.
+
+    If `preferred_type` is set, securities are requested from Bloomberg
+    using identifier of this type whenever it is known.
+    """
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 preferred_type: Optional[SecurityIdType] =
+                 SecurityIdType.BL_GLOBAL_IDENTIFIER,
+                 ):
+        self.path = path
+        self._preferred_type = preferred_type
+
+        # each security is stored as {id type: security id}
+        self._securities: List[Dict[SecurityIdType, str]] = []
+
+        # {(id type, security id): position in `self._securities`}
+        self._index: Dict[Tuple[SecurityIdType, str], int] = {}
+
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self._index)
+
+    def add(self, ids: Dict[SecurityIdType, str]):
+        """
+        Add identifiers that belong to the same security
+        """
+        ids = {id_type: security_id
+               for id_type, security_id in ids.items()
+               if security_id}
+
+        positions = {self._index[key]
+                     for key in ids.items()
+                     if key in self._index}
+
+        if not positions:
+            position = len(self._securities)
+            self._securities.append({})
+        else:
+            position, *duplicates = sorted(positions)
+
+            # identifiers of the same security were stored separately;
+            # merge them together
+            for duplicate in duplicates:
+                self._update(position, self._securities[duplicate])
+                self._securities[duplicate] = {}
+
+        self._update(position, ids)
+
+    def _update(self, position: int, ids: Dict[SecurityIdType, str]):
+        security_ids = self._securities[position]
+
+        for id_type, security_id in ids.items():
+            old_id = security_ids.get(id_type)
+            if old_id is not None and old_id != security_id:
+                LOGGER.debug('%s: %s changed from %s to %s',
+                             self.__class__.__name__,
+                             id_type.name,
+                             old_id,
+                             security_id)
+                self._index.pop((id_type, old_id), None)
+
+            security_ids[id_type] = security_id
+            self._index[(id_type, security_id)] = position
+
+    def get(self,
+            security: str,
+            to_type: SecurityIdType,
+            from_type: Optional[SecurityIdType] = None,
+            ) -> Optional[str]:
+        """
+        Translate security id into the id of `to_type`. Return None if
+        translation is not known
+        """
+        key = split_security_id(security, from_type)
+
+        try:
+            position = self._index[key]
+        except KeyError:
+            return None
+
+        return self._securities[position].get(to_type)
+
+    def rewrite(self,
+                securities: Iterable[str],
+                security_id_type: Optional[SecurityIdType] = None,
+                ) -> Dict[str, str]:
+        """
+        Return {security: security id with type prefix} that should be used
+        to request the given securities from Bloomberg.
+        """
+        query_ids = {}
+
+        for security in securities:
+            id_type, security_id = split_security_id(security,
+                                                     security_id_type)
+            query_ids[security] = security
+
+            if security_id_type is not None:
+                query_ids[security] = security_id_type.add_type(security)
+
+            if self._preferred_type in (None, id_type):
+                continue
+
+            preferred_id = self.get(security_id,
+                                    self._preferred_type,
+                                    id_type)
+            if preferred_id is not None:
+                query_ids[security] = self._preferred_type.add_type(
+                    preferred_id)
+
+        return query_ids
+
+    def update_from_frame(self,
+                          data: pd.DataFrame,
+                          security_id_type: Optional[SecurityIdType] = None):
+        """
+        Update map using reference data response. `data` index must contain
+        requested securities; all id fields present in `data` columns are
+        added to the map
+        """
+        id_columns = {id_type: field_name
+                      for id_type, field_name in ID_FIELDS.items()
+                      if field_name in data.columns}
+
+        if not id_columns:
+            return
+
+        for security, row in data[list(id_columns.values())].iterrows():
+            ids = dict([split_security_id(security, security_id_type)])
+
+            for id_type, field_name in id_columns.items():
+                value = row[field_name]
+                if isinstance(value, str):
+                    ids[id_type] = value
+
+            if len(ids) > 1:
+                self.add(ids)
+
+    def save(self, path: Optional[str] = None):
+        """
+        Save map to the json file; by default, `self.path` is used
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError('Please provide path to save SecurityIdMap')
+
+        securities = [{id_type.name: security_id
+                       for id_type, security_id in ids.items()}
+                      for ids in self._securities
+                      if ids]
+
+        with open(path, 'w') as file:
+            json.dump(securities, file)
+
+        LOGGER.debug('%s: %s securities saved to %s',
+                     self.__class__.__name__,
+                     len(securities),
+                     path)
+
+    def load(self, path: Optional[str] = None):
+        """
+        Load identifiers from the json file created by `save`; loaded
+        identifiers are added to the existing ones
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError('Please provide path to load SecurityIdMap')
+
+        with open(path) as file:
+            securities = json.load(file)
+
+        for ids in securities:
+            self.add({SecurityIdType[id_type]: security_id
+                      for id_type, security_id in ids.items()})
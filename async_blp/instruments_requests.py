@@ -9,6 +9,7 @@ import pandas as pd
 
 from .base_request import RequestBase
 from .enums import ErrorBehaviour
+from .enums import RequestStage
 from .errors import BloombergErrors
 from .utils import log
 
@@ -70,6 +71,7 @@ class InstrumentRequestBase(RequestBase):
         data_frame = pd.DataFrame(securities,
                                   columns=self.response_fields)
 
+        self.mark(RequestStage.PROCESSED)
         return data_frame, errors
 
     @property
@@ -0,0 +1,643 @@
+"""
+Storage for the market data received from subscriptions
+"""
+import abc
+import asyncio
+import collections
+import threading
+from dataclasses import dataclass
+from typing import Any
+from typing import Deque
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from .enums import OverflowPolicy
+
+
+@dataclass
+class Tick:
+    """
+    Values of one security received in one subscription message
+    """
+    security: str
+
+    # {field: value}
+    values: Dict[str, Any]
+
+    # time when message was received, seconds since epoch
+    time: float
+
+
+class TickConsumer(metaclass=abc.ABCMeta):
+    """
+    Base class for everything that receives ticks from SubscriptionHandler
+    """
+
+    @abc.abstractmethod
+    def put(self, tick: Tick):
+        """
+        Process received tick. This method is called from Bloomberg thread
+        and must be thread-safe
+        """
+        pass
+
+
+class LastValueCache(TickConsumer):
+    """
+    Matrix securities x fields that contains the last received value
+    of every field.
+
+    Values are updated in place from Bloomberg thread as soon as messages
+    arrive, so reading the current state doesn't depend on the number
+    of received messages. Rows and columns are preallocated and the matrix
+    grows only when new securities or fields appear.
+    """
+
+    def __init__(self,
+                 securities: Iterable[str] = (),
+                 fields: Iterable[str] = (),
+                 ):
+        self._lock = threading.Lock()
+
+        # {security: row}, {field: column}
+        self._securities: Dict[str, int] = {}
+        self._fields: Dict[str, int] = {}
+
+        self._values = np.full((1, 1), np.nan, dtype=object)
+
+        self.add(securities, fields)
+
+    @property
+    def securities(self) -> List[str]:
+        return list(self._securities)
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self._fields)
+
+    def add(self, securities: Iterable[str], fields: Iterable[str]):
+        """
+        Preallocate space for the given securities and fields
+        """
+        with self._lock:
+            for security in securities:
+                self._add_security(security)
+
+            for field in fields:
+                self._add_field(field)
+
+    def update(self,
+               security: str,
+               values: Dict[str, Any],
+               ) -> Dict[str, Any]:
+        """
+        Set the last values of the given security and return only values
+        that differ from the previous ones. This method is thread-safe and
+        is supposed to be called from Bloomberg thread
+        """
+        changed = {}
+
+        with self._lock:
+            row = self._securities.get(security)
+            if row is None:
+                row = self._add_security(security)
+
+            row_values = self._values[row]
+
+            for field, value in values.items():
+                column = self._fields.get(field)
+                if column is None:
+                    column = self._add_field(field)
+                    row_values = self._values[row]
+
+                old_value = row_values[column]
+
+                # identity check is enough for the most of repeated values,
+                # e.g. interned strings and small ints
+                if old_value is not value and old_value != value:
+                    row_values[column] = value
+                    changed[field] = value
+
+        return changed
+
+    def remove(self, securities: Iterable[str]):
+        """
+        Delete the given securities and free their rows; rows of the
+        remaining securities are moved to keep the matrix dense
+        """
+        with self._lock:
+            removed = False
+            for security in securities:
+                removed |= self._securities.pop(security, None) is not None
+
+            if not removed:
+                return
+
+            rows = list(self._securities.values())
+            values = np.full(self._values.shape, np.nan, dtype=object)
+            values[:len(rows)] = self._values[rows]
+
+            self._values = values
+            self._securities = {security: row
+                                for row, security
+                                in enumerate(self._securities)}
+
+    def put(self, tick: Tick) -> Dict[str, Any]:
+        """
+        Update the last values using the received tick; return changed
+        values
+        """
+        return self.update(tick.security, tick.values)
+
+    def get(self, security: str, field: str) -> Any:
+        """
+        Return the last value of the given security and field
+        """
+        with self._lock:
+            try:
+                row = self._securities[security]
+                column = self._fields[field]
+            except KeyError:
+                return np.nan
+
+            return self._values[row, column]
+
+    def snapshot(self,
+                 securities: Optional[List[str]] = None,
+                 copy: bool = True,
+                 ) -> pd.DataFrame:
+        """
+        Return the last values as pd.DataFrame with securities as index
+        and fields as columns.
+
+        If `copy` is False and all securities are requested, returned
+        data frame is a view of the cache and will change when new values
+        arrive
+        """
+        with self._lock:
+            values = self._values[:len(self._securities), :len(self._fields)]
+            index = list(self._securities)
+            columns = list(self._fields)
+
+            if securities is not None:
+                rows = [self._securities[security]
+                        for security in securities
+                        if security in self._securities]
+                index = [index[row] for row in rows]
+                values = values[rows]
+
+            elif copy:
+                values = values.copy()
+
+        return pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+    def _add_security(self, security: str) -> int:
+        if security in self._securities:
+            return self._securities[security]
+
+        row = len(self._securities)
+        if row >= self._values.shape[0]:
+            self._resize(rows=2 * self._values.shape[0])
+
+        self._securities[security] = row
+        return row
+
+    def _add_field(self, field: str) -> int:
+        if field in self._fields:
+            return self._fields[field]
+
+        column = len(self._fields)
+        if column >= self._values.shape[1]:
+            self._resize(columns=2 * self._values.shape[1])
+
+        self._fields[field] = column
+        return column
+
+    def _resize(self,
+                rows: Optional[int] = None,
+                columns: Optional[int] = None):
+        old_rows, old_columns = self._values.shape
+        values = np.full((rows or old_rows, columns or old_columns),
+                         np.nan,
+                         dtype=object)
+        values[:old_rows, :old_columns] = self._values
+        self._values = values
+
+
+class TickStream(TickConsumer):
+    """
+    Bounded queue of ticks for one consumer. Ticks are put from Bloomberg
+    thread and read from asyncio loop using `async for`.
+
+    When queue is full, `overflow` policy is applied. If `securities` or
+    `fields` are provided, other securities and fields are ignored.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self,
+                 securities: Optional[Iterable[str]] = None,
+                 fields: Optional[Iterable[str]] = None,
+                 maxsize: int = 10000,
+                 overflow: OverflowPolicy = OverflowPolicy.CONFLATE,
+                 loop: asyncio.AbstractEventLoop = None,
+                 ):
+        try:
+            self._loop = loop or asyncio.get_running_loop()
+        except RuntimeError:
+            raise RuntimeError('Please create TickStream inside asyncio loop '
+                               'or explicitly provide one')
+
+        if maxsize <= 0:
+            raise ValueError('maxsize must be positive')
+
+        self._securities = set(securities) if securities else None
+        self._fields = set(fields) if fields else None
+        self._maxsize = maxsize
+        self._overflow = overflow
+
+        self._ticks: Deque[Tick] = collections.deque()
+        self._condition = threading.Condition()
+        self._not_empty = asyncio.Event()
+        self._closed = False
+
+        # the latest queued tick of each security; used for conflation
+        self._queued: Dict[str, Tick] = {}
+
+        # number of ticks that were dropped or merged into other ticks
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._ticks)
+
+    def put(self, tick: Tick):
+        """
+        Thread-safe method that puts the given tick into the queue
+        """
+        if self._securities is not None and \
+                tick.security not in self._securities:
+            return
+
+        if self._fields is not None:
+            values = {field: value
+                      for field, value in tick.values.items()
+                      if field in self._fields}
+            if not values:
+                return
+
+            tick = Tick(tick.security, values, tick.time)
+
+        elif self._overflow == OverflowPolicy.CONFLATE:
+            # the same tick is shared by all consumers, but conflation
+            # changes queued ticks
+            tick = Tick(tick.security, dict(tick.values), tick.time)
+
+        with self._condition:
+            if self._closed:
+                return
+
+            if len(self._ticks) >= self._maxsize:
+                # waiting inside the loop would deadlock: the reader can't
+                # run until put returns
+                if (self._overflow == OverflowPolicy.BLOCK
+                        and not self._is_loop_thread()):
+                    self._condition.wait_for(
+                        lambda: (len(self._ticks) < self._maxsize
+                                 or self._closed))
+                    if self._closed:
+                        return
+
+                elif (self._overflow == OverflowPolicy.CONFLATE
+                      and tick.security in self._queued):
+                    queued_tick = self._queued[tick.security]
+                    queued_tick.values.update(tick.values)
+                    queued_tick.time = tick.time
+                    self.dropped += 1
+                    return
+
+                else:
+                    self._pop()
+                    self.dropped += 1
+
+            self._ticks.append(tick)
+
+            if self._overflow == OverflowPolicy.CONFLATE:
+                self._queued[tick.security] = tick
+
+            if len(self._ticks) == 1:
+                self._loop.call_soon_threadsafe(self._not_empty.set)
+
+    def _is_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def get_nowait(self) -> Optional[Tick]:
+        """
+        Return the oldest tick or None if queue is empty
+        """
+        with self._condition:
+            if not self._ticks:
+                return None
+
+            return self._pop()
+
+    def close(self):
+        """
+        Stop receiving new ticks; already queued ticks can still be read
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        self._loop.call_soon_threadsafe(self._not_empty.set)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Tick:
+        while True:
+            with self._condition:
+                if self._ticks:
+                    return self._pop()
+
+                if self._closed:
+                    raise StopAsyncIteration
+
+                self._not_empty.clear()
+
+            await self._not_empty.wait()
+
+    def _pop(self) -> Tick:
+        """
+        Remove the oldest tick; must be called under `self._condition`
+        """
+        tick = self._ticks.popleft()
+
+        if self._queued.get(tick.security) is tick:
+            del self._queued[tick.security]
+
+        self._condition.notify()
+        return tick
+
+
+class Conflator:
+    """
+    Merges all ticks of the same security received within the security's
+    conflation interval into one tick.
+
+    `offer` is called from Bloomberg thread for every received tick,
+    `flush` is called periodically from the loop to send ticks that
+    were delayed by conflation
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        # {security: conflation interval}
+        self._intervals: Dict[str, float] = {}
+
+        # {security: merged tick that is not sent yet}
+        self._pending: Dict[str, Tick] = {}
+
+        # {security: time when the last tick was sent}
+        self._last_sent: Dict[str, float] = {}
+
+    @property
+    def min_interval(self) -> Optional[float]:
+        return min(self._intervals.values(), default=None)
+
+    def get_interval(self, security: str) -> Optional[float]:
+        return self._intervals.get(security)
+
+    def set_interval(self, security: str, interval: Optional[float]):
+        """
+        Set conflation interval of the given security; None disables
+        conflation
+        """
+        with self._lock:
+            if interval is None:
+                self._intervals.pop(security, None)
+                self._last_sent.pop(security, None)
+            else:
+                self._intervals[security] = interval
+
+    def remove(self, security: str):
+        """
+        Forget conflation interval and delayed tick of the given security
+        """
+        with self._lock:
+            self._intervals.pop(security, None)
+            self._pending.pop(security, None)
+            self._last_sent.pop(security, None)
+
+    def offer(self, tick: Tick) -> Optional[Tick]:
+        """
+        Return tick that should be sent to consumers right now or None
+        if the tick was delayed
+        """
+        interval = self._intervals.get(tick.security)
+        if interval is None:
+            return tick
+
+        with self._lock:
+            pending_tick = self._pending.pop(tick.security, None)
+
+            if pending_tick is not None:
+                pending_tick.values.update(tick.values)
+                pending_tick.time = tick.time
+                tick = pending_tick
+
+            last_sent = self._last_sent.get(tick.security)
+            if last_sent is None or tick.time - last_sent >= interval:
+                self._last_sent[tick.security] = tick.time
+                return tick
+
+            if pending_tick is None:
+                # received tick is shared by all consumers, so it can't be
+                # changed
+                tick = Tick(tick.security, dict(tick.values), tick.time)
+
+            self._pending[tick.security] = tick
+            return None
+
+    def flush(self, now: float) -> List[Tick]:
+        """
+        Return delayed ticks whose conflation interval has passed
+        """
+        ticks = []
+
+        with self._lock:
+            for security, tick in list(self._pending.items()):
+                interval = self._intervals.get(security)
+
+                if interval is None or \
+                        now - self._last_sent.get(security, 0) >= interval:
+                    del self._pending[security]
+                    self._last_sent[security] = now
+                    ticks.append(tick)
+
+        return ticks
+
+
+class RingBuffer:
+    """
+    Fixed-capacity buffer of (time, value) pairs stored in numpy arrays.
+
+    Every pair is written twice, at position i and i + capacity, so that
+    the last n pairs always form a contiguous slice and can be returned
+    as views without copying
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError('capacity must be positive')
+
+        self._capacity = capacity
+        self._times = np.full(2 * capacity, np.nan, dtype=np.float64)
+        self._values = np.full(2 * capacity, np.nan, dtype=np.float64)
+
+        # next position to write
+        self._position = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def append(self, time_: float, value: float):
+        position = self._position
+        mirror_position = position + self._capacity
+
+        self._times[position] = self._times[mirror_position] = time_
+        self._values[position] = self._values[mirror_position] = value
+
+        self._position = (position + 1) % self._capacity
+        if self._size < self._capacity:
+            self._size += 1
+
+    def window(self,
+               size: Optional[int] = None,
+               ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return times and values of the last `size` pairs (or all pairs),
+        from the oldest to the newest. Returned arrays are views and are
+        overwritten by subsequent appends; copy them if you need to keep
+        them
+        """
+        if size is None or size > self._size:
+            size = self._size
+
+        end = self._position + self._capacity
+        return self._times[end - size:end], self._values[end - size:end]
+
+    def resize(self, capacity: int) -> 'RingBuffer':
+        """
+        Return new buffer of the given capacity with the last pairs of
+        this buffer that fit into it
+        """
+        buffer = RingBuffer(capacity)
+
+        for time_, value in zip(*self.window(capacity)):
+            buffer.append(time_, value)
+
+        return buffer
+
+
+class TickHistory(TickConsumer):
+    """
+    Keeps the last `capacity` numeric values of the tracked securities
+    and fields in ring buffers. Memory usage doesn't depend on the number
+    of received ticks
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        # {security: (fields, capacity)}, None means all fields
+        self._tracked: Dict[str, Tuple[Optional[Set[str]], int]] = {}
+        self._buffers: Dict[Tuple[str, str], RingBuffer] = {}
+
+    def track(self,
+              security: str,
+              capacity: int,
+              fields: Optional[Iterable[str]] = None):
+        """
+        Start keeping history of the given security; if `fields` are not
+        provided, all numeric fields are kept.
+
+        If the security is already tracked, its buffers are resized to
+        the new capacity keeping the last values, and buffers of fields
+        that are not tracked anymore are freed
+        """
+        fields = set(fields) if fields else None
+
+        with self._lock:
+            self._tracked[security] = (fields, capacity)
+
+            for key in [key for key in self._buffers if key[0] == security]:
+                buffer = self._buffers[key]
+
+                if fields is not None and key[1] not in fields:
+                    del self._buffers[key]
+                elif buffer.capacity != capacity:
+                    self._buffers[key] = buffer.resize(capacity)
+
+    def untrack(self, security: str):
+        """
+        Stop keeping history of the given security and free its buffers
+        """
+        with self._lock:
+            self._tracked.pop(security, None)
+
+            for key in [key for key in self._buffers if key[0] == security]:
+                del self._buffers[key]
+
+    def put(self, tick: Tick):
+        tracked = self._tracked.get(tick.security)
+        if tracked is None:
+            return
+
+        fields, capacity = tracked
+
+        with self._lock:
+            for field, value in tick.values.items():
+                if fields is not None and field not in fields:
+                    continue
+
+                if not isinstance(value, (int, float)):
+                    continue
+
+                key = (tick.security, field)
+                buffer = self._buffers.get(key)
+                if buffer is None:
+                    buffer = self._buffers[key] = RingBuffer(capacity)
+
+                buffer.append(tick.time, value)
+
+    def window(self,
+               security: str,
+               field: str,
+               size: Optional[int] = None,
+               ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return times and values of the last `size` ticks of the given
+        security and field without copying (see `RingBuffer.window`)
+        """
+        with self._lock:
+            buffer = self._buffers.get((security, field))
+
+            if buffer is None:
+                return np.array([]), np.array([])
+
+            return buffer.window(size)
@@ -0,0 +1,514 @@
+"""
+Metrics of sessions, requests and queues and their exporters
+"""
+import abc
+import asyncio
+import bisect
+import itertools
+import math
+import threading
+import time
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from .utils import log
+
+# pylint: disable=ungrouped-imports
+try:
+    import blpapi
+except ImportError:
+    from async_blp.utils import env_test as blpapi
+
+LOGGER = log.get_logger()
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1, 2.5, 5, 10, 30, 60)
+
+# readable names of Bloomberg event types
+EVENT_NAMES = {value: name
+               for name, value in vars(blpapi.Event).items()
+               if name.isupper()}
+
+
+class Sample(NamedTuple):
+    name: str
+    labels: Dict[str, str]
+    value: float
+
+
+class Metric(metaclass=abc.ABCMeta):
+    """
+    Base class for metrics; every combination of label values has its own
+    value. Metrics are updated from Bloomberg threads, so all changes are
+    made under lock
+    """
+    metric_type = None
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 label_names: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _get_key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f'{self.name} requires labels '
+                             f'{self.label_names}, got {tuple(labels)}')
+
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def remove(self, **labels: str):
+        """
+        Delete value of the given labels, so that it is not exported
+        """
+        key = self._get_key(labels)
+
+        with self._lock:
+            self._values.pop(key, None)
+
+    @abc.abstractmethod
+    def samples(self) -> Iterator[Sample]:
+        pass
+
+
+class Counter(Metric):
+    """
+    Value that only grows, e.g. number of received messages; rates are
+    calculated from its changes by the consumer
+    """
+    metric_type = 'counter'
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._get_key(labels)
+
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._get_key(labels), 0)
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+
+        for key, value in values:
+            yield Sample(self.name, dict(zip(self.label_names, key)), value)
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down, e.g. number of requests in flight
+    """
+    metric_type = 'gauge'
+
+    def set(self, value: float, **labels: str):
+        key = self._get_key(labels)
+
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values, e.g. request latency; values are
+    counted in cumulative `buckets`
+    """
+    metric_type = 'histogram'
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, label_names)
+
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str):
+        key = self._get_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            counts, total = self._values.get(key, (None, 0))
+            if counts is None:
+                # the last one is +Inf bucket
+                counts = [0] * (len(self.buckets) + 1)
+
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def get_count(self, **labels: str) -> int:
+        counts, _ = self._values.get(self._get_key(labels), ([0], 0))
+        return sum(counts)
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = [(key, list(counts), total)
+                      for key, (counts, total) in self._values.items()]
+
+        for key, counts, total in values:
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield Sample(f'{self.name}_bucket',
+                             {**labels, 'le': format_value(bound)},
+                             cumulative)
+
+            yield Sample(f'{self.name}_sum', labels, total)
+            yield Sample(f'{self.name}_count', labels, cumulative)
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+
+    if value == -math.inf:
+        return '-Inf'
+
+    return repr(float(value))
+
+
+def escape_label(value: str) -> str:
+    return (value.replace('\\', r'\\')
+            .replace('\n', r'\n')
+            .replace('"', r'\"'))
+
+
+class MetricsRegistry:
+    """
+    All metrics that are exported together. Collectors are called before
+    every export; they update metrics whose values are cheaper to read
+    on demand than to track, e.g. queue sizes
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self,
+                name: str,
+                description: str,
+                label_names: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, description, label_names))
+
+    def gauge(self,
+              name: str,
+              description: str,
+              label_names: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, description, label_names))
+
+    def histogram(self,
+                  name: str,
+                  description: str,
+                  label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name,
+                                       description,
+                                       label_names,
+                                       buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def collect(self) -> List[Sample]:
+        """
+        Return current values of all metrics
+        """
+        return [sample
+                for metric in self.get_metrics()
+                for sample in metric.samples()]
+
+    def get_metrics(self) -> List[Metric]:
+        for collector in self._collectors:
+            collector()
+
+        return list(self._metrics.values())
+
+    def to_text(self) -> str:
+        """
+        Return all metrics in Prometheus text exposition format
+        """
+        lines = []
+
+        for metric in self.get_metrics():
+            lines.append(f'# HELP {metric.name} {metric.description}')
+            lines.append(f'# TYPE {metric.name} {metric.metric_type}')
+
+            for sample in metric.samples():
+                if sample.labels:
+                    labels = ','.join(f'{name}="{escape_label(value)}"'
+                                      for name, value
+                                      in sample.labels.items())
+                    lines.append(f'{sample.name}{{{labels}}} '
+                                 f'{format_value(sample.value)}')
+                else:
+                    lines.append(f'{sample.name} '
+                                 f'{format_value(sample.value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class BloombergMetrics:
+    """
+    Metrics of AsyncBloomberg handlers and requests:
+
+        async_blp_messages_total - received messages by handler and event
+            type; messages per second is the rate of this counter
+        async_blp_requests_in_flight, async_blp_handler_load - number and
+            weight of requests that wait for Bloomberg responses
+        async_blp_queue_depth - messages that are received but not
+            processed by requests yet
+        async_blp_request_latency_seconds - from sending request until
+            its final response is received, by request type
+        async_blp_service_open_seconds - time to open services
+        async_blp_admin_events_total - admin messages, e.g. slow consumer
+            warnings
+        async_blp_slow_consumer - 1 while Bloomberg reports that the
+            handler is slow
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+
+        self.messages = self.registry.counter(
+            'async_blp_messages_total',
+            'Messages received from Bloomberg',
+            ('handler', 'event_type'))
+        self.requests_in_flight = self.registry.gauge(
+            'async_blp_requests_in_flight',
+            'Requests and subscriptions that are currently in process',
+            ('handler',))
+        self.handler_load = self.registry.gauge(
+            'async_blp_handler_load',
+            'Total weight of requests that are currently in process',
+            ('handler',))
+        self.queue_depth = self.registry.gauge(
+            'async_blp_queue_depth',
+            'Messages waiting in queues of requests',
+            ('handler', 'request_type'))
+        self.request_latency = self.registry.histogram(
+            'async_blp_request_latency_seconds',
+            'Time from sending request until its final response',
+            ('request_type',))
+        self.service_open_time = self.registry.histogram(
+            'async_blp_service_open_seconds',
+            'Time to open Bloomberg service',
+            ('handler', 'service'))
+        self.admin_events = self.registry.counter(
+            'async_blp_admin_events_total',
+            'Admin messages received from Bloomberg',
+            ('handler', 'message'))
+        self.slow_consumer = self.registry.gauge(
+            'async_blp_slow_consumer',
+            '1 if Bloomberg reports that the handler is slow',
+            ('handler',))
+
+        # {handler name: handler}
+        self._handlers = {}
+        self._handler_ids = itertools.count()
+        self.registry.add_collector(self._collect_handlers)
+
+    def add_handler(self, handler) -> str:
+        """
+        Start collecting metrics of the given handler; return its name
+        that is used as metric label
+        """
+        name = f'{handler.__class__.__name__}_{next(self._handler_ids)}'
+        self._handlers[name] = handler
+
+        return name
+
+    def remove_handler(self, handler_name: str):
+        """
+        Stop collecting metrics of the handler, e.g. when its session is
+        stopped; its gauges are not exported anymore
+        """
+        self._handlers.pop(handler_name, None)
+
+        for gauge in (self.requests_in_flight,
+                      self.handler_load,
+                      self.slow_consumer):
+            gauge.remove(handler=handler_name)
+
+    def on_event(self, handler_name: str, event_: blpapi.Event):
+        """
+        Called from Bloomberg thread for each received event
+        """
+        num_messages = sum(1 for _ in event_)
+        self.messages.inc(num_messages,
+                          handler=handler_name,
+                          event_type=EVENT_NAMES.get(event_.eventType(),
+                                                     event_.eventType()))
+
+    # pylint: disable=protected-access
+    def _collect_handlers(self):
+        self.queue_depth.clear()
+
+        for name, handler in self._handlers.items():
+            requests = list(handler._current_requests.values())
+
+            self.requests_in_flight.set(len(set(map(id, requests))),
+                                        handler=name)
+            self.handler_load.set(handler.current_load, handler=name)
+            self.slow_consumer.set(int(handler.is_slow), handler=name)
+
+            for request in requests:
+                queue = request._msg_queue
+                if queue is not None:
+                    self.queue_depth.inc(queue.qsize(),
+                                         handler=name,
+                                         request_type=request.request_name)
+
+
+class MetricsSink(metaclass=abc.ABCMeta):
+    """
+    Base class for exporters of registry metrics
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+
+    @abc.abstractmethod
+    async def start(self):
+        pass
+
+    @abc.abstractmethod
+    async def stop(self):
+        pass
+
+
+class PrometheusEndpoint(MetricsSink):
+    """
+    HTTP endpoint that returns all metrics in Prometheus text format:
+
+        endpoint = PrometheusEndpoint(metrics.registry, port=9091)
+        await endpoint.start()
+    """
+
+    def __init__(self,
+                 registry: MetricsRegistry,
+                 host: str = '127.0.0.1',
+                 port: int = 9091,
+                 path: str = '/metrics'):
+        super().__init__(registry)
+
+        self.host = host
+        self.port = port
+        self.path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client,
+                                                  self.host,
+                                                  self.port)
+
+        # port 0 means any free port
+        self.port = self._server.sockets[0].getsockname()[1]
+        LOGGER.debug('%s: listening on %s:%s',
+                     self.__class__.__name__,
+                     self.host,
+                     self.port)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_client(self,
+                             reader: asyncio.StreamReader,
+                             writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+
+            # skip headers
+            while (await reader.readline()).strip():
+                pass
+
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[1].split('?')[0] == self.path:
+                status = '200 OK'
+                body = self.registry.to_text().encode()
+            else:
+                status = '404 Not Found'
+                body = b''
+
+            writer.write(
+                f'HTTP/1.1 {status}\r\n'
+                f'Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+                f'Content-Length: {len(body)}\r\n'
+                f'Connection: close\r\n\r\n'.encode() + body)
+            await writer.drain()
+        except ConnectionError:  # pragma: no cover
+            pass
+        finally:
+            writer.close()
+
+
+class PeriodicSink(MetricsSink):
+    """
+    Call `callback` with all samples every `interval` seconds, e.g. to push
+    them to a monitoring system
+    """
+
+    def __init__(self,
+                 registry: MetricsRegistry,
+                 callback: Callable[[List[Sample]], Optional[Awaitable]],
+                 interval: float = 10):
+        super().__init__(registry)
+
+        self.callback = callback
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        next_time = time.monotonic()
+
+        while True:
+            next_time += self.interval
+            await asyncio.sleep(max(next_time - time.monotonic(), 0))
+
+            try:
+                result = self.callback(self.registry.collect())
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as exception:  # pylint: disable=broad-except
+                LOGGER.error('%s: failed to export metrics: %s',
+                             self.__class__.__name__,
+                             exception)
@@ -0,0 +1,258 @@
+"""
+Monitor of event loop lag, Bloomberg callback time and request queues
+"""
+import asyncio
+import threading
+import weakref
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import NamedTuple
+from typing import Optional
+
+from .base_request import RequestBase
+from .metrics import EVENT_NAMES
+from .metrics import Gauge
+from .metrics import Histogram
+from .metrics import MetricsRegistry
+from .utils import log
+
+LOGGER = log.get_logger()
+
+
+class MonitorAlert(NamedTuple):
+    """
+    `kind` is one of 'loop_lag', 'callback_time', 'queue_age';
+    `source` is event type for callback time and request type for queue age
+    """
+    kind: str
+    value: float
+    threshold: float
+    source: Optional[str] = None
+
+
+class CallbackStats:
+    """
+    Time spent by Bloomberg thread in handlers of one event type
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def add(self, duration: float):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'total': self.total,
+            'max':   self.max,
+            }
+
+
+class Monitor:
+    """
+    Shows backpressure before Bloomberg reports slow consumer:
+
+    - event loop lag: how late loop wakes up the monitor task; grows when
+      parsing or user code blocks the loop
+    - callback time: time spent by Bloomberg thread in handlers of every
+      event type
+    - queue age: how long the oldest message waits in request queues
+
+    Every `interval` seconds the loop lag and queue ages are measured;
+    values above thresholds are logged and passed to `on_alert`
+    (called inside the loop; until the monitor is started, alerts are
+    only logged). Monitor must be passed to AsyncBloomberg and started:
+
+        monitor = Monitor()
+        bloomberg = AsyncBloomberg(monitor=monitor)
+        monitor.start()
+
+    If `registry` is provided, measured values are also exported as metrics
+    """
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+    def __init__(self,
+                 interval: float = 0.1,
+                 loop_lag_threshold: Optional[float] = 0.1,
+                 callback_time_threshold: Optional[float] = 0.05,
+                 queue_age_threshold: Optional[float] = 1,
+                 on_alert: Optional[Callable[[MonitorAlert], Any]] = None,
+                 registry: Optional[MetricsRegistry] = None,
+                 loop: asyncio.AbstractEventLoop = None):
+        self.interval = interval
+        self.loop_lag_threshold = loop_lag_threshold
+        self.callback_time_threshold = callback_time_threshold
+        self.queue_age_threshold = queue_age_threshold
+        self.on_alert = on_alert
+        self._loop = loop
+
+        self.loop_lag = 0.
+        self.max_loop_lag = 0.
+        self.queue_age = 0.
+        self.max_queue_age = 0.
+        self.alerts = 0
+
+        # {event type: stats}; updated from Bloomberg threads
+        self._callback_stats: Dict[str, CallbackStats] = {}
+        self._lock = threading.Lock()
+
+        # requests whose queues are checked; they are removed when
+        # processed or garbage collected
+        self._requests: weakref.WeakSet = weakref.WeakSet()
+
+        self._task: Optional[asyncio.Task] = None
+
+        self._loop_lag_gauge: Optional[Gauge] = None
+        self._callback_time_histogram: Optional[Histogram] = None
+        self._queue_age_gauge: Optional[Gauge] = None
+
+        if registry is not None:
+            self._loop_lag_gauge = registry.gauge(
+                'async_blp_loop_lag_seconds',
+                'Event loop lag')
+            self._callback_time_histogram = registry.histogram(
+                'async_blp_callback_seconds',
+                'Time spent in Bloomberg event handlers',
+                ('event_type',),
+                buckets=(0.0001, 0.0005, 0.001, 0.005,
+                         0.01, 0.05, 0.1, 0.5, 1))
+            self._queue_age_gauge = registry.gauge(
+                'async_blp_queue_age_seconds',
+                'Age of the oldest message in request queues')
+
+    def start(self):
+        """
+        Start measuring loop lag and queue ages; must be called inside
+        the loop or with `loop` provided
+        """
+        if self._task is not None:
+            return
+
+        self._loop = self._loop or asyncio.get_running_loop()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def add_request(self, request: RequestBase):
+        """
+        Watch the queue of the given request until it is processed
+        """
+        self._requests.add(request)
+
+    def on_callback(self, event_type, duration: float):
+        """
+        Called from Bloomberg thread after each event is handled
+        """
+        event_name = EVENT_NAMES.get(event_type, str(event_type))
+
+        with self._lock:
+            stats = self._callback_stats.get(event_name)
+            if stats is None:
+                stats = self._callback_stats[event_name] = CallbackStats()
+
+            stats.add(duration)
+
+        if self._callback_time_histogram is not None:
+            self._callback_time_histogram.observe(duration,
+                                                  event_type=event_name)
+
+        if (self.callback_time_threshold is not None
+                and duration > self.callback_time_threshold):
+            self._alert(MonitorAlert('callback_time',
+                                     duration,
+                                     self.callback_time_threshold,
+                                     event_name))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            callback_stats = {event_name: stats.as_dict()
+                              for event_name, stats
+                              in self._callback_stats.items()}
+
+        return {
+            'loop_lag':      self.loop_lag,
+            'max_loop_lag':  self.max_loop_lag,
+            'queue_age':     self.queue_age,
+            'max_queue_age': self.max_queue_age,
+            'callback_time': callback_stats,
+            'alerts':        self.alerts,
+            }
+
+    async def _run(self):
+        while True:
+            start_time = self._loop.time()
+            await asyncio.sleep(self.interval)
+
+            self._check_loop_lag(self._loop.time() - start_time
+                                 - self.interval)
+            self._check_queues()
+
+    def _check_loop_lag(self, lag: float):
+        self.loop_lag = max(lag, 0.)
+        self.max_loop_lag = max(self.max_loop_lag, self.loop_lag)
+
+        if self._loop_lag_gauge is not None:
+            self._loop_lag_gauge.set(self.loop_lag)
+
+        if (self.loop_lag_threshold is not None
+                and self.loop_lag > self.loop_lag_threshold):
+            self._alert(MonitorAlert('loop_lag',
+                                     self.loop_lag,
+                                     self.loop_lag_threshold))
+
+    def _check_queues(self):
+        oldest_age = 0.
+        oldest_request = None
+
+        for request in list(self._requests):
+            if request.is_processed:
+                self._requests.discard(request)
+                continue
+
+            age = request.queue_age
+            if age > oldest_age:
+                oldest_age = age
+                oldest_request = request
+
+        self.queue_age = oldest_age
+        self.max_queue_age = max(self.max_queue_age, oldest_age)
+
+        if self._queue_age_gauge is not None:
+            self._queue_age_gauge.set(oldest_age)
+
+        if (self.queue_age_threshold is not None
+                and oldest_age > self.queue_age_threshold):
+            self._alert(MonitorAlert('queue_age',
+                                     oldest_age,
+                                     self.queue_age_threshold,
+                                     oldest_request.request_name))
+
+    def _alert(self, alert: MonitorAlert):
+        self.alerts += 1
+        LOGGER.warning('%s: %s is %.4f s (threshold %s s)%s',
+                       self.__class__.__name__,
+                       alert.kind,
+                       alert.value,
+                       alert.threshold,
+                       f', {alert.source}' if alert.source else '')
+
+        if self.on_alert is None:
+            return
+
+        # alerts can be raised in Bloomberg thread, but `on_alert` must not
+        # block it, so it is called only inside the loop
+        if self._loop is None:
+            LOGGER.debug('%s: monitor is not started, on_alert is not called',
+                         self.__class__.__name__)
+            return
+
+        self._loop.call_soon_threadsafe(self.on_alert, alert)
@@ -5,19 +5,34 @@ from typing import Optional
 from typing import Tuple
 from typing import Union
 
+import numpy as np
 import pandas as pd
 
 from .enums import ErrorBehaviour
 from .enums import SecurityIdType
 from .errors import BloombergErrors
 from .errors import ErrorType
+from .utils import log
+from .utils.blp_name import BAR_TICK_DATA
+from .utils.blp_name import CLOSE
 from .utils.blp_name import ERROR_INFO
 from .utils.blp_name import FIELD_DATA
 from .utils.blp_name import FIELD_EXCEPTIONS
 from .utils.blp_name import FIELD_ID
+from .utils.blp_name import HIGH
+from .utils.blp_name import LOW
 from .utils.blp_name import MESSAGE
+from .utils.blp_name import NUM_EVENTS
+from .utils.blp_name import OPEN
+from .utils.blp_name import RESPONSE_ERROR
 from .utils.blp_name import SECURITY
 from .utils.blp_name import SECURITY_ERROR
+from .utils.blp_name import SIZE
+from .utils.blp_name import TICK_DATA
+from .utils.blp_name import TIME
+from .utils.blp_name import TYPE
+from .utils.blp_name import VALUE
+from .utils.blp_name import VOLUME
 from .utils.exc import BloombergException
 
 # pylint: disable=ungrouped-imports
@@ -29,6 +44,27 @@ except ImportError:
 BloombergValue = Union[str, int, float, dt.date, dt.datetime,
                        Dict[str, Union[str, int, float, dt.date, dt.datetime]]]
 
+LOGGER = log.get_logger()
+
+# columns of intraday bars and their types
+BAR_DTYPES = {
+    'time':      'datetime64[ns]',
+    'open':      np.float64,
+    'high':      np.float64,
+    'low':       np.float64,
+    'close':     np.float64,
+    'volume':    np.int64,
+    'numEvents': np.int64,
+    }
+
+# columns of intraday ticks and their types
+TICK_DTYPES = {
+    'time':  'datetime64[ns]',
+    'type':  object,
+    'value': np.float64,
+    'size':  np.int64,
+    }
+
 
 def get_security_id_from_security_data(
         security_data: blpapi.Element,
@@ -45,14 +81,18 @@ def get_security_id_from_security_data(
     return security_id
 
 
-def parse_reference_security_data(security_data) -> pd.DataFrame:
+def parse_reference_security_data(
+        security_data: blpapi.Element,
+        security_id_type: Optional[SecurityIdType] = None,
+        ) -> pd.DataFrame:
     """
     Parse single security data element.
 
     Return pd.DataFrame with one row and multiple columns corresponding
     to the received fields.
     """
-    security_id = get_security_id_from_security_data(security_data)
+    security_id = get_security_id_from_security_data(security_data,
+                                                     security_id_type)
 
     field_data: blpapi.Element = security_data.getElement(FIELD_DATA)
 
@@ -70,7 +110,9 @@ def parse_reference_security_data(security_data) -> pd.DataFrame:
 
 
 def parse_errors(security_data: blpapi.Element,
-                 error_behaviour: ErrorBehaviour) -> Optional[BloombergErrors]:
+                 error_behaviour: ErrorBehaviour,
+                 security_id_type: Optional[SecurityIdType] = None,
+                 ) -> Optional[BloombergErrors]:
     """
     Check if the given security data has any errors and process them
     according to `self._error_behaviour`
@@ -81,7 +123,8 @@ def parse_errors(security_data: blpapi.Element,
     if error_behaviour == ErrorBehaviour.IGNORE:
         return None
 
-    security_id = get_security_id_from_security_data(security_data)
+    security_id = get_security_id_from_security_data(security_data,
+                                                     security_id_type)
     security_errors = BloombergErrors()
 
     if security_data.hasElement(SECURITY_ERROR):
@@ -101,6 +144,32 @@ def parse_errors(security_data: blpapi.Element,
     return security_errors
 
 
+def parse_response_error(security_id: str,
+                         msg: blpapi.Message,
+                         error_behaviour: ErrorBehaviour,
+                         ) -> Optional[BloombergErrors]:
+    """
+    Check if the response of a single-security request (e.g. intraday bars)
+    has responseError, which means that the security is invalid, and
+    process it according to `error_behaviour`
+
+    Return None if exceptions are ignored, otherwise return
+    BloombergErrors instance
+    """
+    if error_behaviour == ErrorBehaviour.IGNORE:
+        return None
+
+    security_errors = BloombergErrors()
+
+    if msg.hasElement(RESPONSE_ERROR):
+        security_errors.invalid_securities.append(security_id)
+
+    if error_behaviour == ErrorBehaviour.RAISE and security_errors:
+        raise BloombergException(security_errors)
+
+    return security_errors
+
+
 def parse_field_exceptions(security_id: str,
                            field_exceptions: blpapi.Element,
                            ) -> Dict[Tuple[str, str], str]:
@@ -196,3 +265,128 @@ def parse_historical_security_data(security_data) -> pd.DataFrame:
             security_df.at[(date, security_id), name] = value
 
     return security_df
+
+
+def parse_market_data(msg: blpapi.Message) -> Dict[str, BloombergValue]:
+    """
+    Parse single subscription message.
+
+    Return dict {field name: field value}
+    """
+    values = {}
+
+    for field in msg.asElement().elements():
+        try:
+            field_name, field_value = parse_field_data(field)
+            values[field_name] = field_value
+
+        # pragma: no cover
+        except blpapi.exception.IndexOutOfRangeException as ex:
+            LOGGER.error(ex)
+
+    return values
+
+
+def parse_intraday_bars(bar_data: blpapi.Element) -> Dict[str, np.ndarray]:
+    """
+    Parse barData element of IntradayBarResponse message.
+
+    Return {column: array} with `BAR_DTYPES` columns; numeric arrays are
+    preallocated and filled in place
+    """
+    bars = bar_data.getElement(BAR_TICK_DATA)
+    num_bars = bars.numValues()
+
+    times = []
+    opens = np.empty(num_bars, BAR_DTYPES['open'])
+    highs = np.empty(num_bars, BAR_DTYPES['high'])
+    lows = np.empty(num_bars, BAR_DTYPES['low'])
+    closes = np.empty(num_bars, BAR_DTYPES['close'])
+    volumes = np.empty(num_bars, BAR_DTYPES['volume'])
+    num_events = np.empty(num_bars, BAR_DTYPES['numEvents'])
+
+    for i, bar in enumerate(bars.values()):
+        times.append(bar.getElementAsDatetime(TIME))
+        opens[i] = bar.getElementAsFloat(OPEN)
+        highs[i] = bar.getElementAsFloat(HIGH)
+        lows[i] = bar.getElementAsFloat(LOW)
+        closes[i] = bar.getElementAsFloat(CLOSE)
+        volumes[i] = bar.getElementAsInteger(VOLUME)
+        num_events[i] = bar.getElementAsInteger(NUM_EVENTS)
+
+    return {
+        'time':      _parse_times(times),
+        'open':      opens,
+        'high':      highs,
+        'low':       lows,
+        'close':     closes,
+        'volume':    volumes,
+        'numEvents': num_events,
+        }
+
+
+def parse_intraday_ticks(tick_data: blpapi.Element) -> Dict[str, np.ndarray]:
+    """
+    Parse tickData element of IntradayTickResponse message.
+
+    Return {column: array} with `TICK_DTYPES` columns; numeric arrays are
+    preallocated and filled in place
+    """
+    ticks = tick_data.getElement(TICK_DATA)
+    num_ticks = ticks.numValues()
+
+    times = []
+    types = np.empty(num_ticks, TICK_DTYPES['type'])
+    values = np.empty(num_ticks, TICK_DTYPES['value'])
+    sizes = np.empty(num_ticks, TICK_DTYPES['size'])
+
+    for i, tick in enumerate(ticks.values()):
+        times.append(tick.getElementAsDatetime(TIME))
+        types[i] = tick.getElementAsString(TYPE)
+        values[i] = tick.getElementAsFloat(VALUE)
+        sizes[i] = tick.getElementAsInteger(SIZE)
+
+    return {
+        'time':  _parse_times(times),
+        'type':  types,
+        'value': values,
+        'size':  sizes,
+        }
+
+
+def concatenate_columns(chunks: List[Dict[str, np.ndarray]],
+                        dtypes: Dict[str, Union[str, type]],
+                        ) -> Dict[str, np.ndarray]:
+    """
+    Concatenate columns of parsed messages; empty typed arrays are
+    returned if there are no chunks
+    """
+    return {
+        name: (np.concatenate([chunk[name] for chunk in chunks])
+               if chunks else np.empty(0, dtype))
+        for name, dtype in dtypes.items()
+        }
+
+
+def to_naive_utc(value: dt.datetime) -> pd.Timestamp:
+    """
+    Convert datetime to naive UTC timestamp, so it can be compared with
+    parsed intraday times; naive datetimes are considered to be in UTC
+    """
+    timestamp = pd.Timestamp(value)
+    if timestamp.tz is not None:
+        timestamp = timestamp.tz_convert(None)
+
+    return timestamp
+
+
+def _parse_times(times: List[dt.datetime]) -> np.ndarray:
+    """
+    Bloomberg returns intraday times in UTC; return them as naive
+    datetime64[ns]
+    """
+    time_index = pd.DatetimeIndex(times)
+    if time_index.tz is not None:
+        time_index = time_index.tz_convert(None)
+
+    return time_index.values.astype('datetime64[ns]')
@@ -0,0 +1,271 @@
+"""
+Opt-in CPU and memory profiling of request parsing and result assembly
+"""
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+import types
+from typing import Any
+from typing import Awaitable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from .utils import log
+
+LOGGER = log.get_logger()
+
+PARSE = 'parse'
+ASSEMBLY = 'assembly'
+
+
+class StageProfile:
+    """
+    Profile and memory usage of one stage of one request type
+    """
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.steps = 0
+
+        # net size of memory blocks allocated during the stage that are
+        # still alive when the step ends
+        self.memory = 0
+        self.max_step_memory = 0
+
+
+class RequestProfiler:
+    """
+    Profiles parsing (`process` of requests) and assembly (merging of
+    chunks in AsyncBloomberg) separately for every request type:
+
+        profiler = RequestProfiler(memory=True)
+        bloomberg = AsyncBloomberg(profiler=profiler)
+        ...
+        print(profiler.format_stats('HistoricalDataRequest'))
+
+    Only the steps of request coroutines are profiled, so time spent by
+    other tasks while the request waits for messages is not counted.
+    cProfile replaces any other profiler that is active in the loop
+    thread.
+
+    If `memory` is True, tracemalloc is started and memory allocated during
+    every stage is attributed to its request type
+    """
+
+    def __init__(self, cpu: bool = True, memory: bool = False):
+        self.cpu = cpu
+        self.memory = memory
+        self.enabled = True
+
+        # {(request type, stage): profile}
+        self._profiles: Dict[Tuple[str, str], StageProfile] = {}
+
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self):
+        """
+        Stop profiling; collected stats are kept
+        """
+        self.enabled = False
+
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def reset(self):
+        self._profiles.clear()
+
+    def _get_profile(self, request_type: str, stage: str) -> StageProfile:
+        profile = self._profiles.get((request_type, stage))
+        if profile is None:
+            profile = self._profiles[(request_type, stage)] = StageProfile()
+
+        return profile
+
+    def _enter(self, profile: StageProfile) -> int:
+        profile.steps += 1
+        start_memory = 0
+
+        if self.memory and tracemalloc.is_tracing():
+            start_memory, _ = tracemalloc.get_traced_memory()
+
+        if self.cpu:
+            profile.profile.enable()
+
+        return start_memory
+
+    def _exit(self, profile: StageProfile, start_memory: int):
+        if self.cpu:
+            profile.profile.disable()
+
+        if self.memory and tracemalloc.is_tracing():
+            memory, _ = tracemalloc.get_traced_memory()
+            profile.memory += memory - start_memory
+            profile.max_step_memory = max(profile.max_step_memory,
+                                          memory - start_memory)
+
+    @contextlib.contextmanager
+    def profile(self, request_type: str, stage: str = ASSEMBLY):
+        """
+        Profile synchronous code inside `with` block
+        """
+        if not self.enabled:
+            yield
+            return
+
+        profile = self._get_profile(request_type, stage)
+        start_memory = self._enter(profile)
+
+        try:
+            yield
+        finally:
+            self._exit(profile, start_memory)
+
+    def wrap(self,
+             request_type: str,
+             coro: Awaitable,
+             stage: str = PARSE) -> Awaitable:
+        """
+        Return awaitable that profiles every step of the given coroutine
+        """
+        if not self.enabled:
+            return coro
+
+        return self._profile_steps(self._get_profile(request_type, stage),
+                                   coro.__await__())
+
+    @types.coroutine
+    def _profile_steps(self, profile: StageProfile, coro_iter: Iterator):
+        value = None
+        exception = None
+
+        while True:
+            start_memory = self._enter(profile)
+
+            try:
+                if exception is None:
+                    future = coro_iter.send(value)
+                else:
+                    future = coro_iter.throw(exception)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self._exit(profile, start_memory)
+
+            try:
+                value = yield future
+                exception = None
+            except BaseException as exc:  # pylint: disable=broad-except
+                value = None
+                exception = exc
+
+    def get_request_types(self) -> List[Tuple[str, str]]:
+        """
+        Return (request type, stage) of all collected profiles
+        """
+        return [key
+                for key, profile in self._profiles.items()
+                if profile.steps]
+
+    def get_stats(self,
+                  request_type: Optional[str] = None,
+                  stage: Optional[str] = None) -> Optional[pstats.Stats]:
+        """
+        Return aggregated stats of all profiles that match the given
+        request type and stage; None if nothing was profiled
+        """
+        stats = None
+
+        for (profile_type, profile_stage), profile in self._profiles.items():
+            if (not profile.steps
+                    or request_type not in (None, profile_type)
+                    or stage not in (None, profile_stage)):
+                continue
+
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile.profile,
+                                         stream=io.StringIO())
+                else:
+                    stats.add(profile.profile)
+            except TypeError:
+                # profile without collected calls, e.g. if cpu is False
+                continue
+
+        return stats
+
+    def format_stats(self,
+                     request_type: Optional[str] = None,
+                     stage: Optional[str] = None,
+                     sort: str = 'cumulative',
+                     limit: int = 30) -> str:
+        """
+        Return the top `limit` functions of aggregated stats as text
+        """
+        stats = self.get_stats(request_type, stage)
+        if stats is None:
+            return ''
+
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats(sort).print_stats(limit)
+
+        return stream.getvalue()
+
+    def dump_stats(self, directory: str) -> List[str]:
+        """
+        Write every collected profile to `<request type>.<stage>.prof`
+        file that can be opened by pstats or snakeviz; return file paths
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+
+        for request_type, stage in self.get_request_types():
+            stats = self.get_stats(request_type, stage)
+            if stats is None:
+                continue
+
+            path = os.path.join(directory, f'{request_type}.{stage}.prof')
+            stats.dump_stats(path)
+            paths.append(path)
+
+        LOGGER.debug('%s: %s profiles saved to %s',
+                     self.__class__.__name__,
+                     len(paths),
+                     directory)
+
+        return paths
+
+    def get_memory_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return {request type: {stage: {steps, memory, max_step_memory}}};
+        memory is in bytes
+        """
+        memory_stats = {}
+
+        for (request_type, stage), profile in self._profiles.items():
+            memory_stats.setdefault(request_type, {})[stage] = {
+                'steps':           profile.steps,
+                'memory':          profile.memory,
+                'max_step_memory': profile.max_step_memory,
+                }
+
+        return memory_stats
+
+    @staticmethod
+    def take_snapshot() -> tracemalloc.Snapshot:
+        """
+        Return tracemalloc snapshot of all currently allocated memory;
+        requires `memory=True`
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError('Please create profiler with memory=True '
+                               'to take memory snapshots')
+
+        return tracemalloc.take_snapshot()
@@ -0,0 +1,426 @@
+"""
+Recording of subscription ticks to disk and their accelerated replay
+"""
+import asyncio
+import datetime as dt
+import glob
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+
+from .market_data import Tick
+from .market_data import TickConsumer
+from .utils import log
+
+LOGGER = log.get_logger()
+
+# every file starts with FILE_MAGIC; every batch is written as its size
+# followed by the encoded batch (see `encode_batch`)
+FILE_MAGIC = b'ABLPTCK1'
+BATCH_SIZE = struct.Struct('<I')
+
+# number of ticks, number of field values and size of json metadata
+BATCH_HEADER = struct.Struct('<III')
+
+# kinds of field values: numbers are stored as 8 bytes in the `numbers`
+# column, other values are stored in json metadata
+FLOAT, INT, BOOL, OTHER = range(4)
+
+# tells the writer thread to flush the file
+_FLUSH = object()
+
+RecordedTick = Tuple[str, Dict[str, Any], float]
+
+
+def get_file_path(path: str, index: int) -> str:
+    """
+    Recorded ticks are stored in files `path.000000`, `path.000001` etc.
+    """
+    return f'{path}.{index:06d}'
+
+
+def get_recorded_files(path: str) -> List[str]:
+    """
+    Return all files of the recording in the order they were written
+    """
+    return sorted(glob.glob(glob.escape(path) + '.' + '[0-9]' * 6))
+
+
+def _encode_json(value):
+    if isinstance(value, dt.datetime):
+        return {'$datetime': value.isoformat()}
+    if isinstance(value, dt.date):
+        return {'$date': value.isoformat()}
+    if isinstance(value, dt.time):
+        return {'$time': value.isoformat()}
+
+    return str(value)
+
+
+def _decode_json(value: dict):
+    if len(value) == 1:
+        if '$datetime' in value:
+            return dt.datetime.fromisoformat(value['$datetime'])
+        if '$date' in value:
+            return dt.date.fromisoformat(value['$date'])
+        if '$time' in value:
+            return dt.time.fromisoformat(value['$time'])
+
+    return value
+
+
+def encode_batch(batch: List[RecordedTick]) -> bytes:
+    """
+    Encode ticks column by column: times, security names and numbers of
+    values of all ticks, then field names, kinds and values of all field
+    values. Names and non-numeric values are kept in json metadata, values
+    that can't be stored in json are converted to strings
+    """
+    num_ticks = len(batch)
+    num_values = sum(len(values) for _, values, _ in batch)
+
+    # {name: position in metadata}
+    names: Dict[str, int] = {}
+    other = []
+
+    times = np.empty(num_ticks, '<f8')
+    securities = np.empty(num_ticks, '<u4')
+    counts = np.empty(num_ticks, '<u4')
+    fields = np.empty(num_values, '<u4')
+    kinds = np.empty(num_values, 'u1')
+    numbers = np.zeros(num_values, '<i8')
+    floats = numbers.view('<f8')
+
+    position = 0
+    for i, (security, values, time_) in enumerate(batch):
+        times[i] = time_
+        securities[i] = names.setdefault(security, len(names))
+        counts[i] = len(values)
+
+        for field, value in values.items():
+            fields[position] = names.setdefault(field, len(names))
+
+            if isinstance(value, bool):
+                kinds[position] = BOOL
+                numbers[position] = value
+            elif (isinstance(value, (int, np.integer))
+                  and -2 ** 63 <= value < 2 ** 63):
+                kinds[position] = INT
+                numbers[position] = value
+            elif isinstance(value, float):
+                kinds[position] = FLOAT
+                floats[position] = value
+            else:
+                kinds[position] = OTHER
+                numbers[position] = len(other)
+                other.append(value)
+
+            position += 1
+
+    metadata = json.dumps({'names': list(names), 'other': other},
+                          default=_encode_json).encode()
+
+    return b''.join([BATCH_HEADER.pack(num_ticks, num_values, len(metadata)),
+                     metadata,
+                     times.tobytes(),
+                     securities.tobytes(),
+                     counts.tobytes(),
+                     fields.tobytes(),
+                     kinds.tobytes(),
+                     numbers.tobytes()])
+
+
+def decode_batch(data: bytes) -> Iterator[Tick]:
+    """
+    Decode ticks encoded by `encode_batch`
+    """
+    num_ticks, num_values, metadata_size = BATCH_HEADER.unpack_from(data)
+    offset = BATCH_HEADER.size
+
+    metadata = json.loads(data[offset:offset + metadata_size].decode(),
+                          object_hook=_decode_json)
+    offset += metadata_size
+
+    columns = []
+    for dtype, size in (('<f8', num_ticks),
+                        ('<u4', num_ticks),
+                        ('<u4', num_ticks),
+                        ('<u4', num_values),
+                        ('u1', num_values),
+                        ('<i8', num_values)):
+        column = np.frombuffer(data, dtype, size, offset)
+        offset += column.nbytes
+        columns.append(column)
+
+    times, securities, counts, fields, kinds, numbers = columns
+    floats = numbers.view('<f8').tolist()
+    fields, kinds, numbers = fields.tolist(), kinds.tolist(), numbers.tolist()
+    names, other = metadata['names'], metadata['other']
+
+    start = 0
+    for time_, security, count in zip(times.tolist(),
+                                      securities.tolist(),
+                                      counts.tolist()):
+        values = {}
+
+        for position in range(start, start + count):
+            kind = kinds[position]
+
+            if kind == FLOAT:
+                value = floats[position]
+            elif kind == INT:
+                value = numbers[position]
+            elif kind == BOOL:
+                value = bool(numbers[position])
+            else:
+                value = other[numbers[position]]
+
+            values[names[fields[position]]] = value
+
+        start += count
+        yield Tick(names[security], values, time_)
+
+
+def read_ticks(path: str) -> Iterator[Tick]:
+    """
+    Read all ticks recorded by `TickRecorder` with the given path
+    """
+    for file_path in get_recorded_files(path):
+        with open(file_path, 'rb') as file:
+            if file.read(len(FILE_MAGIC)) != FILE_MAGIC:
+                raise ValueError(f'{file_path} is not a tick recording')
+
+            while True:
+                header = file.read(BATCH_SIZE.size)
+                if len(header) < BATCH_SIZE.size:
+                    break
+
+                batch_size, = BATCH_SIZE.unpack(header)
+                batch = file.read(batch_size)
+                if len(batch) < batch_size:
+                    LOGGER.warning('%s: truncated batch at the end of %s',
+                                   read_ticks.__name__,
+                                   file_path)
+                    break
+
+                yield from decode_batch(batch)
+
+
+class TickRecorder(TickConsumer):
+    """
+    Appends all received ticks to a binary log.
+
+    Ticks are collected into batches of `batch_size` ticks; batches are
+    encoded and written by a separate writer thread, so the thread that
+    puts ticks (e.g. Bloomberg thread) doesn't wait for the disk. Every
+    batch is written with one `write` call. When file grows bigger than
+    `max_file_size` bytes, the next file is started; files are named
+    `path.000000`, `path.000001` etc. Use `read_ticks` or `TickReplay`
+    to read them.
+
+    Call `close` to write the last incomplete batch
+    """
+
+    def __init__(self,
+                 path: str,
+                 batch_size: int = 1000,
+                 max_file_size: int = 64 * 1024 * 1024,
+                 ):
+        self.path = path
+        self._batch_size = batch_size
+        self._max_file_size = max_file_size
+
+        self._lock = threading.Lock()
+        self._batch: List[RecordedTick] = []
+
+        # writer thread and its queue of batches; both are created when
+        # the first batch is sent
+        self._writer: Optional[threading.Thread] = None
+        self._queue: Optional[queue.Queue] = None
+
+        existing_files = get_recorded_files(path)
+        self._file_index = len(existing_files)
+        self._file = None
+        self._file_size = 0
+
+        self.num_ticks = 0
+
+    def put(self, tick: Tick):
+        with self._lock:
+            # values are copied because tick may be changed by conflation
+            self._batch.append((tick.security, dict(tick.values), tick.time))
+            self.num_ticks += 1
+
+            if len(self._batch) >= self._batch_size:
+                self._send_batch()
+
+    def flush(self):
+        """
+        Write all collected ticks to disk and wait until they are written
+        """
+        with self._lock:
+            self._send_batch()
+            self._start_writer()
+            batches = self._queue
+            batches.put(_FLUSH)
+
+        batches.join()
+
+    def close(self):
+        """
+        Write all collected ticks, close the file and stop the writer
+        thread; recording is continued in the next file if new ticks
+        are received
+        """
+        with self._lock:
+            self._send_batch()
+
+            if self._writer is not None:
+                self._queue.put(None)
+                self._writer.join()
+                self._writer = self._queue = None
+
+    def _send_batch(self):
+        """
+        Must be called under `self._lock`
+        """
+        if not self._batch:
+            return
+
+        self._start_writer()
+        self._queue.put(self._batch)
+        self._batch = []
+
+    def _start_writer(self):
+        """
+        Must be called under `self._lock`
+        """
+        if self._writer is not None:
+            return
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_batches,
+                                        args=(self._queue,),
+                                        name=f'TickRecorder({self.path})',
+                                        daemon=True)
+        self._writer.start()
+
+    def _write_batches(self, batches: queue.Queue):
+        """
+        Writer thread: write batches until None is received
+        """
+        while True:
+            batch = batches.get()
+
+            try:
+                if batch is None:
+                    self._close_file()
+                    return
+
+                if batch is _FLUSH:
+                    if self._file is not None:
+                        self._file.flush()
+                else:
+                    self._write_batch(batch)
+
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception('%s: failed to write ticks to %s',
+                                 self.__class__.__name__,
+                                 self.path)
+            finally:
+                batches.task_done()
+
+    def _write_batch(self, batch: List[RecordedTick]):
+        data = encode_batch(batch)
+
+        if self._file is None or self._file_size >= self._max_file_size:
+            self._open_next_file()
+
+        self._file.write(BATCH_SIZE.pack(len(data)) + data)
+        self._file_size += BATCH_SIZE.size + len(data)
+
+    def _open_next_file(self):
+        self._close_file()
+
+        file_path = get_file_path(self.path, self._file_index)
+        self._file_index += 1
+
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._file = open(file_path, 'wb')
+        self._file.write(FILE_MAGIC)
+        self._file_size = len(FILE_MAGIC)
+
+        LOGGER.debug('%s: writing ticks to %s',
+                     self.__class__.__name__,
+                     file_path)
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class TickReplay:
+    """
+    Sends recorded ticks to consumers, e.g. `SubscriptionHandler` or
+    `TickStream`, keeping the original intervals between ticks divided
+    by `speed`. If `speed` is None, ticks are sent as fast as possible.
+
+    Ticks keep their original receive time
+    """
+
+    def __init__(self,
+                 path: str,
+                 consumers: Iterable[TickConsumer],
+                 speed: Optional[float] = 1,
+                 ):
+        if speed is not None and speed <= 0:
+            raise ValueError('speed must be positive')
+
+        self.path = path
+        self._consumers = list(consumers)
+        self.speed = speed
+        self.num_ticks = 0
+
+    async def run(self):
+        """
+        Send all recorded ticks; return when the last tick is sent
+        """
+        first_tick_time = None
+        start_time = time.monotonic()
+
+        for tick in read_ticks(self.path):
+            if self.speed is not None:
+                if first_tick_time is None:
+                    first_tick_time = tick.time
+
+                send_time = (start_time
+                             + (tick.time - first_tick_time) / self.speed)
+                delay = send_time - time.monotonic()
+
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            for consumer in self._consumers:
+                consumer.put(tick)
+
+            self.num_ticks += 1
+
+            # let other tasks run even if no delays are required
+            if self.num_ticks % 1000 == 0:
+                await asyncio.sleep(0)
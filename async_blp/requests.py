@@ -7,6 +7,7 @@ from collections import defaultdict
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Sequence
 from typing import Tuple
 from typing import Union
 
@@ -14,14 +15,24 @@ import pandas as pd
 
 from .base_request import RequestBase
 from .enums import ErrorBehaviour
+from .enums import RequestStage
 from .enums import SecurityIdType
 from .errors import BloombergErrors
+from .parser import BAR_DTYPES
+from .parser import TICK_DTYPES
+from .parser import concatenate_columns
 from .parser import parse_errors
 from .parser import parse_field_data
 from .parser import parse_historical_security_data
+from .parser import parse_intraday_bars
+from .parser import parse_intraday_ticks
 from .parser import parse_reference_security_data
+from .parser import parse_response_error
 from .utils import log
+from .utils.blp_name import BAR_DATA
+from .utils.blp_name import RESPONSE_ERROR
 from .utils.blp_name import SECURITY_DATA
+from .utils.blp_name import TICK_DATA
 
 # pylint: disable=ungrouped-imports
 try:
@@ -51,6 +62,10 @@ class ReferenceDataRequest(RequestBase):
                  error_behavior: ErrorBehaviour = ErrorBehaviour.RETURN,
                  loop: asyncio.AbstractEventLoop = None):
 
+        # response contains securities with type prefix, but user expects
+        # to see securities exactly as they were requested
+        self._security_ids = securities
+
         if security_id_type is not None:
             securities = [security_id_type.add_type(security)
                           for security in securities]
@@ -81,7 +96,7 @@ class ReferenceDataRequest(RequestBase):
         as security_ids.
         """
         data_frame = pd.DataFrame(columns=self._fields,
-                                  index=self.securities)
+                                  index=self._security_ids)
         errors = BloombergErrors()
 
         while True:
@@ -96,17 +111,20 @@ class ReferenceDataRequest(RequestBase):
             msg_data = list(security_data_element.values())
 
             for security_data in msg_data:
-                msg_frame = parse_reference_security_data(security_data)
+                msg_frame = parse_reference_security_data(
+                    security_data, self._security_id_type)
                 index = msg_frame.index
                 columns = msg_frame.columns
 
                 data_frame.loc[index, columns] = msg_frame
 
                 security_errors = parse_errors(security_data,
-                                               self._error_behaviour)
+                                               self._error_behaviour,
+                                               self._security_id_type)
                 if security_errors is not None:
                     errors += security_errors
 
+        self.mark(RequestStage.PROCESSED)
         return data_frame, errors
 
     @property
@@ -201,71 +219,328 @@ class HistoricalDataRequest(RequestBase):
             if security_errors is not None:
                 errors += security_errors
 
+        self.mark(RequestStage.PROCESSED)
+        return data_frame, errors
+
+
+class IntradayBarRequest(RequestBase):
+    """
+    Intraday OHLCV bars of one security; `interval` is bar size in minutes,
+    times are in UTC
+    """
+    service_name = "//blp/refdata"
+    request_name = "IntradayBarRequest"
+    receives_response_errors = True
+
+    # pylint: disable=too-many-arguments
+    def __init__(self,
+                 security: str,
+                 start_datetime: dt.datetime,
+                 end_datetime: dt.datetime,
+                 interval: int = 1,
+                 event_type: str = 'TRADE',
+                 security_id_type: Optional[SecurityIdType] = None,
+                 options: Optional[Dict] = None,
+                 error_behavior: ErrorBehaviour = ErrorBehaviour.RETURN,
+                 loop: asyncio.AbstractEventLoop = None):
+
+        self.security = security
+
+        if security_id_type is not None:
+            security = security_id_type.add_type(security)
+
+        request_options = {
+            'security':      security,
+            'eventType':     event_type,
+            'interval':      interval,
+            'startDateTime': start_datetime,
+            'endDateTime':   end_datetime,
+            }
+
+        if options:
+            request_options.update(options)
+
+        super().__init__(request_options, error_behavior, loop)
+
+        self._start_datetime = start_datetime
+        self._end_datetime = end_datetime
+        self._interval = interval
+
+    @property
+    def weight(self):
+        """
+        Approximate number of returned bars
+        """
+        duration = self._end_datetime - self._start_datetime
+        return max(int(duration.total_seconds() / 60 / self._interval), 1)
+
+    async def process(self) -> Tuple[pd.DataFrame, BloombergErrors]:
+        """
+        Asynchronously process events from `msg_queue` until the event with
+        event type RESPONSE is received.
+
+        Return format is pd.DataFrame with time index and open, high, low,
+        close, volume, numEvents columns
+        """
+        chunks = []
+        errors = BloombergErrors()
+
+        while True:
+            msg: blpapi.Message = await self._get_message_from_queue()
+
+            if msg is None:
+                break
+
+            if msg.hasElement(RESPONSE_ERROR):
+                security_errors = parse_response_error(self.security,
+                                                       msg,
+                                                       self._error_behaviour)
+                if security_errors is not None:
+                    errors += security_errors
+                continue
+
+            chunks.append(parse_intraday_bars(msg.getElement(BAR_DATA)))
+
+        columns = concatenate_columns(chunks, BAR_DTYPES)
+
+        times = columns.pop('time')
+        data_frame = pd.DataFrame(columns,
+                                  index=pd.DatetimeIndex(times, name='time'))
+
+        self.mark(RequestStage.PROCESSED)
+        return data_frame, errors
+
+
+class IntradayTickRequest(RequestBase):
+    """
+    Intraday ticks of one security: time, type, value and size of every
+    event of `event_types`; times are in UTC.
+
+    Tick history of a long period is large, so AsyncBloomberg splits it
+    into several requests of shorter time windows
+    """
+    service_name = "//blp/refdata"
+    request_name = "IntradayTickRequest"
+    receives_response_errors = True
+
+    # pylint: disable=too-many-arguments
+    def __init__(self,
+                 security: str,
+                 start_datetime: dt.datetime,
+                 end_datetime: dt.datetime,
+                 event_types: Sequence[str] = ('TRADE',),
+                 security_id_type: Optional[SecurityIdType] = None,
+                 options: Optional[Dict] = None,
+                 error_behavior: ErrorBehaviour = ErrorBehaviour.RETURN,
+                 loop: asyncio.AbstractEventLoop = None):
+
+        self.security = security
+
+        if security_id_type is not None:
+            security = security_id_type.add_type(security)
+
+        request_options = {
+            'security':      security,
+            'eventTypes':    list(event_types),
+            'startDateTime': start_datetime,
+            'endDateTime':   end_datetime,
+            }
+
+        if options:
+            request_options.update(options)
+
+        super().__init__(request_options, error_behavior, loop)
+
+        self.start_datetime = start_datetime
+        self.end_datetime = end_datetime
+        self._num_event_types = len(event_types)
+
+    @property
+    def weight(self):
+        """
+        Number of minutes of requested ticks for every event type
+        """
+        duration = self.end_datetime - self.start_datetime
+        minutes = max(int(duration.total_seconds() / 60), 1)
+        return minutes * self._num_event_types
+
+    async def process(self) -> Tuple[pd.DataFrame, BloombergErrors]:
+        """
+        Asynchronously process events from `msg_queue` until the event with
+        event type RESPONSE is received.
+
+        Return format is pd.DataFrame with time index and type, value,
+        size columns
+        """
+        chunks = []
+        errors = BloombergErrors()
+
+        while True:
+            msg: blpapi.Message = await self._get_message_from_queue()
+
+            if msg is None:
+                break
+
+            if msg.hasElement(RESPONSE_ERROR):
+                security_errors = parse_response_error(self.security,
+                                                       msg,
+                                                       self._error_behaviour)
+                if security_errors is not None:
+                    errors += security_errors
+                continue
+
+            chunks.append(parse_intraday_ticks(msg.getElement(TICK_DATA)))
+
+        columns = concatenate_columns(chunks, TICK_DTYPES)
+
+        times = columns.pop('time')
+        data_frame = pd.DataFrame(columns,
+                                  index=pd.DatetimeIndex(times, name='time'))
+
+        self.mark(RequestStage.PROCESSED)
         return data_frame, errors
 
 
 class Subscription(ReferenceDataRequest):
     """
-    Subscription for market data, parse response and save until async call
-    work only with one security
+    Subscription for market data for one or several securities; all
+    securities are subscribed to the same fields
+
+    `interval` asks Bloomberg to send updates not more often than once
+    per `interval` seconds; other Bloomberg subscription options can be
+    passed using `options`, e.g. {'delayed': 'true'}.
+
+    `conflation_interval` is applied on the client side: all ticks of
+    a security received within this interval are merged into one tick
+    before they are sent to consumers
+
+    If `history_size` is positive, the last `history_size` numeric values
+    of every field are kept
+
+    Subscriptions with low `priority` are shed first when the client
+    is slow (see `SlowConsumerPolicy`)
+
+    If `delta` is True, consumers receive only fields whose values differ
+    from the last received ones; ticks without changes are not sent
+
+    Ticks of one security are shared by all its subscriptions, so delta
+    and conflation are applied only if every subscription of the security
+    asks for them; history is kept while any subscription needs it
     """
     service_name = '//blp/mktdata'
 
+    # pylint: disable=too-many-arguments
     def __init__(self,
-                 security: str,
+                 securities: Union[str, List[str]],
                  fields: List[str],
                  security_id_type: Optional[SecurityIdType] = None,
                  overrides: Optional[Dict] = None,
                  error_behavior: ErrorBehaviour = ErrorBehaviour.RETURN,
                  loop: asyncio.AbstractEventLoop = None,
+                 interval: Optional[float] = None,
+                 options: Optional[Union[List[str], Dict[str, str]]] = None,
+                 conflation_interval: Optional[float] = None,
+                 history_size: int = 0,
+                 priority: int = 0,
+                 delta: bool = False,
                  ):
-        super().__init__([security],
+        if isinstance(securities, str):
+            securities = [securities]
+
+        super().__init__(securities,
                          fields,
                          security_id_type,
                          overrides,
                          error_behavior,
                          loop)
 
-    def create_subscription(
-            self,
-            corr_id: blpapi.CorrelationId) -> blpapi.SubscriptionList:
-        subscription = blpapi.SubscriptionList()
-        for security in self.securities:
-            subscription.add(security,
-                             self._fields,
-                             correlationId=corr_id)
+        if isinstance(options, dict):
+            options = [f'{name}={value}' for name, value in options.items()]
 
-        return subscription
+        self.options: List[str] = list(options or [])
 
-    def create(self, service: blpapi.Service) -> blpapi.Request:
-        raise RuntimeError('Please use `create_subscription`')
+        if interval is not None:
+            self.options.append(f'interval={interval}')
 
-    async def process(self) -> pd.DataFrame:
+        self.conflation_interval = conflation_interval
+        self.history_size = history_size
+        self.priority = priority
+        self.delta = delta
+
+    @property
+    def fields(self) -> List[str]:
+        return self._fields
+
+    @fields.setter
+    def fields(self, fields: List[str]):
+        self._fields = list(fields)
+
+    def copy(self, securities: List[str]) -> 'Subscription':
         """
-        Asynchronously process events from `msg_queue` until the event will
-        ended
+        Return subscription of the given securities with the same fields
+        and settings; securities must already have type prefix
+        """
+        return Subscription(securities,
+                            self._fields,
+                            overrides=self._overrides,
+                            error_behavior=self._error_behaviour,
+                            loop=self._loop,
+                            options=self.options,
+                            conflation_interval=self.conflation_interval,
+                            history_size=self.history_size,
+                            priority=self.priority,
+                            delta=self.delta)
 
-        Return format is pd.DataFrame with columns as fields and indexes
-        as security_ids.
+    def create_subscription(
+            self,
+            corr_id: Union[blpapi.CorrelationId,
+                           Dict[str, blpapi.CorrelationId]],
+            subscription_list: Optional[blpapi.SubscriptionList] = None,
+            ) -> blpapi.SubscriptionList:
         """
-        data = defaultdict(dict)
+        Add securities to `subscription_list`; new list is created if
+        it is not provided.
 
-        while not self._msg_queue.empty():
-            LOGGER.debug('%s: waiting for messages', self.__class__.__name__)
-            msg: blpapi.Message = self._msg_queue.get_nowait()
+        `corr_id` is either one correlation id for all securities or
+        {security: correlation id}; in the latter case only securities
+        from the dict are added
+        """
+        if subscription_list is None:
+            subscription_list = blpapi.SubscriptionList()
 
-            security_data_element = msg.asElement()
-            for field in security_data_element.elements():
-                try:
-                    field_name, field_value = parse_field_data(field)
-                    isin = self.securities[0]
-                    data[field_name][isin] = field_value
+        for security in self.securities:
+            if isinstance(corr_id, dict):
+                security_corr_id = corr_id.get(security)
+                if security_corr_id is None:
+                    continue
+            else:
+                security_corr_id = corr_id
+
+            subscription_list.add(security,
+                                  self._fields,
+                                  self.options or None,
+                                  correlationId=security_corr_id)
+
+        return subscription_list
+
+    def get_topic_key(self, security: str) -> Tuple[str,
+                                                    Tuple[str, ...],
+                                                    Tuple[str, ...]]:
+        """
+        Subscriptions with the same topic key receive the same data from
+        Bloomberg and can share one upstream subscription
+        """
+        return (security,
+                tuple(sorted(self._fields)),
+                tuple(sorted(self.options)))
 
-                # pragma: no cover
-                except blpapi.exception.IndexOutOfRangeException as ex:
-                    LOGGER.error(ex)
+    def create(self, service: blpapi.Service) -> blpapi.Request:
+        raise RuntimeError('Please use `create_subscription`')
 
-        return pd.DataFrame(data)
+    async def process(self):
+        raise RuntimeError('Subscription data is processed by its handler, '
+                           'please use `read_subscriptions` or '
+                           '`stream_subscriptions`')
 
 
 class FieldSearchRequest(RequestBase):
@@ -358,6 +633,7 @@ class FieldSearchRequest(RequestBase):
                         # description = "Theta Last Price"
                         data[name][id_value] = value
 
+        self.mark(RequestStage.PROCESSED)
         return pd.DataFrame(data), BloombergErrors()
 
     @property
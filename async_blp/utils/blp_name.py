@@ -30,3 +30,16 @@ CATEGORY_NAME = blpapi.Name("categoryName")
 CATEGORY_ID = blpapi.Name("categoryId")
 EXCLUDE = blpapi.Name("exclude")
 FIELD_EXCEPTIONS = blpapi.Name('fieldExceptions')
+BAR_DATA = blpapi.Name('barData')
+BAR_TICK_DATA = blpapi.Name('barTickData')
+TIME = blpapi.Name('time')
+OPEN = blpapi.Name('open')
+HIGH = blpapi.Name('high')
+LOW = blpapi.Name('low')
+CLOSE = blpapi.Name('close')
+VOLUME = blpapi.Name('volume')
+NUM_EVENTS = blpapi.Name('numEvents')
+TICK_DATA = blpapi.Name('tickData')
+TYPE = blpapi.Name('type')
+VALUE = blpapi.Name('value')
+SIZE = blpapi.Name('size')
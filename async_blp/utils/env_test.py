@@ -6,14 +6,29 @@ try:
     import blpapi
 except ImportError:
     from async_blp import env_test as blpapi
+
+For load tests, enable emulator that generates Bloomberg responses and
+subscription ticks:
+
+env_test.enable_emulator(env_test.EmulatorConfig(latency=0.01))
+bloomberg = AsyncBloomberg()
 """
+import datetime as dt
 import enum
+import itertools
 import queue
+import random
 import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any
 from typing import Callable
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Set
+from typing import Tuple
 from typing import Union
 
 from . import log
@@ -31,6 +46,10 @@ class SubscriptionList:
     Each Subscription is for one asset
     """
 
+    def __init__(self):
+        # doesn't exist in blpapi; for testing purposes only
+        self.topics = []
+
     def add(self,
             topic,
             fields=None,
@@ -43,6 +62,13 @@ class SubscriptionList:
         correlationId (CorrelationId): Correlation id to associate with the
         subscription
         """
+        self.topics.append((topic, fields, options, correlationId))
+
+    def size(self):
+        """
+        Return the number of subscriptions in this list
+        """
+        return len(self.topics)
 
     def append(self, other):
         """Append a copy of the specified :class:`SubscriptionList` to this
@@ -51,6 +77,7 @@ class SubscriptionList:
         Args:
             other (SubscriptionList): List to append to this one
         """
+        self.topics.extend(other.topics)
 
 
 class Event:
@@ -155,7 +182,7 @@ class Service:
         :param requestName:
         :return:
         """
-        return Request()
+        return Request(requestName)
 
     @staticmethod
     def toString(level=0, spacesPerLevel=4):
@@ -170,12 +197,24 @@ class Request:
     object contains the parameters for a single request
     """
 
-    @staticmethod
-    def set(key, value):
+    def __init__(self, name=None):
+        # doesn't exist in blpapi; emulator uses them to create responses
+        self.name = name
+        self.elements: Dict[str, Any] = {}
+
+    def set(self, key, value):
         """
         Equivalent to :meth:`asElement().setElement(name, value)
                <Element.setElement>`.
         """
+        self.elements[key] = value
+
+    def append(self, key, value):
+        """
+        Equivalent to :meth:`getElement(name).appendValue(value)
+               <Element.appendValue>`.
+        """
+        self.elements.setdefault(key, []).append(value)
 
     @staticmethod
     def getElement(*args, **kwargs):
@@ -184,6 +223,9 @@ class Request:
         """
         return Element()
 
+    def __str__(self):
+        return f'{self.name} = {self.elements}'
+
 
 class Message:
     """
@@ -336,6 +378,21 @@ class Element:
         """
         return self.getElement(element_name).getValue()
 
+    def getElementAsFloat(self, element_name: str) -> float:
+        return self.getElement(element_name).getValue()
+
+    def getElementAsInteger(self, element_name: str) -> int:
+        return self.getElement(element_name).getValue()
+
+    def getElementAsDatetime(self, element_name: str) -> dt.datetime:
+        return self.getElement(element_name).getValue()
+
+    def numValues(self) -> int:
+        """
+        Number of values in array element
+        """
+        return len(self.elements())
+
     def name(self):
         """
         blpapi use func instead attr
@@ -373,33 +430,101 @@ class Session:
 
         self.options = options
         self.handler = eventHandler
-        self.events = queue.Queue()
+
+        # emulator that was enabled when session was created
+        self._emulator = _EMULATOR
+
+        # (time to send, sequence number, event); events are sent to the
+        # handler one by one from a single worker thread, like in blpapi
+        self.events = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._worker: Optional[threading.Thread] = None
+
+        # subscribed topics: {correlation id: (topic, fields)}
+        self._topics: Dict[CorrelationId, Tuple[str, List[str]]] = {}
+        self._ticker: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+        # correlation ids of cancelled requests
+        self._cancelled: Set[CorrelationId] = set()
 
     def startAsync(self):
         """
         In real blpapi: start Bloomberg session in a separate thread.
-        For tests: do nothing, threads will be created later where necessary
+        For tests: do nothing, the worker thread is created on the first
+        event. If emulator is enabled, send SessionStarted
+        """
+        if self._emulator is not None:
+            self.send_event(Event(Event.SESSION_STATUS,
+                                  [Message('SessionStarted', 0)]))
+
+    def stopAsync(self):
+        """
+        Stop the session; SessionTerminated is the last event that
+        the handler receives
         """
+        self._stopped.set()
+        self.send_event(Event(Event.SESSION_STATUS,
+                              [Message('SessionTerminated', 0)]))
+
+        # stop the worker thread after the last event
+        self.events.put((time.monotonic(), next(self._sequence), None))
 
     def _async_start(self, handler: Callable[['Event', 'Session'], None]):
         """
         Doesn't exists in blpapi; for testing purposes only
-        Send all events from `self.events` to the handler one by one.
-        """
-        while not self.events.empty():
-            event = self.events.get(timeout=1)
+        Send all events from `self.events` to the handler one by one
+        when their time comes
+        """
+        while True:
+            send_time, _, event = self.events.get()
+            if event is None:
+                break
+
+            if (self._cancelled
+                    and event.eventType() in (Event.PARTIAL_RESPONSE,
+                                              Event.RESPONSE)
+                    and all(corr_id in self._cancelled
+                            for msg in event
+                            for corr_id in msg.correlationIds())):
+                continue
+
+            delay = send_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
             LOGGER.debug('Calling handler with %s', event.eventType())
-            handler(event, Session())
 
-    def openServiceAsync(self, *args, **kwargs):
+            # blpapi doesn't stop if handler raises an exception
+            try:
+                handler(event, self)
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception('Handler failed to process %s',
+                                 event.eventType())
+
+            if self._emulator is not None and \
+                    event.eventType() in (Event.PARTIAL_RESPONSE,
+                                          Event.RESPONSE):
+                self._emulator.record_response(event)
+
+    def openServiceAsync(self, serviceName, *args, **kwargs):
         """
-        Before you can get a Service you need to open it
+        Before you can get a Service you need to open it.
+        If emulator is enabled, send ServiceOpened
         """
+        if self._emulator is not None:
+            msg = Message('ServiceOpened', 0,
+                          children={
+                              'serviceName': Element('serviceName',
+                                                     serviceName)
+                              })
+            self.send_event(Event(Event.SERVICE_STATUS, [msg]))
 
-    def send_event(self, event_: Event):
+    def send_event(self, event_: Event, delay: float = 0):
         """
         Doesn't exists in blpapi; for testing purposes only
-        Create new thread and send provided event to the handler
+        Send provided event to the handler from the worker thread
+        after `delay` seconds
 
         Events must be send in the following order:
         1) SESSION_STATUS
@@ -408,15 +533,36 @@ class Session:
         4) RESPONSE
 
         """
-        self.events.put(event_)
-        thread = threading.Thread(target=self._async_start,
-                                  args=(self.handler,))
-        thread.start()
+        self.events.put((time.monotonic() + delay,
+                         next(self._sequence),
+                         event_))
+
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._async_start,
+                                            args=(self.handler,),
+                                            daemon=True)
+            self._worker.start()
 
     def sendRequest(self, request, correlationId: CorrelationId):
         """
-        if all preparations are done you can send it and wait RESPONSE event
+        if all preparations are done you can send it and wait RESPONSE event.
+        If emulator is enabled, generated responses are sent
         """
+        if self._emulator is None:
+            return
+
+        self._emulator.record_request(correlationId)
+
+        for delay, event_ in self._emulator.create_response_events(
+                request, correlationId):
+            self.send_event(event_, delay)
+
+    def cancel(self, correlationId: CorrelationId):
+        """
+        Cancel the request with the given correlation id; its responses
+        that were not sent yet are dropped
+        """
+        self._cancelled.add(correlationId)
 
     @staticmethod
     def getService(*args, **kwargs):
@@ -433,7 +579,501 @@ class Session:
         identity (Identity): Identity used for authorization
         requestLabel (str): String which will be recorded along with any
         diagnostics for this operation
+
+        If emulator is enabled, ticks of the subscribed topics are sent
+        """
+        if self._emulator is None:
+            return
+
+        msgs = []
+        for topic, fields, _, corr_id in subscriptionList.topics:
+            self._topics[corr_id] = (topic, _get_list(fields))
+            msgs.append(Message('SubscriptionStarted', 0,
+                                correlationId=corr_id))
+
+        self.send_event(Event(Event.SUBSCRIPTION_STATUS, msgs))
+
+        if self._ticker is None:
+            self._ticker = threading.Thread(target=self._send_ticks,
+                                            daemon=True)
+            self._ticker.start()
+
+    def unsubscribe(self, subscriptionList):
+        """
+        Cancel subscriptions with correlation ids from the given list;
+        no further messages are received for them
+        """
+        for *_, corr_id in subscriptionList.topics:
+            self._topics.pop(corr_id, None)
+
+    def resubscribe(self, subscriptionList, requestLabel=""):
+        """
+        Modify options and fields of existing subscriptions; correlation
+        ids must belong to already subscribed topics
+        """
+        for topic, fields, _, corr_id in subscriptionList.topics:
+            if corr_id in self._topics:
+                self._topics[corr_id] = (topic, _get_list(fields))
+
+    def _send_ticks(self):
+        """
+        Doesn't exists in blpapi; for testing purposes only
+        Send ticks of the subscribed topics until session is stopped
         """
+        emulator = self._emulator
+        interval = (emulator.config.ticks_per_event
+                    / emulator.config.ticks_per_second)
+
+        while not self._stopped.wait(interval):
+            topics = list(self._topics.items())
+            if not topics:
+                continue
+
+            msgs = [emulator.create_market_data_message(topic, fields, corr_id)
+                    for corr_id, (topic, fields)
+                    in emulator.choose_topics(topics)]
+            self.send_event(Event(Event.SUBSCRIPTION_DATA, msgs))
+
+
+def _get_list(value) -> List:
+    if value is None:
+        return []
+
+    if isinstance(value, str):
+        return value.split(',')
+
+    return list(value)
+
+
+@dataclass
+class EmulatorConfig:
+    """
+    Parameters of the generated Bloomberg responses
+    """
+    seed: int = 0
+
+    # delay before the first response event and maximal number of
+    # response events per second; None means no limit
+    latency: float = 0.001
+    events_per_second: Optional[float] = None
+
+    # number of securities in one ReferenceDataResponse message; in
+    # HistoricalDataResponse every message contains one security
+    securities_per_message: int = 10
+
+    # fields that contain bulk data and number of rows of every value
+    bulk_fields: Tuple[str, ...] = ()
+    bulk_size: int = 10
+
+    # share of invalid securities and fields; invalid securities and
+    # fields are chosen using hash of their names, so they stay invalid
+    # in all requests
+    invalid_security_rate: float = 0
+    invalid_field_rate: float = 0
+
+    # share of requests that fail with responseError
+    response_error_rate: float = 0
+
+    # maximal number of bars in one IntradayBarResponse message
+    bars_per_message: int = 1000
+
+    # IntradayTickResponse: number of ticks of every event type per minute
+    # and maximal number of ticks in one message
+    intraday_ticks_per_minute: float = 6
+    intraday_ticks_per_message: int = 1000
+
+    # subscriptions: total number of ticks per second for all topics,
+    # number of ticks in one event and number of changed fields in one tick
+    ticks_per_second: float = 1000
+    ticks_per_event: int = 10
+    fields_per_tick: int = 3
+
+    # if set, every tick contains its creation time (time.time()) in this
+    # field, so consumers can measure tick latency
+    time_field: Optional[str] = None
+
+    # record when every request was received and when its first and last
+    # responses were processed by the handler (see `Emulator.timestamps`)
+    record_timestamps: bool = False
+
+
+def _get_fraction(name: str) -> float:
+    """
+    Stable pseudo-random number in [0, 1) for the given name
+    """
+    return zlib.crc32(name.encode()) / 2 ** 32
+
+
+class Emulator:
+    """
+    Creates Reference, Historical and market data responses according
+    to `EmulatorConfig`
+    """
+
+    def __init__(self, config: EmulatorConfig):
+        self.config = config
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+
+        # {correlation id: {'request': time, 'first_response': time,
+        #                   'last_response': time}}; time.monotonic() is used
+        self.timestamps: Dict[CorrelationId, Dict[str, float]] = {}
+
+    def record_request(self, corr_id: CorrelationId):
+        if self.config.record_timestamps:
+            self.timestamps[corr_id] = {'request': time.monotonic()}
+
+    def record_response(self, event_: Event):
+        """
+        Called after the handler has processed the response event
+        """
+        if not self.config.record_timestamps:
+            return
+
+        now = time.monotonic()
+        for msg in event_:
+            for corr_id in msg.correlationIds():
+                timestamps = self.timestamps.setdefault(corr_id, {})
+                timestamps.setdefault('first_response', now)
+                timestamps['last_response'] = now
+
+    def _get_value(self, field: str):
+        if field in self.config.bulk_fields:
+            return [round(self._random.uniform(0, 100), 4)
+                    for _ in range(self.config.bulk_size)]
+
+        return round(self._random.uniform(0, 100), 4)
+
+    @staticmethod
+    def _create_field(field: str, value) -> Element:
+        if isinstance(value, list):
+            return Element(field, children=[
+                Element(field, children={'value': Element('value', item)})
+                for item in value
+                ])
+
+        return Element(field, value)
+
+    def _is_valid_security(self, security: str) -> bool:
+        return _get_fraction(security) >= self.config.invalid_security_rate
+
+    def _is_valid_field(self, field: str) -> bool:
+        return _get_fraction(field) >= self.config.invalid_field_rate
+
+    @staticmethod
+    def _create_field_exceptions(fields: List[str],
+                                 message: str) -> Element:
+        return Element('fieldExceptions', children=[
+            Element('fieldExceptions', children={
+                'fieldId':   Element('fieldId', field),
+                'errorInfo': Element('errorInfo', children={
+                    'message': Element('message', message),
+                    }),
+                })
+            for field in fields
+            ])
+
+    def _create_security_data(self,
+                              security: str,
+                              fields: List[str],
+                              ) -> Element:
+        children = {'security': Element('security', security)}
+
+        if not self._is_valid_security(security):
+            children['fieldData'] = Element('fieldData', children={})
+            children['securityError'] = Element('securityError', children={
+                'message': Element('message', 'Unknown/Invalid security'),
+                })
+            return Element('securityData', children=children)
+
+        valid_fields = [field for field in fields
+                        if self._is_valid_field(field)]
+        invalid_fields = [field for field in fields
+                          if not self._is_valid_field(field)]
+
+        children['fieldData'] = Element('fieldData', children={
+            field: self._create_field(field, self._get_value(field))
+            for field in valid_fields
+            })
+
+        if invalid_fields:
+            children['fieldExceptions'] = self._create_field_exceptions(
+                invalid_fields, 'Field not valid')
+
+        return Element('securityData', children=children)
+
+    def _create_historical_data(self,
+                                security: str,
+                                fields: List[str],
+                                start_date: dt.date,
+                                end_date: dt.date,
+                                ) -> Element:
+        children = {'security': Element('security', security)}
+
+        if not self._is_valid_security(security):
+            children['fieldData'] = Element('fieldData', children=[])
+            children['securityError'] = Element('securityError', children={
+                'message': Element('message', 'Unknown/Invalid security'),
+                })
+            return Element('securityData', children=children)
+
+        valid_fields = [field for field in fields
+                        if self._is_valid_field(field)]
+        invalid_fields = [field for field in fields
+                          if not self._is_valid_field(field)]
+
+        days = []
+        date = start_date
+        while date <= end_date:
+            if date.weekday() < 5:
+                day = {'date': Element('date', date)}
+                day.update({
+                    field: self._create_field(field, self._get_value(field))
+                    for field in valid_fields
+                    })
+                days.append(Element('fieldData', children=day))
+
+            date += dt.timedelta(days=1)
+
+        children['fieldData'] = Element('fieldData', children=days)
+
+        if invalid_fields:
+            children['fieldExceptions'] = self._create_field_exceptions(
+                invalid_fields, 'Invalid field')
+
+        return Element('securityData', children=children)
+
+    def create_response_events(self,
+                               request: Request,
+                               corr_id: CorrelationId,
+                               ) -> List[Tuple[float, Event]]:
+        """
+        Return (delay, event) for all PARTIAL_RESPONSE and the final
+        RESPONSE events of the given request
+        """
+        with self._lock:
+            is_error = self._random.random() < self.config.response_error_rate
+
+            if request.name in ('IntradayBarRequest', 'IntradayTickRequest'):
+                is_error = (is_error or not self._is_valid_security(
+                    request.elements['security']))
+
+            if is_error or request.name not in ('ReferenceDataRequest',
+                                                'HistoricalDataRequest',
+                                                'IntradayBarRequest',
+                                                'IntradayTickRequest'):
+                msg = Message(f'{request.name}Response', 0,
+                              children={
+                                  'responseError': Element(
+                                      'responseError',
+                                      children={
+                                          'category': Element('category',
+                                                              'BAD_ARGS'),
+                                          }),
+                                  },
+                              correlationId=corr_id)
+                return [(self.config.latency,
+                         Event(Event.RESPONSE, [msg]))]
+
+            msgs = self._create_response_messages(request, corr_id)
+
+        events = []
+        for i, msg in enumerate(msgs):
+            delay = self.config.latency
+            if self.config.events_per_second:
+                delay += i / self.config.events_per_second
+
+            event_type = (Event.RESPONSE if i == len(msgs) - 1
+                          else Event.PARTIAL_RESPONSE)
+            events.append((delay, Event(event_type, [msg])))
+
+        return events
+
+    def _create_response_messages(self,
+                                  request: Request,
+                                  corr_id: CorrelationId,
+                                  ) -> List[Message]:
+        if request.name == 'IntradayBarRequest':
+            return self._create_bar_messages(request, corr_id)
+
+        if request.name == 'IntradayTickRequest':
+            return self._create_tick_messages(request, corr_id)
+
+        securities = _get_list(request.elements.get('securities'))
+        fields = _get_list(request.elements.get('fields'))
+
+        if request.name == 'HistoricalDataRequest':
+            start_date = dt.datetime.strptime(request.elements['startDate'],
+                                              '%Y%m%d').date()
+            end_date = dt.datetime.strptime(request.elements['endDate'],
+                                            '%Y%m%d').date()
+
+            return [
+                Message('HistoricalDataResponse', 0,
+                        children={
+                            'securityData': self._create_historical_data(
+                                security, fields, start_date, end_date),
+                            },
+                        correlationId=corr_id)
+                for security in securities
+                ]
+
+        size = self.config.securities_per_message
+        return [
+            Message('ReferenceDataResponse', 0,
+                    children={
+                        'securityData': Element('securityData', children=[
+                            self._create_security_data(security, fields)
+                            for security in securities[i: i + size]
+                            ]),
+                        },
+                    correlationId=corr_id)
+            for i in range(0, max(len(securities), 1), size)
+            ]
+
+    def _create_bar(self, time_: dt.datetime) -> Element:
+        prices = [round(self._random.uniform(90, 110), 4)
+                  for _ in range(4)]
+
+        values = {
+            'time':      time_,
+            'open':      prices[0],
+            'high':      max(prices),
+            'low':       min(prices),
+            'close':     prices[-1],
+            'volume':    self._random.randint(0, 10000),
+            'numEvents': self._random.randint(0, 100),
+            }
+
+        return Element('barTickData', children={
+            name: Element(name, value)
+            for name, value in values.items()
+            })
+
+    def _create_bar_messages(self,
+                             request: Request,
+                             corr_id: CorrelationId,
+                             ) -> List[Message]:
+        """
+        One bar for every `interval` minutes in [startDateTime, endDateTime)
+        """
+        interval = dt.timedelta(minutes=request.elements.get('interval', 1))
+        end_time = request.elements['endDateTime']
+
+        bars = []
+        bar_time = request.elements['startDateTime']
+        while bar_time < end_time:
+            bars.append(self._create_bar(bar_time))
+            bar_time += interval
+
+        size = self.config.bars_per_message
+        return [
+            Message('IntradayBarResponse', 0,
+                    children={
+                        'barData': Element('barData', children={
+                            'barTickData': Element('barTickData',
+                                                   children=bars[i: i + size]),
+                            }),
+                        },
+                    correlationId=corr_id)
+            for i in range(0, max(len(bars), 1), size)
+            ]
+
+    def _create_tick_messages(self,
+                              request: Request,
+                              corr_id: CorrelationId,
+                              ) -> List[Message]:
+        """
+        Ticks of all event types at the same evenly spaced times in
+        [startDateTime, endDateTime]; like in Bloomberg, ticks at
+        endDateTime are included
+        """
+        event_types = _get_list(request.elements.get('eventTypes')) or [
+            'TRADE']
+        interval = dt.timedelta(
+            minutes=1 / self.config.intraday_ticks_per_minute)
+        end_time = request.elements['endDateTime']
+
+        ticks = []
+        tick_time = request.elements['startDateTime']
+        while tick_time <= end_time:
+            for event_type in event_types:
+                values = {
+                    'time':  tick_time,
+                    'type':  event_type,
+                    'value': round(self._random.uniform(90, 110), 4),
+                    'size':  self._random.randint(1, 1000),
+                    }
+                ticks.append(Element('tickData', children={
+                    name: Element(name, value)
+                    for name, value in values.items()
+                    }))
+
+            tick_time += interval
+
+        size = self.config.intraday_ticks_per_message
+        return [
+            Message('IntradayTickResponse', 0,
+                    children={
+                        'tickData': Element('tickData', children={
+                            'tickData': Element('tickData',
+                                                children=ticks[i: i + size]),
+                            }),
+                        },
+                    correlationId=corr_id)
+            for i in range(0, max(len(ticks), 1), size)
+            ]
+
+    def choose_topics(self, topics: List) -> List:
+        """
+        Choose topics that receive ticks in the next event
+        """
+        with self._lock:
+            return [self._random.choice(topics)
+                    for _ in range(self.config.ticks_per_event)]
+
+    def create_market_data_message(self,
+                                   topic: str,
+                                   fields: List[str],
+                                   corr_id: CorrelationId,
+                                   ) -> Message:
+        with self._lock:
+            changed_fields = self._random.sample(
+                fields, min(self.config.fields_per_tick, len(fields)))
+
+            children = {field: self._create_field(field,
+                                                  self._get_value(field))
+                        for field in changed_fields}
+
+        if self.config.time_field is not None:
+            children[self.config.time_field] = Element(self.config.time_field,
+                                                       time.time())
+
+        return Message('MarketDataEvents', 0,
+                       children=children,
+                       correlationId=corr_id)
+
+
+_EMULATOR: Optional[Emulator] = None
+
+
+def enable_emulator(config: Optional[EmulatorConfig] = None):
+    """
+    Doesn't exists in blpapi; for testing purposes only
+    Make all sessions created after this call respond to requests and
+    subscriptions with generated data; sessions start and open services
+    on their own
+    """
+    global _EMULATOR  # pylint: disable=global-statement
+    _EMULATOR = Emulator(config or EmulatorConfig())
+
+
+def disable_emulator():
+    """
+    Doesn't exists in blpapi; for testing purposes only
+    """
+    global _EMULATOR  # pylint: disable=global-statement
+    _EMULATOR = None
 
 
 # real blpapi uses string optimization; for testing purposes just str will do
@@ -447,3 +1087,11 @@ class DataType(enum.Enum):
     """
     SEQUENCE = 'sequence'
     STRING = 'string'
+
+
+def get_emulator() -> Optional[Emulator]:
+    """
+    Doesn't exists in blpapi; for testing purposes only
+    Return currently enabled emulator
+    """
+    return _EMULATOR
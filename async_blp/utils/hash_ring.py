@@ -0,0 +1,77 @@
+"""
+Consistent hashing used to distribute securities between sessions
+"""
+import bisect
+import hashlib
+from typing import Dict
+from typing import Generic
+from typing import Iterable
+from typing import List
+from typing import Set
+from typing import TypeVar
+
+T = TypeVar('T')
+
+
+def get_hash(key: str) -> int:
+    """
+    Stable hash of the given key; python `hash` can't be used because it
+    changes between runs
+    """
+    return int(hashlib.md5(key.encode()).hexdigest()[:16], 16)
+
+
+class ConsistentHashRing(Generic[T]):
+    """
+    Map keys to nodes so that adding or removing a node moves only
+    the keys of this node. Each node is placed on the ring `replicas`
+    times to distribute keys evenly
+    """
+
+    def __init__(self, nodes: Iterable[T] = (), replicas: int = 100):
+        self._replicas = replicas
+
+        # sorted hashes of all node replicas and {hash: node}
+        self._hashes: List[int] = []
+        self._nodes: Dict[int, T] = {}
+
+        for node in nodes:
+            self.add_node(node)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def nodes(self) -> Set[T]:
+        return set(self._nodes.values())
+
+    def add_node(self, node: T):
+        for replica in range(self._replicas):
+            node_hash = get_hash(f'{node}:{replica}')
+
+            if node_hash not in self._nodes:
+                bisect.insort(self._hashes, node_hash)
+
+            self._nodes[node_hash] = node
+
+    def remove_node(self, node: T):
+        for replica in range(self._replicas):
+            node_hash = get_hash(f'{node}:{replica}')
+
+            if self._nodes.get(node_hash) == node:
+                del self._nodes[node_hash]
+                self._hashes.remove(node_hash)
+
+    def get_node(self, key: str) -> T:
+        """
+        Return node that the given key belongs to
+        """
+        if not self._hashes:
+            raise RuntimeError('ConsistentHashRing is empty')
+
+        position = bisect.bisect(self._hashes, get_hash(key))
+
+        if position == len(self._hashes):
+            position = 0
+
+        return self._nodes[self._hashes[position]]
@@ -2,6 +2,55 @@
 Shared logger
 """
 import logging
+from typing import Optional
+
+TRACE_LOGGER_NAME = 'async_blp.trace'
+
+
+class Trace:
+    """
+    Debug channel for hot paths that are called for every message.
+
+    Level check is cached in `enabled`, so disabled trace costs one
+    attribute lookup if callers guard their calls:
+
+        if TRACE.enabled:
+            TRACE('%s: message received', self.__class__.__name__)
+
+    Only every `sample_every`-th message is logged. The cached check is
+    refreshed by `set_logger` and `set_trace`; call `refresh` after
+    changing log levels directly
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_every = 1
+        self._logger = logging.getLogger(TRACE_LOGGER_NAME)
+        self._forced: Optional[bool] = None
+        self._counter = 0
+
+    def __call__(self, msg: str, *args):
+        # counter is not locked, so sampling is approximate when
+        # several threads trace at once
+        self._counter += 1
+        if self._counter >= self.sample_every:
+            self._counter = 0
+            self._logger.debug(msg, *args)
+
+    def refresh(self):
+        if self._forced is not None:
+            self.enabled = self._forced
+        else:
+            self.enabled = self._logger.isEnabledFor(logging.DEBUG)
+
+    def configure(self, enabled: Optional[bool], sample_every: int):
+        self._forced = enabled
+        self.sample_every = max(sample_every, 1)
+        self._counter = 0
+        self.refresh()
+
+
+TRACE = Trace()
 
 
 def set_logger(log_level: logging.WARNING):
@@ -19,6 +68,18 @@ def set_logger(log_level: logging.WARNING):
     stream_handler.setFormatter(formatter)
     logger.addHandler(stream_handler)
 
+    TRACE.refresh()
+
+
+def set_trace(enabled: Optional[bool] = None, sample_every: int = 1):
+    """
+    Configure hot path logging. If `enabled` is None, it is enabled when
+    DEBUG level is enabled for `async_blp.trace` logger. Trace messages
+    are still filtered by logger level, so forcing it doesn't
+    enable DEBUG logs
+    """
+    TRACE.configure(enabled, sample_every)
+
 
 def get_logger():
     """
@@ -1,5 +1,7 @@
+import datetime as dt
 from typing import Iterable
 from typing import List
+from typing import Tuple
 from typing import TypeVar
 
 T = TypeVar('T')
@@ -18,3 +20,39 @@ def split_into_chunks(iterable: List[T],
 
     for i in range(num_chunks):
         yield iterable[i * chunk_size: (i + 1) * chunk_size]
+
+
+def get_securities_and_fields(
+        pairs: Iterable[Tuple[str, str]],
+        ) -> Tuple[List[str], List[str]]:
+    """
+    Return unique securities and fields from the (security, field) pairs,
+    preserving their order
+    """
+    securities = {}
+    fields = {}
+
+    for security, field in pairs:
+        securities[security] = None
+        fields[field] = None
+
+    return list(securities), list(fields)
+
+
+def split_time_range(start: dt.datetime,
+                     end: dt.datetime,
+                     window: dt.timedelta,
+                     ) -> Iterable[Tuple[dt.datetime, dt.datetime]]:
+    """
+    Split [start, end) into consecutive windows of size `window`;
+    the last window can be shorter
+    """
+    if window <= dt.timedelta(0):
+        raise ValueError('Window must be positive')
+
+    window_start = start
+
+    while window_start < end:
+        window_end = min(window_start + window, end)
+        yield window_start, window_end
+        window_start = window_end
@@ -0,0 +1,11 @@
+"""
+Performance benchmarks of async_blp hot paths.
+
+Run all benchmarks and save results as json:
+
+python -m benchmarks --output results.json
+
+Every module `bench_*.py` registers its benchmarks using
+`common.benchmark`; data is generated by env_test emulator with fixed seed,
+so results of different runs are comparable
+"""
@@ -0,0 +1,60 @@
+"""
+Run benchmarks and save results as json
+"""
+import argparse
+import datetime as dt
+import importlib
+import json
+import pkgutil
+import platform
+import sys
+
+import benchmarks
+from benchmarks.common import BENCHMARKS
+from benchmarks.common import SEED
+from benchmarks.common import run_benchmark
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-k', '--filter', default='',
+                        help='run only benchmarks whose name contains it')
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('-t', '--min-time', type=float, default=0.2,
+                        help='minimal duration of one measurement, seconds')
+    parser.add_argument('-o', '--output',
+                        help='json file; results are printed if not set')
+    args = parser.parse_args()
+
+    for module in pkgutil.iter_modules(benchmarks.__path__):
+        if module.name.startswith('bench_'):
+            importlib.import_module(f'benchmarks.{module.name}')
+
+    results = []
+    for bench in BENCHMARKS:
+        if args.filter not in bench.name:
+            continue
+
+        for result in run_benchmark(bench, args.repeat, args.min_time):
+            print(f"{result['name']} {result['params']}: "
+                  f"{result['median'] * 1e6:.1f} us",
+                  file=sys.stderr)
+            results.append(result)
+
+    report = {
+        'time':     dt.datetime.now().isoformat(),
+        'python':   platform.python_version(),
+        'platform': platform.platform(),
+        'seed':     SEED,
+        'results':  results,
+        }
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
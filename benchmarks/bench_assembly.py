@@ -0,0 +1,137 @@
+"""
+Assembly of request results: processing of all response messages by
+requests and the final merge in `get_reference_data`/`get_historical_data`
+"""
+import datetime as dt
+
+import pandas as pd
+
+from async_blp.async_blp import merge_results
+from async_blp.enums import ErrorBehaviour
+from async_blp.requests import HistoricalDataRequest
+from async_blp.requests import ReferenceDataRequest
+from async_blp.utils.misc import split_into_chunks
+
+from .common import benchmark
+from .common import create_historical_messages
+from .common import create_reference_messages
+from .common import get_fields
+from .common import get_loop
+from .common import get_securities
+
+END_DATE = dt.date(2020, 1, 1)
+
+
+async def process(request, messages):
+    for msg in messages:
+        request.send_queue_message(msg)
+    request.send_queue_message(None)
+
+    return await request.process()
+
+
+def process_reference_data(num_securities, num_fields):
+    loop = get_loop()
+    messages = create_reference_messages(num_securities, num_fields)
+    securities = get_securities(num_securities)
+    fields = get_fields(num_fields)
+
+    def run():
+        request = ReferenceDataRequest(securities,
+                                       fields,
+                                       error_behavior=ErrorBehaviour.RETURN,
+                                       loop=loop)
+        return loop.run_until_complete(process(request, messages))
+
+    return run
+
+
+def process_historical_data(num_securities, num_fields, num_days):
+    loop = get_loop()
+    messages = create_historical_messages(num_securities,
+                                          num_fields,
+                                          num_days)
+    securities = get_securities(num_securities)
+    fields = get_fields(num_fields)
+    start_date = END_DATE - dt.timedelta(days=num_days)
+
+    def run():
+        request = HistoricalDataRequest(securities,
+                                        fields,
+                                        start_date,
+                                        END_DATE,
+                                        error_behavior=ErrorBehaviour.RETURN,
+                                        loop=loop)
+        return loop.run_until_complete(process(request, messages))
+
+    return run
+
+
+@benchmark({'num_securities': 10, 'num_fields': 10},
+           {'num_securities': 100, 'num_fields': 10},
+           {'num_securities': 100, 'num_fields': 50})
+def bench_reference_data_request_process(num_securities, num_fields):
+    return process_reference_data(num_securities, num_fields)
+
+
+@benchmark({'num_securities': 10, 'num_fields': 5, 'num_days': 30},
+           {'num_securities': 10, 'num_fields': 5, 'num_days': 365})
+def bench_historical_data_request_process(num_securities,
+                                          num_fields,
+                                          num_days):
+    return process_historical_data(num_securities, num_fields, num_days)
+
+
+@benchmark({'num_securities': 100, 'num_fields': 10, 'chunk_size': 10},
+           {'num_securities': 1000, 'num_fields': 10, 'chunk_size': 100},
+           {'num_securities': 1000, 'num_fields': 50, 'chunk_size': 10})
+def bench_merge_reference_results(num_securities, num_fields, chunk_size):
+    securities = get_securities(num_securities)
+    fields = get_fields(num_fields)
+
+    results = [
+        process_reference_data(len(chunk), num_fields)()
+        for chunk in split_into_chunks(securities, chunk_size)
+        ]
+
+    # every chunk must have its own securities
+    for (data, _), chunk in zip(results,
+                                split_into_chunks(securities, chunk_size)):
+        data.index = chunk
+
+    def merge():
+        result_df = pd.DataFrame(index=securities, columns=fields)
+        return merge_results(result_df, results)
+
+    return merge
+
+
+@benchmark({'num_securities': 10, 'num_fields': 5, 'num_days': 365,
+            'chunk_size': 1},
+           {'num_securities': 100, 'num_fields': 5, 'num_days': 365,
+            'chunk_size': 10})
+def bench_merge_historical_results(num_securities,
+                                   num_fields,
+                                   num_days,
+                                   chunk_size):
+    securities = get_securities(num_securities)
+    fields = get_fields(num_fields)
+    start_date = END_DATE - dt.timedelta(days=num_days)
+
+    results = []
+    for chunk in split_into_chunks(securities, chunk_size):
+        data, errors = process_historical_data(len(chunk),
+                                               num_fields,
+                                               num_days)()
+        data.index = data.index.set_levels(chunk, level='security')
+        results.append((data, errors))
+
+    all_dates = pd.date_range(start_date, END_DATE)
+    index = pd.MultiIndex.from_product([all_dates, securities],
+                                       names=['date', 'security'])
+
+    def merge():
+        result_df = pd.DataFrame(index=index, columns=fields)
+        return merge_results(result_df, results)
+
+    return merge
@@ -0,0 +1,76 @@
+"""
+Cost of hot path logging per message when DEBUG is disabled: plain
+`LOGGER.debug` calls (as hot paths used before) against guarded trace
+"""
+import logging
+
+from async_blp.requests import ReferenceDataRequest
+from async_blp.utils import log
+from async_blp.utils.log import TRACE
+
+from .common import benchmark
+from .common import create_reference_messages
+from .common import get_loop
+
+LOGGER = log.get_logger()
+
+# number of log calls per message in the old hot paths: event received,
+# message sent, waiting for messages, message received
+CALLS_PER_MESSAGE = 4
+
+
+def disable_debug():
+    logging.getLogger('async_blp').setLevel(logging.WARNING)
+    log.set_trace()
+
+
+@benchmark()
+def bench_logger_debug_disabled():
+    disable_debug()
+    name = 'ReferenceDataRequest'
+
+    def run():
+        for _ in range(CALLS_PER_MESSAGE):
+            LOGGER.debug('%s: message received', name)
+
+    return run
+
+
+@benchmark()
+def bench_trace_disabled():
+    disable_debug()
+    name = 'ReferenceDataRequest'
+
+    def run():
+        for _ in range(CALLS_PER_MESSAGE):
+            if TRACE.enabled:
+                TRACE('%s: message received', name)
+
+    return run
+
+
+@benchmark({'num_messages': 1000})
+def bench_request_queue_roundtrip(num_messages):
+    """
+    Messages go through request queue: `send_queue_message` and
+    `_get_message_from_queue`
+    """
+    disable_debug()
+    loop = get_loop()
+    msg, = create_reference_messages(1, 1)
+
+    async def roundtrip(request):
+        for _ in range(num_messages):
+            request.send_queue_message(msg)
+
+        for _ in range(num_messages):
+            # pylint: disable=protected-access
+            await request._get_message_from_queue()
+
+    def run():
+        request = ReferenceDataRequest(['SECURITY_0 Equity'],
+                                       ['FIELD_0'],
+                                       loop=loop)
+        loop.run_until_complete(roundtrip(request))
+
+    return run
@@ -0,0 +1,115 @@
+"""
+Parsing of single Bloomberg messages and merging of errors
+"""
+import random
+
+from async_blp.enums import ErrorBehaviour
+from async_blp.errors import BloombergErrors
+from async_blp.parser import parse_array_field
+from async_blp.parser import parse_errors
+from async_blp.parser import parse_historical_security_data
+from async_blp.parser import parse_intraday_bars
+from async_blp.parser import parse_intraday_ticks
+from async_blp.parser import parse_reference_security_data
+from async_blp.utils.blp_name import BAR_DATA
+from async_blp.utils.blp_name import SECURITY_DATA
+from async_blp.utils.blp_name import TICK_DATA
+
+from .common import SEED
+from .common import benchmark
+from .common import create_historical_messages
+from .common import create_intraday_bar_messages
+from .common import create_intraday_tick_messages
+from .common import create_reference_messages
+from .common import get_fields
+from .common import get_securities
+
+
+@benchmark({'num_fields': 10},
+           {'num_fields': 50},
+           {'num_fields': 200})
+def bench_parse_reference_security_data(num_fields):
+    msg, = create_reference_messages(1, num_fields)
+    security_data, = msg.getElement(SECURITY_DATA).values()
+
+    return lambda: parse_reference_security_data(security_data)
+
+
+@benchmark({'num_days': 30, 'num_fields': 5},
+           {'num_days': 365, 'num_fields': 5},
+           {'num_days': 365 * 5, 'num_fields': 5})
+def bench_parse_historical_security_data(num_days, num_fields):
+    msg, = create_historical_messages(1, num_fields, num_days)
+    security_data = msg.getElement(SECURITY_DATA)
+
+    return lambda: parse_historical_security_data(security_data)
+
+
+@benchmark({'num_bars': 60},
+           {'num_bars': 1000},
+           {'num_bars': 10000})
+def bench_parse_intraday_bars(num_bars):
+    msg, = create_intraday_bar_messages(num_bars, bars_per_message=num_bars)
+    bar_data = msg.getElement(BAR_DATA)
+
+    return lambda: parse_intraday_bars(bar_data)
+
+
+@benchmark({'num_ticks': 100},
+           {'num_ticks': 10000})
+def bench_parse_intraday_ticks(num_ticks):
+    msg, = create_intraday_tick_messages(
+        num_ticks, intraday_ticks_per_message=num_ticks)
+    tick_data = msg.getElement(TICK_DATA)
+
+    return lambda: parse_intraday_ticks(tick_data)
+
+
+@benchmark({'bulk_size': 10},
+           {'bulk_size': 100},
+           {'bulk_size': 1000})
+def bench_parse_array_field(bulk_size):
+    msg, = create_reference_messages(1, 1,
+                                     bulk_fields=('FIELD_0',),
+                                     bulk_size=bulk_size)
+    security_data, = msg.getElement(SECURITY_DATA).values()
+    field, = security_data.getElement('fieldData').elements()
+
+    return lambda: parse_array_field(field)
+
+
+@benchmark({'num_fields': 10},
+           {'num_fields': 100})
+def bench_parse_errors(num_fields):
+    msg, = create_reference_messages(1, num_fields, invalid_field_rate=0.5)
+    security_data, = msg.getElement(SECURITY_DATA).values()
+
+    return lambda: parse_errors(security_data, ErrorBehaviour.RETURN)
+
+
+@benchmark({'num_errors': 10, 'errors_size': 10},
+           {'num_errors': 100, 'errors_size': 10},
+           {'num_errors': 100, 'errors_size': 100})
+def bench_merge_errors(num_errors, errors_size):
+    """
+    Errors of all messages are merged one by one, like in requests
+    """
+    rng = random.Random(SEED)
+    securities = get_securities(num_errors * errors_size)
+    fields = get_fields(10)
+
+    all_errors = [
+        BloombergErrors(
+            invalid_securities=rng.sample(securities, errors_size),
+            invalid_fields={(rng.choice(securities), rng.choice(fields)):
+                                'Field not valid'
+                            for _ in range(errors_size)})
+        for _ in range(num_errors)
+        ]
+
+    def merge():
+        errors = BloombergErrors()
+        for error in all_errors:
+            errors += error
+
+    return merge
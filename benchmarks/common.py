@@ -0,0 +1,203 @@
+"""
+Benchmark registry, timer and data generators
+"""
+import asyncio
+import datetime as dt
+import statistics
+import timeit
+from dataclasses import dataclass
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+
+from async_blp.utils.env_test import CorrelationId
+from async_blp.utils.env_test import Emulator
+from async_blp.utils.env_test import EmulatorConfig
+from async_blp.utils.env_test import Message
+from async_blp.utils.env_test import Request
+
+SEED = 0
+
+
+@dataclass
+class Benchmark:
+    """
+    `func` is called with every set of `params` and returns function
+    without arguments that is timed; everything that is done in `func`
+    itself is a setup and is not timed
+    """
+    name: str
+    func: Callable[..., Callable[[], Any]]
+    params: List[Dict[str, Any]]
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(*params: Dict[str, Any]):
+    """
+    Register benchmark that is run with every given set of parameters
+    """
+
+    def register(func):
+        BENCHMARKS.append(Benchmark(f'{func.__module__}.{func.__name__}',
+                                    func,
+                                    list(params) or [{}]))
+        return func
+
+    return register
+
+
+def run_benchmark(bench: Benchmark,
+                  repeat: int = 5,
+                  min_time: float = 0.2,
+                  ) -> List[Dict[str, Any]]:
+    """
+    Time benchmark with all its parameters; every measurement takes
+    at least `min_time` seconds. Return one result per set of parameters,
+    times are in seconds per call
+    """
+    results = []
+
+    for params in bench.params:
+        stmt = bench.func(**params)
+        timer = timeit.Timer(stmt)
+
+        number, elapsed = timer.autorange()
+        number = max(number, int(number * min_time / max(elapsed, 1e-9)))
+        times = [time_ / number for time_ in timer.repeat(repeat, number)]
+
+        results.append({
+            'name':   bench.name,
+            'params': params,
+            'number': number,
+            'repeat': repeat,
+            'min':    min(times),
+            'median': statistics.median(times),
+            'mean':   statistics.mean(times),
+            })
+
+    return results
+
+
+def create_emulator(**kwargs) -> Emulator:
+    return Emulator(EmulatorConfig(seed=SEED, latency=0, **kwargs))
+
+
+def create_request(name: str,
+                   securities: List[str],
+                   fields: List[str],
+                   **elements) -> Request:
+    request = Request(name)
+
+    for security in securities:
+        request.append('securities', security)
+
+    for field in fields:
+        request.append('fields', field)
+
+    for key, value in elements.items():
+        request.set(key, value)
+
+    return request
+
+
+def get_messages(emulator: Emulator, request: Request) -> List[Message]:
+    return [msg
+            for _, event in emulator.create_response_events(
+                request, CorrelationId(None))
+            for msg in event]
+
+
+def create_reference_messages(num_securities: int,
+                              num_fields: int,
+                              **kwargs) -> List[Message]:
+    """
+    Return all ReferenceDataResponse messages of one request
+    """
+    emulator = create_emulator(**kwargs)
+    request = create_request('ReferenceDataRequest',
+                             get_securities(num_securities),
+                             get_fields(num_fields))
+
+    return get_messages(emulator, request)
+
+
+def create_historical_messages(num_securities: int,
+                               num_fields: int,
+                               num_days: int,
+                               **kwargs) -> List[Message]:
+    """
+    Return all HistoricalDataResponse messages of one request
+    """
+    emulator = create_emulator(**kwargs)
+    end_date = dt.date(2020, 1, 1)
+    start_date = end_date - dt.timedelta(days=num_days)
+
+    request = create_request('HistoricalDataRequest',
+                             get_securities(num_securities),
+                             get_fields(num_fields),
+                             startDate=start_date.strftime('%Y%m%d'),
+                             endDate=end_date.strftime('%Y%m%d'))
+
+    return get_messages(emulator, request)
+
+
+def create_intraday_bar_messages(num_bars: int,
+                                 **kwargs) -> List[Message]:
+    """
+    Return all IntradayBarResponse messages of one one-minute bar request
+    """
+    emulator = create_emulator(**kwargs)
+    start_time = dt.datetime(2020, 1, 2, 14, 30)
+
+    request = create_request('IntradayBarRequest', [], [],
+                             security=get_securities(1)[0],
+                             eventType='TRADE',
+                             interval=1,
+                             startDateTime=start_time,
+                             endDateTime=start_time + dt.timedelta(
+                                 minutes=num_bars))
+
+    return get_messages(emulator, request)
+
+
+def create_intraday_tick_messages(num_ticks: int,
+                                  **kwargs) -> List[Message]:
+    """
+    Return all IntradayTickResponse messages of one request with one tick
+    per second
+    """
+    emulator = create_emulator(intraday_ticks_per_minute=60, **kwargs)
+    start_time = dt.datetime(2020, 1, 2, 14, 30)
+
+    request = create_request('IntradayTickRequest', [], [],
+                             security=get_securities(1)[0],
+                             eventTypes=['TRADE'],
+                             startDateTime=start_time,
+                             endDateTime=start_time + dt.timedelta(
+                                 seconds=num_ticks - 1))
+
+    return get_messages(emulator, request)
+
+
+def get_securities(num_securities: int) -> List[str]:
+    return [f'SECURITY_{i} Equity' for i in range(num_securities)]
+
+
+def get_fields(num_fields: int) -> List[str]:
+    return [f'FIELD_{i}' for i in range(num_fields)]
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    One loop is used for all async benchmarks
+    """
+    try:
+        return asyncio.get_event_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        return loop
+
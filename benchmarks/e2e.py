@@ -0,0 +1,260 @@
+"""
+End-to-end throughput and latency of AsyncBloomberg against env_test
+emulator. Sweeps session and chunk size settings and reports throughput
+and p50/p99 latency of every stage:
+
+python -m benchmarks.e2e --output e2e.json
+
+Stages of reference and historical data calls:
+    send - from the call start until Bloomberg receives the first request
+           (session start, service opening, splitting into chunks)
+    bloomberg - until the last response is processed by handlers
+                (emulated latency and event dispatching)
+    assembly - until the call returns (parsing of messages that are still
+               queued and merging of chunks)
+
+Every chunk request is also split into its lifecycle stages
+(see `RequestStage`): time spent waiting for session, service, Bloomberg
+responses and parsing.
+"""
+import argparse
+import asyncio
+import datetime as dt
+import itertools
+import json
+import platform
+import sys
+import time
+from typing import Any
+from typing import Dict
+from typing import List
+
+import numpy as np
+
+from async_blp import AsyncBloomberg
+from async_blp.base_request import add_lifecycle_callback
+from async_blp.base_request import remove_lifecycle_callback
+from async_blp.enums import RequestStage
+from async_blp.utils import env_test
+from async_blp.utils.env_test import EmulatorConfig
+
+from .common import SEED
+from .common import get_fields
+from .common import get_securities
+
+TIME_FIELD = 'EMULATOR_TIME'
+
+
+def get_stats(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+
+    return {
+        'p50': float(np.percentile(values, 50)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(np.max(values)),
+        }
+
+
+async def timed_call(bloomberg: AsyncBloomberg,
+                     method: str,
+                     *args) -> Dict[str, float]:
+    """
+    Return duration of the call and its stages
+    """
+    emulator = env_test.get_emulator()
+    old_requests = set(emulator.timestamps)
+
+    start_time = time.monotonic()
+    await getattr(bloomberg, method)(*args)
+    end_time = time.monotonic()
+
+    timestamps = [timestamps
+                  for corr_id, timestamps in emulator.timestamps.items()
+                  if corr_id not in old_requests]
+
+    first_request = min(timestamps['request']
+                        for timestamps in timestamps)
+    last_response = max(timestamps['last_response']
+                        for timestamps in timestamps)
+
+    return {
+        'total':     end_time - start_time,
+        'send':      first_request - start_time,
+        'bloomberg': last_response - first_request,
+        'assembly':  end_time - last_response,
+        }
+
+
+async def run_requests(method: str,
+                       settings: Dict[str, int],
+                       args: argparse.Namespace,
+                       ) -> Dict[str, Any]:
+    """
+    Send `args.calls` concurrent calls of the given method
+    """
+    env_test.enable_emulator(EmulatorConfig(
+        seed=SEED,
+        latency=args.latency,
+        events_per_second=args.events_per_second,
+        record_timestamps=True))
+
+    bloomberg = AsyncBloomberg(**settings)
+    securities = get_securities(args.securities)
+    fields = get_fields(args.fields)
+
+    call_args = [securities, fields]
+    num_cells = len(securities) * len(fields)
+    if method == 'get_historical_data':
+        end_date = dt.date(2020, 1, 1)
+        start_date = end_date - dt.timedelta(days=args.days)
+        call_args += [start_date, end_date]
+        num_cells *= np.busday_count(start_date, end_date + dt.timedelta(1))
+
+    # the first call opens sessions and services
+    await timed_call(bloomberg, method, *call_args)
+
+    request_durations = []
+
+    def on_stage(request, stage, _):
+        if stage == RequestStage.PROCESSED:
+            request_durations.append(request.get_stage_durations())
+
+    add_lifecycle_callback(on_stage)
+    start_time = time.monotonic()
+    calls = await asyncio.gather(*[timed_call(bloomberg, method, *call_args)
+                                   for _ in range(args.calls)])
+    wall_time = time.monotonic() - start_time
+    remove_lifecycle_callback(on_stage)
+
+    await bloomberg.stop()
+    env_test.disable_emulator()
+
+    return {
+        'method':           method,
+        'settings':         settings,
+        'cells_per_second': float(num_cells * args.calls / wall_time),
+        'stages':           {stage: get_stats([call[stage]
+                                               for call in calls])
+                             for stage in calls[0]},
+        'request_stages':   {stage.value: get_stats([durations[stage]
+                                                     for durations
+                                                     in request_durations
+                                                     if stage in durations])
+                             for stage in list(RequestStage)[1:]},
+        }
+
+
+async def run_subscriptions(num_sessions: int,
+                            args: argparse.Namespace,
+                            ) -> Dict[str, Any]:
+    """
+    Subscribe to `args.securities` securities and read ticks for
+    `args.duration` seconds; latency is measured from tick creation
+    in emulator until it is read from the tick stream
+    """
+    env_test.enable_emulator(EmulatorConfig(
+        seed=SEED,
+        ticks_per_second=args.ticks_per_second,
+        time_field=TIME_FIELD))
+
+    bloomberg = AsyncBloomberg(max_subscription_sessions=num_sessions)
+    await bloomberg.subscribe(get_securities(args.securities),
+                              get_fields(args.fields))
+
+    latencies = []
+
+    async def read_ticks():
+        async for tick in bloomberg.stream_subscriptions(maxsize=10 ** 6):
+            latencies.append(time.time() - tick.values[TIME_FIELD])
+
+    task = asyncio.create_task(read_ticks())
+    await asyncio.sleep(args.duration)
+    task.cancel()
+
+    await bloomberg.stop()
+    env_test.disable_emulator()
+
+    return {
+        'method':            'subscribe',
+        'settings':          {'max_subscription_sessions': num_sessions},
+        'ticks_per_second':  len(latencies) / args.duration,
+        'stages':            {'tick': get_stats(latencies)},
+        }
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    results = []
+
+    for max_sessions, max_securities, max_fields in itertools.product(
+            args.max_sessions,
+            args.max_securities_per_request,
+            args.max_fields_per_request):
+        settings = {
+            'max_sessions':               max_sessions,
+            'max_securities_per_request': max_securities,
+            'max_fields_per_request':     max_fields,
+            }
+
+        for method in ('get_reference_data', 'get_historical_data'):
+            result = await run_requests(method, settings, args)
+            print(f"{method} {settings}: "
+                  f"{result['cells_per_second']:.0f} cells/s",
+                  file=sys.stderr)
+            results.append(result)
+
+    for num_sessions in args.max_sessions:
+        result = await run_subscriptions(num_sessions, args)
+        print(f"subscribe {result['settings']}: "
+              f"{result['ticks_per_second']:.0f} ticks/s",
+              file=sys.stderr)
+        results.append(result)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-sessions', type=int, nargs='+',
+                        default=[1, 2, 4])
+    parser.add_argument('--max-securities-per-request', type=int, nargs='+',
+                        default=[10, 100])
+    parser.add_argument('--max-fields-per-request', type=int, nargs='+',
+                        default=[10, 50])
+    parser.add_argument('--securities', type=int, default=100)
+    parser.add_argument('--fields', type=int, default=10)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--calls', type=int, default=10,
+                        help='number of concurrent calls')
+    parser.add_argument('--latency', type=float, default=0.01,
+                        help='emulated Bloomberg latency, seconds')
+    parser.add_argument('--events-per-second', type=float, default=None)
+    parser.add_argument('--ticks-per-second', type=float, default=10000)
+    parser.add_argument('--duration', type=float, default=2,
+                        help='duration of subscription test, seconds')
+    parser.add_argument('-o', '--output',
+                        help='json file; results are printed if not set')
+    args = parser.parse_args()
+
+    results = asyncio.get_event_loop().run_until_complete(run(args))
+
+    report = {
+        'time':     dt.datetime.now().isoformat(),
+        'python':   platform.python_version(),
+        'platform': platform.platform(),
+        'seed':     SEED,
+        'args':     vars(args),
+        'results':  results,
+        }
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,7 +17,9 @@ async def main(sec=4):
     start = dt.datetime.now()
     data = []
     while (dt.datetime.now() - start) < dt.timedelta(seconds=sec):
-        data.append(await bloomberg.read_subscriptions())
+        # the last values of all subscribed securities and fields
+        last_values = await bloomberg.read_subscriptions()
+        data.append(last_values.at[security_id, field])
         await asyncio.sleep(1)
 
     await bloomberg.stop()
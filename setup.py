@@ -11,7 +11,7 @@ setup(
     long_description_content_type="text/markdown",
     license='MIT',
     platforms='any',
-    packages=find_packages(exclude=['docs', 'tests', 'examples']),
+    packages=find_packages(exclude=['docs', 'tests', 'examples', 'benchmarks']),
     install_requires=['pandas>=0.20.0'],
     version='0.0.1',
     author="Rocksci",
@@ -220,6 +220,30 @@ def start_subscribe_event():
     return event_
 
 
+@pytest.fixture()
+def slow_consumer_event():
+    """
+    Bloomberg sends SlowConsumerWarning when its event queue is 75% full
+    """
+    event_ = Event(type_=Event.ADMIN,
+                   msgs=[Message(value=0, name='SlowConsumerWarning'), ]
+                   )
+    return event_
+
+
+@pytest.fixture()
+def slow_consumer_cleared_event():
+    """
+    Bloomberg sends SlowConsumerWarningCleared when its event queue is
+    less than 50% full
+    """
+    event_ = Event(type_=Event.ADMIN,
+                   msgs=[Message(value=0,
+                                 name='SlowConsumerWarningCleared'), ]
+                   )
+    return event_
+
+
 @pytest.fixture()
 def market_data_event(market_data):
     """
@@ -565,3 +589,68 @@ def government_lookup_msg():
                       {'results': results_array})
 
     return message
+
+
+@pytest.fixture()
+def bar_data_values():
+    return [
+        {
+            'time':      dt.datetime(2020, 1, 2, 14, 30),
+            'open':      100.,
+            'high':      101.5,
+            'low':       99.,
+            'close':     101.,
+            'volume':    1200,
+            'numEvents': 15,
+            },
+        {
+            'time':      dt.datetime(2020, 1, 2, 14, 31),
+            'open':      101.,
+            'high':      102.,
+            'low':       100.5,
+            'close':     100.5,
+            'volume':    800,
+            'numEvents': 9,
+            },
+        ]
+
+
+@pytest.fixture()
+def bar_data_msg(bar_data_values):
+    bars = [
+        Element('barTickData', None, {
+            name: Element(name, value)
+            for name, value in bar.items()
+            })
+        for bar in bar_data_values
+        ]
+
+    bar_data = Element('barData', None, {
+        'barTickData': Element('barTickData', None, bars),
+        })
+
+    return Message('IntradayBarResponse', None, {'barData': bar_data})
+
+
+@pytest.fixture()
+def tick_data_msg():
+    values = [
+        (dt.datetime(2020, 1, 2, 14, 30), 'TRADE', 100.5, 200),
+        (dt.datetime(2020, 1, 2, 14, 30, 1), 'BID', 100.25, 1000),
+        ]
+
+    ticks = [
+        Element('tickData', None, {
+            'time':  Element('time', time_),
+            'type':  Element('type', type_),
+            'value': Element('value', value),
+            'size':  Element('size', size),
+            })
+        for time_, type_, value, size in values
+        ]
+
+    tick_data = Element('tickData', None, {
+        'tickData': Element('tickData', None, ticks),
+        })
+
+    return Message('IntradayTickResponse', None, {'tickData': tick_data})
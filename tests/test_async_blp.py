@@ -1,5 +1,6 @@
 import asyncio
 import datetime as dt
+import types
 import uuid
 from typing import Callable
 
@@ -7,8 +8,13 @@ import pandas as pd
 import pytest
 
 from async_blp import AsyncBloomberg
+from async_blp.cache import NegativeCache
+from async_blp.cache import ReferenceDataCache
+from async_blp.enums import ErrorBehaviour
 from async_blp.errors import BloombergErrors
 from async_blp.handlers import RequestHandler
+from async_blp.identifiers import SecurityIdMap
+from async_blp.market_data import Tick
 from async_blp.requests import ReferenceDataRequest
 from async_blp.utils.blp_name import SECURITY_DATA
 from async_blp.utils.env_test import CorrelationId
@@ -101,6 +107,124 @@ class TestAsyncBloomberg:
 
         assert chosen_handler == handler_1
 
+    async def test___choose_handlers(self, session_options):
+        """
+        Several handlers are created at once, even if there are free ones
+        """
+        bloomberg = AsyncBloomberg(max_sessions=3)
+        handler = RequestHandler(session_options)
+        request = ReferenceDataRequest(['security_id'], ['field'])
+        handler._current_requests[CorrelationId(uuid.uuid4())] = request
+        bloomberg._request_handlers.append(handler)
+
+        chosen_handlers = bloomberg._choose_handlers(5)
+
+        assert len(chosen_handlers) == 3
+        assert chosen_handlers[-1] == handler
+
+    async def test___get_subscription_handler(self):
+        bloomberg = AsyncBloomberg(max_subscription_sessions=3)
+        securities = [f'security_{i}' for i in range(100)]
+
+        shards = {bloomberg._get_shard(security) for security in securities}
+        handlers = {bloomberg._get_subscription_handler(shard)
+                    for shard in shards}
+
+        assert shards == {0, 1, 2}
+        assert len(handlers) == 3
+        assert bloomberg._get_subscription_handler(0) in handlers
+
+    async def test__unsubscribe(self):
+        bloomberg = AsyncBloomberg(max_subscription_sessions=2)
+        for shard in range(2):
+            bloomberg._get_subscription_handler(shard).session_started.set()
+
+        subscriptions = await bloomberg.subscribe(
+            [f'security_{i}' for i in range(10)], ['BID'])
+        await bloomberg.unsubscribe(subscriptions[:1])
+
+        data = await bloomberg.read_subscriptions()
+
+        assert len(subscriptions) == 2
+        assert sorted(data.index) == sorted(subscriptions[1].securities)
+
+    async def test__add_subscription_session(self):
+        bloomberg = AsyncBloomberg(max_subscription_sessions=2)
+        for shard in range(3):
+            bloomberg._get_subscription_handler(shard).session_started.set()
+
+        securities = [f'security_{i}' for i in range(30)]
+        subscriptions = await bloomberg.subscribe(securities, ['BID'])
+
+        shard = await bloomberg.add_subscription_session()
+        new_handler = bloomberg._subscription_handlers[shard]
+        moved = [security for security in securities
+                 if bloomberg._get_shard(security) == shard]
+
+        assert shard == 2
+        assert moved
+        assert sorted(new_handler._topics.values()) == sorted(moved)
+        for old_shard in range(2):
+            topics = bloomberg._subscription_handlers[old_shard]._topics
+            assert not set(topics.values()) & set(moved)
+
+        await bloomberg.modify_subscription(subscriptions, ['ASK'])
+        await bloomberg.unsubscribe(subscriptions)
+
+        assert all(subscription.fields == ['ASK']
+                   for subscription in subscriptions)
+        handlers = bloomberg._subscription_handlers.values()
+        assert not any(handler._topics for handler in handlers)
+
+    async def test__remove_subscription_session(self):
+        bloomberg = AsyncBloomberg(max_subscription_sessions=2)
+        for shard in range(2):
+            bloomberg._get_subscription_handler(shard).session_started.set()
+
+        securities = [f'security_{i}' for i in range(10)]
+        subscriptions = await bloomberg.subscribe(securities, ['BID'])
+        await bloomberg.remove_subscription_session(1)
+
+        data = await bloomberg.read_subscriptions()
+
+        assert list(bloomberg._subscription_handlers) == [0]
+        assert sorted(data.index) == sorted(securities)
+
+        with pytest.raises(ValueError):
+            await bloomberg.remove_subscription_session(0)
+
+        await bloomberg.unsubscribe(subscriptions)
+        assert not bloomberg._subscription_handlers[0]._topics
+
+    async def test__stream_bars__early_wake_up(self, monkeypatch):
+        """
+        Bar is closed even if wall clock is behind the loop clock
+        when the flush task wakes up
+        """
+        times = iter([100.0])
+        monkeypatch.setattr('async_blp.async_blp.time',
+                            types.SimpleNamespace(
+                                time=lambda: next(times, 100.4999)))
+
+        bloomberg = AsyncBloomberg()
+        handler = bloomberg._get_subscription_handler(0)
+        handler.session_started.set()
+        await bloomberg.subscribe(['security_1'],
+                                  ['LAST_PRICE', 'SIZE_LAST_TRADE'])
+
+        bars = bloomberg.stream_bars(bar_size=0.5)
+        next_bar = asyncio.ensure_future(bars.__anext__())
+        await asyncio.sleep(0)
+
+        handler.put(Tick('security_1',
+                         {'LAST_PRICE': 1.5, 'SIZE_LAST_TRADE': 100},
+                         100.25))
+        bar = await asyncio.wait_for(next_bar, 2)
+        await bars.aclose()
+
+        assert bar.time == 100.0
+        assert bar.values['volume'] == 100
+
     def test__init__not_inside_loop(self):
         with pytest.raises(RuntimeError):
             AsyncBloomberg()
@@ -150,6 +274,63 @@ class TestAsyncBloomberg:
 
         pd.testing.assert_frame_equal(expected_data, data)
 
+    async def test__get_reference_data__id_map(self,
+                                               one_value_array_field_data,
+                                               response_event,
+                                               open_session_event,
+                                               open_service_event):
+        field_name, field_values, security_id = one_value_array_field_data
+        id_map = SecurityIdMap()
+
+        async def ref_send(bloomberg):
+            bloomberg._id_map = id_map
+            return await bloomberg.get_reference_data([security_id],
+                                                      [field_name])
+
+        data, errors = await self._create_task(open_session_event,
+                                               open_service_event,
+                                               response_event,
+                                               ref_send)
+        assert errors == BloombergErrors()
+
+        expected_data = pd.DataFrame([[field_values]],
+                                     index=[security_id],
+                                     columns=[field_name],
+                                     )
+
+        pd.testing.assert_frame_equal(expected_data, data)
+
+    async def test__get_reference_data__negative_cache(self):
+        negative_cache = NegativeCache()
+        negative_cache.add(BloombergErrors(['security_1']))
+        bloomberg = AsyncBloomberg(error_behaviour=ErrorBehaviour.RETURN,
+                                   negative_cache=negative_cache)
+
+        data, errors = await bloomberg.get_reference_data(['security_1'],
+                                                          ['field_1'])
+
+        assert errors == BloombergErrors(['security_1'])
+        assert data.isna().all().all()
+        assert not bloomberg._request_handlers
+
+    async def test__get_reference_data__stale_while_revalidate(self):
+        reference_cache = ReferenceDataCache(soft_ttl=0)
+        reference_cache.update(pd.DataFrame([[1.5]],
+                                            index=['security_1'],
+                                            columns=['field_1']),
+                               BloombergErrors())
+        bloomberg = AsyncBloomberg(reference_cache=reference_cache)
+
+        data, _ = await bloomberg.get_reference_data(['security_1'],
+                                                     ['field_1'])
+        await bloomberg.get_reference_data(['security_1'], ['field_1'])
+
+        assert data.at['security_1', 'field_1'] == 1.5
+        assert len(bloomberg._background_tasks) == 1
+
+        for task in bloomberg._background_tasks:
+            task.cancel()
+
     async def test__get_historical_data(self,
                                         security_data_historical,
                                         simple_field_data,
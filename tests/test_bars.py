@@ -0,0 +1,61 @@
+import pytest
+
+from async_blp.bars import BarAggregator
+from async_blp.market_data import Tick
+from async_blp.market_data import TickStream
+
+
+@pytest.mark.asyncio
+class TestBarAggregator:
+
+    async def test__put(self):
+        stream = TickStream()
+        aggregator = BarAggregator(stream, bar_size=10)
+
+        aggregator.put(Tick('security_1', {'LAST_PRICE': 2,
+                                           'SIZE_LAST_TRADE': 100}, 1))
+        aggregator.put(Tick('security_1', {'LAST_PRICE': 3}, 2))
+        aggregator.put(Tick('security_1', {'LAST_PRICE': 1,
+                                           'SIZE_LAST_TRADE': 50}, 3))
+        aggregator.put(Tick('security_1', {'LAST_PRICE': 2.5}, 9.5))
+        aggregator.put(Tick('security_1', {'BID': 1}, 10))
+        assert len(stream) == 0
+
+        aggregator.put(Tick('security_1', {'LAST_PRICE': 4}, 11))
+
+        assert stream.get_nowait() == Tick('security_1', {
+            'open':       2,
+            'high':       3,
+            'low':        1,
+            'close':      2.5,
+            'volume':     150,
+            'num_events': 4,
+            }, 0)
+        assert len(stream) == 0
+
+    async def test__flush(self):
+        stream = TickStream()
+        aggregator = BarAggregator(stream, bar_size=10)
+
+        for i in range(20):
+            aggregator.put(Tick(f'security_{i}', {'LAST_PRICE': i}, 1))
+
+        aggregator.flush(9)
+        assert len(stream) == 0
+
+        aggregator.flush(10)
+        assert len(stream) == 20
+
+        bar = stream.get_nowait()
+        assert bar.values['close'] == 0
+        assert bar.values['num_events'] == 1
+
+    async def test__put__securities(self):
+        stream = TickStream()
+        aggregator = BarAggregator(stream, bar_size=10,
+                                   securities=['security_1'])
+
+        aggregator.put(Tick('security_2', {'LAST_PRICE': 2}, 1))
+        aggregator.flush(10)
+
+        assert len(stream) == 0
@@ -46,3 +46,10 @@ class TestBloombergErrors:
             ('security_1', 'field_1'): 'Field not valid',
             ('security_1', 'field_2'): 'Field not valid',
             }
+
+    def test__bool(self):
+        assert not BloombergErrors()
+        assert BloombergErrors(['security_1'])
+        assert BloombergErrors(invalid_fields={
+            ('security_1', 'field_1'): 'Field not valid',
+            })
@@ -0,0 +1,158 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from async_blp.cache import NegativeCache
+from async_blp.cache import ReferenceDataCache
+from async_blp.enums import SecurityIdType
+from async_blp.errors import BloombergErrors
+from async_blp.errors import ErrorType
+
+
+class TestNegativeCache:
+
+    def test__filter__invalid_security(self):
+        cache = NegativeCache()
+        cache.add(BloombergErrors(['security_1']))
+
+        securities, fields, errors = cache.filter(['security_1', 'security_2'],
+                                                  ['field_1'])
+
+        assert securities == ['security_2']
+        assert fields == ['field_1']
+        assert errors == BloombergErrors(['security_1'])
+
+    def test__filter__invalid_field(self):
+        cache = NegativeCache()
+        cache.add(BloombergErrors(invalid_fields={
+            ('security_1', 'field_1'): ErrorType.INVALID_FIELD,
+            }))
+
+        securities, fields, errors = cache.filter(['security_2'],
+                                                  ['field_1', 'field_2'])
+
+        assert securities == ['security_2']
+        assert fields == ['field_2']
+        assert errors.invalid_fields == {
+            ('security_2', 'field_1'): ErrorType.INVALID_FIELD,
+            }
+
+    def test__filter__field_not_applicable(self):
+        cache = NegativeCache()
+        cache.add(BloombergErrors(invalid_fields={
+            ('security_1', 'field_1'): ErrorType.FIELD_NOT_APPLICABLE,
+            }))
+
+        _, fields, errors = cache.filter(['security_1', 'security_2'],
+                                         ['field_1'])
+        assert fields == ['field_1']
+        assert errors.invalid_fields == {
+            ('security_1', 'field_1'): ErrorType.FIELD_NOT_APPLICABLE,
+            }
+
+        _, fields, _ = cache.filter(['security_1'], ['field_1'])
+        assert fields == []
+
+    def test__filter__security_id_type(self):
+        cache = NegativeCache()
+        cache.add(BloombergErrors(['security_1']), SecurityIdType.ISIN)
+
+        securities, _, _ = cache.filter(['security_1'], ['field_1'])
+        assert securities == ['security_1']
+
+        securities, _, _ = cache.filter(['security_1'], ['field_1'],
+                                        SecurityIdType.ISIN)
+        assert securities == []
+
+    def test__filter__expired(self):
+        cache = NegativeCache(ttl=0.001)
+        cache.add(BloombergErrors(['security_1']))
+        time.sleep(0.002)
+
+        securities, _, errors = cache.filter(['security_1'], ['field_1'])
+
+        assert securities == ['security_1']
+        assert not errors
+        assert not cache
+
+
+class TestReferenceDataCache:
+
+    def test__get__fresh(self):
+        cache = ReferenceDataCache(soft_ttl=60)
+        data = pd.DataFrame([[1.5]], index=['security_1'], columns=['field_1'])
+        cache.update(data, BloombergErrors())
+
+        cached_data, stale, missing = cache.get(['security_1', 'security_2'],
+                                                ['field_1'])
+
+        assert cached_data.at['security_1', 'field_1'] == 1.5
+        assert stale == []
+        assert missing == [('security_2', 'field_1')]
+
+    def test__get__stale(self):
+        cache = ReferenceDataCache(soft_ttl=0)
+        data = pd.DataFrame([[1.5]], index=['security_1'], columns=['field_1'])
+        cache.update(data, BloombergErrors())
+
+        cached_data, stale, missing = cache.get(['security_1'], ['field_1'])
+
+        assert cached_data.at['security_1', 'field_1'] == 1.5
+        assert stale == [('security_1', 'field_1')]
+        assert missing == []
+
+    def test__get__stale_without_revalidate(self):
+        cache = ReferenceDataCache(soft_ttl=0, stale_while_revalidate=False)
+        data = pd.DataFrame([[1.5]], index=['security_1'], columns=['field_1'])
+        cache.update(data, BloombergErrors())
+
+        _, stale, missing = cache.get(['security_1'], ['field_1'])
+
+        assert stale == []
+        assert missing == [('security_1', 'field_1')]
+
+    def test__get__overrides(self):
+        cache = ReferenceDataCache()
+        data = pd.DataFrame([[1.5]], index=['security_1'], columns=['field_1'])
+        cache.update(data, BloombergErrors(), overrides={'key': 'value'})
+
+        _, _, missing = cache.get(['security_1'], ['field_1'])
+
+        assert missing == [('security_1', 'field_1')]
+
+    def test__update__errors(self):
+        cache = ReferenceDataCache()
+        data = pd.DataFrame([[None, 1]], index=['security_1'],
+                            columns=['field_1', 'field_2'])
+        errors = BloombergErrors(invalid_fields={
+            ('security_1', 'field_1'): ErrorType.INVALID_FIELD,
+            })
+
+        cache.update(data, errors)
+
+        assert len(cache) == 1
+
+    def test__update__missing_values(self):
+        cache = ReferenceDataCache(soft_ttl=0)
+        cache.update(pd.DataFrame([[1.5, 2]], index=['security_1'],
+                                  columns=['field_1', 'field_2']),
+                     BloombergErrors())
+        cache.update(pd.DataFrame([[np.nan, 3]], index=['security_1'],
+                                  columns=['field_1', 'field_2']),
+                     BloombergErrors())
+
+        _, stale, missing = cache.get(['security_1'], ['field_1', 'field_2'])
+
+        assert stale == [('security_1', 'field_2')]
+        assert missing == [('security_1', 'field_1')]
+
+    def test__start_refresh(self):
+        cache = ReferenceDataCache()
+        pairs = [('security_1', 'field_1')]
+
+        assert cache.start_refresh(pairs) == pairs
+        assert cache.start_refresh(pairs) == []
+
+        cache.finish_refresh(pairs)
+        assert cache.start_refresh(pairs) == pairs
@@ -0,0 +1,348 @@
+import asyncio
+import datetime as dt
+import time
+
+import pandas as pd
+import pytest
+
+from async_blp import AsyncBloomberg
+from async_blp.base_request import add_lifecycle_callback
+from async_blp.base_request import remove_lifecycle_callback
+from async_blp.cache import NegativeCache
+from async_blp.enums import ErrorBehaviour
+from async_blp.enums import RequestStage
+from async_blp.enums import SecurityIdType
+from async_blp.identifiers import SecurityIdMap
+from async_blp.utils import env_test
+from async_blp.utils.env_test import EmulatorConfig
+from async_blp.utils.exc import BloombergException
+
+# pylint does not like pytest.fixture but we do
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture()
+def emulator():
+    """
+    Enable emulator with the given config for one test
+    """
+
+    def enable(**kwargs):
+        env_test.enable_emulator(EmulatorConfig(**kwargs))
+
+    yield enable
+
+    env_test.disable_emulator()
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(10)
+class TestEmulator:
+
+    async def test__get_reference_data(self, emulator):
+        emulator(securities_per_message=2)
+        bloomberg = AsyncBloomberg(max_sessions=2,
+                                   max_securities_per_request=3)
+        securities = [f'security_{i}' for i in range(5)]
+
+        data, _ = await bloomberg.get_reference_data(securities,
+                                                     ['BID', 'ASK'])
+        await bloomberg.stop()
+
+        assert list(data.index) == securities
+        assert list(data.columns) == ['BID', 'ASK']
+        assert data.notna().all().all()
+
+    async def test__get_reference_data__errors(self, emulator):
+        emulator(invalid_security_rate=1)
+        bloomberg = AsyncBloomberg(error_behaviour=ErrorBehaviour.RETURN)
+
+        data, errors = await bloomberg.get_reference_data(['security_1'],
+                                                          ['BID'])
+        await bloomberg.stop()
+
+        assert errors.invalid_securities == ['security_1']
+        assert data.isna().all().all()
+
+    async def test__get_reference_data__id_map__raise(self, emulator):
+        emulator(invalid_security_rate=0.3)
+        id_map = SecurityIdMap()
+        id_map.add({SecurityIdType.TICKER:               'security_2',
+                    SecurityIdType.BL_GLOBAL_IDENTIFIER: 'BBG000000002'})
+        bloomberg = AsyncBloomberg(error_behaviour=ErrorBehaviour.RAISE,
+                                   id_map=id_map)
+
+        with pytest.raises(BloombergException) as excinfo:
+            await bloomberg.get_reference_data(['security_2'], ['BID'])
+        await bloomberg.stop()
+
+        assert excinfo.value.args[0].invalid_securities == ['security_2']
+
+    async def test__get_reference_data__negative_cache__raise(self,
+                                                              emulator):
+        emulator(invalid_security_rate=1)
+        negative_cache = NegativeCache()
+        bloomberg = AsyncBloomberg(error_behaviour=ErrorBehaviour.RAISE,
+                                   negative_cache=negative_cache)
+        requests = []
+
+        def callback(request, stage, _):
+            if stage == RequestStage.CREATED:
+                requests.append(request)
+
+        add_lifecycle_callback(callback)
+        try:
+            for _ in range(2):
+                with pytest.raises(BloombergException) as excinfo:
+                    await bloomberg.get_reference_data(['security_1'],
+                                                       ['BID'])
+
+                assert excinfo.value.args[0].invalid_securities == [
+                    'security_1']
+        finally:
+            remove_lifecycle_callback(callback)
+            await bloomberg.stop()
+
+        assert len(requests) == 1
+        assert len(negative_cache) == 1
+
+    async def test__get_reference_data__bulk_fields(self, emulator):
+        emulator(bulk_fields=('HOLDERS',), bulk_size=3)
+        bloomberg = AsyncBloomberg()
+
+        data, _ = await bloomberg.get_reference_data(['security_1'],
+                                                     ['HOLDERS'])
+        await bloomberg.stop()
+
+        assert len(data.at['security_1', 'HOLDERS']) == 3
+
+    async def test__get_historical_data(self, emulator):
+        emulator(invalid_field_rate=0.5)
+        bloomberg = AsyncBloomberg(error_behaviour=ErrorBehaviour.RETURN)
+        fields = [f'field_{i}' for i in range(10)]
+
+        # 2020-01-06 is Monday
+        data, errors = await bloomberg.get_historical_data(
+            ['security_1'], fields, dt.date(2020, 1, 6), dt.date(2020, 1, 12))
+        await bloomberg.stop()
+
+        valid_fields = [field for field in fields
+                        if ('security_1', field) not in errors.invalid_fields]
+
+        assert errors.invalid_fields
+        assert valid_fields
+        assert data[valid_fields].notna().sum().sum() == 5 * len(valid_fields)
+
+    async def test__response_error(self, emulator):
+        emulator(response_error_rate=1)
+        bloomberg = AsyncBloomberg()
+
+        data, _ = await bloomberg.get_reference_data(['security_1'], ['BID'])
+        await bloomberg.stop()
+
+        assert data.isna().all().all()
+
+    async def test__subscribe(self, emulator):
+        emulator(ticks_per_second=1000, ticks_per_event=10)
+        bloomberg = AsyncBloomberg()
+
+        await bloomberg.subscribe(['security_1', 'security_2'],
+                                  ['BID', 'ASK'])
+        await asyncio.sleep(0.1)
+        data = await bloomberg.read_subscriptions()
+        await bloomberg.stop()
+
+        assert data.notna().all().all()
+
+    async def test__get_intraday_bars(self, emulator):
+        emulator(bars_per_message=7, invalid_security_rate=0.3)
+        bloomberg = AsyncBloomberg(max_sessions=2,
+                                   error_behaviour=ErrorBehaviour.RETURN)
+        securities = [f'security_{i}' for i in range(5)]
+        invalid_securities = [security for security in securities
+                              if env_test._get_fraction(security) < 0.3]
+
+        data, errors = await bloomberg.get_intraday_bars(
+            securities,
+            dt.datetime(2020, 1, 2, 14, 30),
+            dt.datetime(2020, 1, 2, 15, 30),
+            interval=5)
+        await bloomberg.stop()
+
+        valid_securities = [security for security in securities
+                            if security not in invalid_securities]
+
+        assert invalid_securities
+        assert sorted(errors.invalid_securities) == invalid_securities
+        assert list(data.index.names) == ['security', 'time']
+        assert list(data.index.unique('security')) == valid_securities
+        assert len(data) == 12 * len(valid_securities)
+        assert (data['high'] >= data['low']).all()
+
+    async def test__get_intraday_bars__raise(self, emulator):
+        emulator(invalid_security_rate=0.3)
+        bloomberg = AsyncBloomberg(error_behaviour=ErrorBehaviour.RAISE)
+
+        with pytest.raises(BloombergException) as excinfo:
+            await bloomberg.get_intraday_bars(
+                ['security_1'],
+                dt.datetime(2020, 1, 2, 14, 30),
+                dt.datetime(2020, 1, 2, 15, 30))
+        await bloomberg.stop()
+
+        assert excinfo.value.args[0].invalid_securities == ['security_1']
+
+    async def test__get_intraday_ticks(self, emulator):
+        emulator(intraday_ticks_per_minute=6,
+                 intraday_ticks_per_message=7,
+                 invalid_security_rate=0.3)
+        bloomberg = AsyncBloomberg(max_sessions=3,
+                                   error_behaviour=ErrorBehaviour.RETURN)
+        securities = ['security_0', 'security_1', 'security_2']
+        start = dt.datetime(2020, 1, 2, 14, 30)
+        end = dt.datetime(2020, 1, 2, 15, 30)
+
+        data, errors = await bloomberg.get_intraday_ticks(
+            securities,
+            start,
+            end,
+            event_types=['BID', 'ASK'],
+            window=dt.timedelta(minutes=7))
+        single_request, _ = await bloomberg.get_intraday_ticks(
+            securities,
+            start,
+            end,
+            event_types=['BID', 'ASK'],
+            window=end - start)
+        await bloomberg.stop()
+
+        valid_securities = [security for security in securities
+                            if env_test._get_fraction(security) >= 0.3]
+
+        assert len(bloomberg._request_handlers) == 3
+        assert errors.invalid_securities == ['security_1']
+        assert list(data.index.unique('security')) == valid_securities
+        # 6 ticks per minute including the end time for both event types
+        assert len(data) == 361 * 2 * len(valid_securities)
+        pd.testing.assert_index_equal(data.index, single_request.index)
+        pd.testing.assert_series_equal(data['type'], single_request['type'])
+
+    async def test__get_intraday_ticks__tz_aware(self, emulator):
+        emulator(intraday_ticks_per_minute=1)
+        bloomberg = AsyncBloomberg()
+        start = dt.datetime(2020, 1, 2, 9, tzinfo=dt.timezone(
+            dt.timedelta(hours=-5)))
+
+        data, _ = await bloomberg.get_intraday_ticks(
+            ['security_0'],
+            start,
+            start + dt.timedelta(minutes=30),
+            window=dt.timedelta(minutes=10))
+        await bloomberg.stop()
+
+        times = data.index.get_level_values('time')
+
+        assert len(data) == 31
+        assert times[0] == pd.Timestamp('2020-01-02 14:00')
+        assert times.is_unique
+
+    async def test__stream_intraday_ticks(self, emulator):
+        emulator(intraday_ticks_per_minute=1)
+        bloomberg = AsyncBloomberg(max_sessions=2)
+        start = dt.datetime(2020, 1, 2, 14)
+
+        windows = [
+            (security, ticks.index[0], ticks.index[-1])
+            async for security, ticks, _ in bloomberg.stream_intraday_ticks(
+                ['security_1', 'security_3'],
+                start,
+                start + dt.timedelta(minutes=30),
+                window=dt.timedelta(minutes=10),
+                parallel_windows=4)
+            ]
+        await bloomberg.stop()
+
+        assert [security for security, _, _ in windows] == \
+               ['security_1'] * 3 + ['security_3'] * 3
+        assert windows[0][1:] == (start, start + dt.timedelta(minutes=9))
+        assert windows[2][1:] == (start + dt.timedelta(minutes=20),
+                                  start + dt.timedelta(minutes=30))
+
+    async def test__stream_intraday_ticks__close(self, emulator):
+        """
+        Requests of windows that were not read are cancelled
+        """
+        # windows of invalid security_1 are returned at once, windows
+        # of security_0 take 0.6 s
+        emulator(intraday_ticks_per_minute=60,
+                 intraday_ticks_per_message=10,
+                 events_per_second=100,
+                 invalid_security_rate=0.3)
+        bloomberg = AsyncBloomberg(max_sessions=2,
+                                   error_behaviour=ErrorBehaviour.RETURN)
+        start = dt.datetime(2020, 1, 2, 14)
+
+        stream = bloomberg.stream_intraday_ticks(
+            ['security_1', 'security_0'],
+            start,
+            start + dt.timedelta(minutes=30),
+            window=dt.timedelta(minutes=10),
+            parallel_windows=4)
+        security, _, errors = await stream.__anext__()
+        await stream.aclose()
+
+        assert security == 'security_1'
+        assert errors.invalid_securities == ['security_1']
+        assert all(not handler._current_requests
+                   for handler in bloomberg._request_handlers)
+
+        await bloomberg.stop()
+
+    async def test__record_timestamps(self, emulator):
+        emulator(record_timestamps=True)
+        bloomberg = AsyncBloomberg(max_securities_per_request=1)
+
+        await bloomberg.get_reference_data(['security_1', 'security_2'],
+                                           ['BID'])
+        await bloomberg.stop()
+
+        timestamps = list(env_test.get_emulator().timestamps.values())
+
+        assert len(timestamps) == 2
+        for request_timestamps in timestamps:
+            assert (request_timestamps['request']
+                    <= request_timestamps['first_response']
+                    <= request_timestamps['last_response'])
+
+    async def test__request_lifecycle(self, emulator):
+        emulator(securities_per_message=1)
+        bloomberg = AsyncBloomberg()
+        requests = []
+
+        def callback(request, stage, _):
+            if stage == RequestStage.PROCESSED:
+                requests.append(request)
+
+        add_lifecycle_callback(callback)
+        try:
+            await bloomberg.get_reference_data(['security_1', 'security_2'],
+                                               ['BID'])
+        finally:
+            remove_lifecycle_callback(callback)
+            await bloomberg.stop()
+
+        request, = requests
+        timestamps = [request.timestamps[stage] for stage in RequestStage]
+
+        assert timestamps == sorted(timestamps)
+
+    async def test__subscribe__time_field(self, emulator):
+        emulator(time_field='TIME')
+        bloomberg = AsyncBloomberg()
+
+        await bloomberg.subscribe(['security_1'], ['BID'])
+        await asyncio.sleep(0.05)
+        data = await bloomberg.read_subscriptions()
+        await bloomberg.stop()
+
+        assert data.at['security_1', 'TIME'] <= time.time()
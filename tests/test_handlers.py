@@ -5,9 +5,15 @@ import asyncio
 
 import pytest
 
+from async_blp.bars import BarAggregator
+from async_blp.enums import SlowConsumerPolicy
 from async_blp.handlers import RequestHandler
 from async_blp.handlers import SubscriptionHandler
+from async_blp.market_data import Tick
+from async_blp.market_data import TickStream
 from async_blp.requests import Subscription
+from async_blp.utils.env_test import Element
+from async_blp.utils.env_test import Event
 from async_blp.utils.env_test import Message
 from async_blp.utils.exc import BloombergException
 
@@ -119,7 +125,325 @@ class TestSubscriptionHandler:
         s_handler._current_requests = {
             msg.correlationIds()[0]: sub
             }
+        s_handler._topics = {
+            msg.correlationIds()[0]: security_id
+            }
         s_handler._subscriber_data_handler(market_data_event)
-        await asyncio.sleep(0.00001)
 
-        assert not sub._msg_queue.empty()
+        data = await s_handler.read_subscribers()
+        assert not data.empty
+        assert security_id in data.index
+
+    async def test__read_subscribers__security_id(self,
+                                                  session_options):
+        s_handler = SubscriptionHandler(session_options)
+        s_handler.last_values.update('F Equity', {'BID': 1.5})
+        s_handler.last_values.update('GM Equity', {'ASK': 2.5})
+
+        data = await s_handler.read_subscribers('GM Equity')
+
+        assert list(data.index) == ['GM Equity']
+        assert data.at['GM Equity', 'ASK'] == 2.5
+
+    async def test__subscribe__several_securities(self, session_options):
+        sub = Subscription(['F Equity', 'GM Equity'], ['BID'])
+
+        s_handler = SubscriptionHandler(session_options)
+        s_handler.session_started.set()
+        await s_handler.subscribe([sub])
+
+        assert sorted(s_handler._topics.values()) == ['F Equity', 'GM Equity']
+        assert s_handler.last_values.securities == ['F Equity', 'GM Equity']
+
+    async def test__add_consumer(self, session_options, market_data_event):
+        msg: Message = list(market_data_event)[0]
+        stream = TickStream()
+
+        s_handler = SubscriptionHandler(session_options)
+        s_handler._topics = {msg.correlationIds()[0]: 'F Equity'}
+        s_handler.add_consumer(stream)
+        s_handler._subscriber_data_handler(market_data_event)
+        s_handler.remove_consumer(stream)
+        s_handler._subscriber_data_handler(market_data_event)
+
+        assert len(stream) == 1
+        assert stream.get_nowait().security == 'F Equity'
+
+    async def test__slow_consumer__conflate(self,
+                                            session_options,
+                                            slow_consumer_event,
+                                            slow_consumer_cleared_event):
+        sub = Subscription(['F Equity', 'GM Equity'],
+                           ['BID'],
+                           conflation_interval=5)
+
+        s_handler = SubscriptionHandler(session_options,
+                                        slow_conflation_interval=0.5)
+        s_handler.session_started.set()
+        await s_handler.subscribe([sub])
+        s_handler._conflator.set_interval('F Equity', None)
+
+        s_handler._admin_handler(slow_consumer_event)
+
+        assert s_handler.is_slow
+        assert s_handler.admin_events['SlowConsumerWarning'] == 1
+        assert s_handler._conflator.get_interval('F Equity') == 0.5
+        assert s_handler._conflator.get_interval('GM Equity') == 5
+
+        s_handler._admin_handler(slow_consumer_cleared_event)
+
+        assert not s_handler.is_slow
+        assert s_handler._conflator.get_interval('F Equity') is None
+        assert s_handler._conflator.get_interval('GM Equity') == 5
+
+    async def test__slow_consumer__shed(self,
+                                        session_options,
+                                        market_data_event,
+                                        slow_consumer_event,
+                                        slow_consumer_cleared_event):
+        msg: Message = list(market_data_event)[0]
+        sub = Subscription('F Equity', ['BID'], priority=-1)
+
+        s_handler = SubscriptionHandler(
+            session_options,
+            slow_consumer_policy=SlowConsumerPolicy.SHED)
+        s_handler._subscribers[msg.correlationIds()[0]].append(sub)
+        s_handler._topics = {msg.correlationIds()[0]: 'F Equity'}
+
+        s_handler._admin_handler(slow_consumer_event)
+        s_handler._subscriber_data_handler(market_data_event)
+
+        assert s_handler.shed_messages == 1
+        assert s_handler.last_values.securities == []
+
+        s_handler._admin_handler(slow_consumer_cleared_event)
+        s_handler._subscriber_data_handler(market_data_event)
+
+        assert s_handler.shed_messages == 1
+        assert s_handler.last_values.securities == ['F Equity']
+
+    async def test__subscribe__shared_topic(self, session_options):
+        sub_1 = Subscription(['F Equity', 'GM Equity'], ['BID', 'ASK'])
+        sub_2 = Subscription(['F Equity'], ['ASK', 'BID'])
+        sub_3 = Subscription(['F Equity'], ['BID'], interval=1)
+
+        s_handler = SubscriptionHandler(session_options)
+        s_handler.session_started.set()
+        await s_handler.subscribe([sub_1])
+        await s_handler.subscribe([sub_2, sub_3])
+
+        assert len(s_handler._topics) == 3
+        assert sorted(s_handler._topics.values()) == ['F Equity',
+                                                      'F Equity',
+                                                      'GM Equity']
+
+    async def test__unsubscribe__shared_topic(self, session_options):
+        sub_1 = Subscription(['F Equity', 'GM Equity'], ['BID'])
+        sub_2 = Subscription(['F Equity'], ['BID'])
+
+        s_handler = SubscriptionHandler(session_options)
+        s_handler.session_started.set()
+        await s_handler.subscribe([sub_1, sub_2])
+
+        s_handler.unsubscribe([sub_1])
+
+        assert list(s_handler._topics.values()) == ['F Equity']
+        assert list(s_handler._current_requests.values()) == [sub_2]
+
+        s_handler.unsubscribe([sub_2])
+
+        assert not s_handler._topics
+        assert not s_handler._current_requests
+        assert not s_handler._topic_ids
+
+    async def test__put__delta(self, session_options):
+        sub = Subscription(['F Equity'], ['BID', 'ASK'], delta=True)
+        stream = TickStream()
+
+        s_handler = SubscriptionHandler(session_options)
+        s_handler.session_started.set()
+        await s_handler.subscribe([sub])
+        s_handler.add_consumer(stream)
+
+        s_handler.put(Tick('F Equity', {'BID': 1, 'ASK': 2}, 1))
+        s_handler.put(Tick('F Equity', {'BID': 1, 'ASK': 3}, 2))
+        s_handler.put(Tick('F Equity', {'BID': 1, 'ASK': 3}, 3))
+        s_handler.put(Tick('GM Equity', {'BID': 1}, 4))
+        s_handler.put(Tick('GM Equity', {'BID': 1}, 5))
+
+        assert [stream.get_nowait().values for _ in range(len(stream))] == [
+            {'BID': 1, 'ASK': 2},
+            {'ASK': 3},
+            {'BID': 1},
+            {'BID': 1},
+            ]
+
+    async def test__put__raw_consumer(self, session_options):
+        """
+        Bars are built from all trades, even if consumers receive only
+        conflated changes
+        """
+        sub = Subscription(['F Equity'],
+                           ['LAST_PRICE', 'SIZE_LAST_TRADE'],
+                           conflation_interval=10,
+                           delta=True)
+        stream = TickStream()
+        bars = TickStream()
+        aggregator = BarAggregator(bars, bar_size=10)
+
+        s_handler = SubscriptionHandler(session_options)
+        s_handler.session_started.set()
+        await s_handler.subscribe([sub])
+        s_handler.add_consumer(stream)
+        s_handler.add_consumer(aggregator, raw=True)
+
+        for time_, price in enumerate([2, 3, 1, 1, 2]):
+            s_handler.put(Tick('F Equity', {'LAST_PRICE':      price,
+                                            'SIZE_LAST_TRADE': 100},
+                               time_ + 1))
+        aggregator.flush(10)
+        s_handler.remove_consumer(aggregator)
+
+        assert len(stream) < 5
+        assert bars.get_nowait().values == {
+            'open':       2,
+            'high':       3,
+            'low':        1,
+            'close':      2,
+            'volume':     500,
+            'num_events': 5,
+            }
+        assert not s_handler._raw_consumers
+
+    async def test__unsubscribe__free_securities(self, session_options):
+        sub_1 = Subscription(['F Equity', 'GM Equity'], ['BID'],
+                             history_size=10,
+                             delta=True)
+        sub_2 = Subscription(['GM Equity'], ['ASK'])
+
+        s_handler = SubscriptionHandler(session_options)
+        s_handler.session_started.set()
+        await s_handler.subscribe([sub_1, sub_2])
+
+        s_handler.unsubscribe([sub_1])
+
+        assert s_handler.last_values.securities == ['GM Equity']
+        assert not s_handler._delta_securities
+        assert not s_handler.tick_history._tracked
+
+    async def test__subscriber_data_handler__unsubscribed(self,
+                                                          session_options):
+        sub_1 = Subscription(['F Equity'], ['BID'])
+        sub_2 = Subscription(['GM Equity'], ['BID'])
+        stream = TickStream()
+
+        s_handler = SubscriptionHandler(session_options)
+        s_handler.session_started.set()
+        await s_handler.subscribe([sub_1, sub_2])
+        s_handler.add_consumer(stream)
+        corr_ids = {security: corr_id
+                    for corr_id, security in s_handler._topics.items()}
+
+        s_handler.unsubscribe([sub_1])
+        s_handler._subscriber_data_handler(Event(Event.SUBSCRIPTION_DATA, [
+            Message('MarketDataEvents', None,
+                    {'BID': Element('BID', 1.5)},
+                    correlationId=corr_ids[security])
+            for security in ('F Equity', 'GM Equity')
+            ]))
+
+        assert len(stream) == 1
+        assert stream.get_nowait().security == 'GM Equity'
+
+    async def test__subscriber_data_handler__same_security(self,
+                                                           session_options):
+        sub_1 = Subscription(['F Equity'], ['BID'], history_size=10)
+        sub_2 = Subscription(['F Equity'], ['ASK'])
+        stream = TickStream()
+
+        s_handler = SubscriptionHandler(session_options)
+        s_handler.session_started.set()
+        await s_handler.subscribe([sub_1, sub_2])
+        s_handler.add_consumer(stream)
+
+        msg = Message('MarketDataEvents', None, {'BID': Element('BID', 1.5)})
+        msg._correlation_ids = list(s_handler._topics)
+        s_handler._subscriber_data_handler(Event(Event.SUBSCRIPTION_DATA,
+                                                 [msg]))
+
+        assert len(msg.correlationIds()) == 2
+        assert len(stream) == 1
+        assert len(s_handler.tick_history.window('F Equity', 'BID')[0]) == 1
+
+    async def test__subscribe__shared_security_settings(self,
+                                                        session_options):
+        """
+        Settings of one subscription don't change ticks of another
+        subscription of the same security
+        """
+        sub_1 = Subscription(['F Equity'], ['BID'],
+                             conflation_interval=5,
+                             history_size=10,
+                             delta=True)
+        sub_2 = Subscription(['F Equity'], ['ASK'])
+        stream = TickStream()
+
+        s_handler = SubscriptionHandler(session_options)
+        s_handler.session_started.set()
+        await s_handler.subscribe([sub_1])
+
+        assert s_handler._delta_securities == {'F Equity'}
+        assert s_handler._conflator.get_interval('F Equity') == 5
+
+        await s_handler.subscribe([sub_2])
+        s_handler.add_consumer(stream)
+        s_handler.put(Tick('F Equity', {'BID': 1, 'ASK': 2}, 1))
+        s_handler.put(Tick('F Equity', {'BID': 1, 'ASK': 2}, 2))
+
+        assert not s_handler._delta_securities
+        assert s_handler._conflator.get_interval('F Equity') is None
+        assert len(stream) == 2
+        assert 'F Equity' in s_handler.tick_history._tracked
+
+        s_handler.unsubscribe([sub_1])
+
+        assert not s_handler.tick_history._tracked
+
+        await s_handler.subscribe([sub_1])
+        s_handler.unsubscribe([sub_2])
+
+        assert s_handler._delta_securities == {'F Equity'}
+        assert s_handler._conflator.get_interval('F Equity') == 5
+
+    async def test__modify_subscription(self, session_options):
+        sub = Subscription(['F Equity'], ['BID'])
+
+        s_handler = SubscriptionHandler(session_options)
+        s_handler.session_started.set()
+        await s_handler.subscribe([sub])
+        corr_ids = list(s_handler._topics)
+
+        await s_handler.modify_subscription(sub, ['BID', 'ASK'])
+
+        assert list(s_handler._topics) == corr_ids
+        assert list(s_handler._topic_ids) == [('F Equity',
+                                               ('ASK', 'BID'),
+                                               ())]
+        assert s_handler.last_values.fields == ['BID', 'ASK']
+
+    async def test__modify_subscription__shared_topic(self,
+                                                      session_options):
+        sub_1 = Subscription(['F Equity'], ['BID'])
+        sub_2 = Subscription(['F Equity'], ['BID'])
+
+        s_handler = SubscriptionHandler(session_options)
+        s_handler.session_started.set()
+        await s_handler.subscribe([sub_1, sub_2])
+
+        await s_handler.modify_subscription(sub_2, ['ASK'])
+
+        assert len(s_handler._topics) == 2
+        assert sorted(s_handler._topic_ids) == [
+            ('F Equity', ('ASK',), ()),
+            ('F Equity', ('BID',), ()),
+            ]
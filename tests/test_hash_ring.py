@@ -0,0 +1,52 @@
+import pytest
+
+from async_blp.utils.hash_ring import ConsistentHashRing
+
+
+class TestConsistentHashRing:
+
+    def test__get_node__empty(self):
+        ring = ConsistentHashRing()
+
+        with pytest.raises(RuntimeError):
+            ring.get_node('security')
+
+    def test__get_node__stable(self):
+        ring_1 = ConsistentHashRing(range(4))
+        ring_2 = ConsistentHashRing(range(4))
+
+        for i in range(100):
+            assert ring_1.get_node(f'security_{i}') == \
+                   ring_2.get_node(f'security_{i}')
+
+    def test__get_node__distribution(self):
+        ring = ConsistentHashRing(range(4))
+
+        nodes = {ring.get_node(f'security_{i}') for i in range(1000)}
+
+        assert nodes == {0, 1, 2, 3}
+
+    def test__add_node(self):
+        ring = ConsistentHashRing(range(4))
+        securities = [f'security_{i}' for i in range(1000)]
+        old_nodes = {security: ring.get_node(security)
+                     for security in securities}
+
+        ring.add_node(4)
+
+        for security in securities:
+            new_node = ring.get_node(security)
+            assert new_node in (old_nodes[security], 4)
+
+    def test__remove_node(self):
+        ring = ConsistentHashRing(range(4))
+        securities = [f'security_{i}' for i in range(1000)]
+        old_nodes = {security: ring.get_node(security)
+                     for security in securities}
+
+        ring.remove_node(3)
+
+        assert len(ring) == 3
+        for security in securities:
+            if old_nodes[security] != 3:
+                assert ring.get_node(security) == old_nodes[security]
@@ -0,0 +1,91 @@
+import pandas as pd
+
+from async_blp.enums import SecurityIdType
+from async_blp.identifiers import SecurityIdMap
+from async_blp.identifiers import split_security_id
+
+
+def test__split_security_id__prefix():
+    id_type, security_id = split_security_id('/isin/US3453708600')
+
+    assert id_type == SecurityIdType.ISIN
+    assert security_id == 'US3453708600'
+
+
+def test__split_security_id__no_prefix():
+    id_type, security_id = split_security_id('F US Equity')
+
+    assert id_type == SecurityIdType.TICKER
+    assert security_id == 'F US Equity'
+
+
+class TestSecurityIdMap:
+
+    def test__get(self):
+        id_map = SecurityIdMap()
+        id_map.add({
+            SecurityIdType.TICKER: 'F US Equity',
+            SecurityIdType.ISIN:   'US3453708600',
+            })
+
+        assert id_map.get('US3453708600',
+                          SecurityIdType.TICKER,
+                          SecurityIdType.ISIN) == 'F US Equity'
+        assert id_map.get('F US Equity',
+                          SecurityIdType.ISIN) == 'US3453708600'
+        assert id_map.get('F US Equity', SecurityIdType.CUSIP) is None
+
+    def test__add__merge(self):
+        id_map = SecurityIdMap()
+        id_map.add({SecurityIdType.TICKER: 'F US Equity',
+                    SecurityIdType.ISIN:   'US3453708600'})
+        id_map.add({SecurityIdType.CUSIP: '345370860',
+                    SecurityIdType.BL_GLOBAL_IDENTIFIER: 'BBG000BQPC32'})
+        id_map.add({SecurityIdType.ISIN:  'US3453708600',
+                    SecurityIdType.CUSIP: '345370860'})
+
+        assert id_map.get('F US Equity',
+                          SecurityIdType.BL_GLOBAL_IDENTIFIER
+                          ) == 'BBG000BQPC32'
+
+    def test__rewrite(self):
+        id_map = SecurityIdMap()
+        id_map.add({SecurityIdType.ISIN: 'US3453708600',
+                    SecurityIdType.BL_GLOBAL_IDENTIFIER: 'BBG000BQPC32'})
+
+        query_ids = id_map.rewrite(['US3453708600', 'US0378331005'],
+                                   SecurityIdType.ISIN)
+
+        assert query_ids == {
+            'US3453708600': '/bbgid/BBG000BQPC32',
+            'US0378331005': '/isin/US0378331005',
+            }
+
+    def test__update_from_frame(self):
+        id_map = SecurityIdMap()
+        data = pd.DataFrame([['BBG000BQPC32', 'F US Equity'],
+                             [None, None]],
+                            index=['US3453708600', 'US0378331005'],
+                            columns=['ID_BB_GLOBAL', 'PARSEKYABLE_DES'])
+
+        id_map.update_from_frame(data, SecurityIdType.ISIN)
+
+        assert id_map.get('/bbgid/BBG000BQPC32',
+                          SecurityIdType.ISIN) == 'US3453708600'
+        assert id_map.get('US0378331005',
+                          SecurityIdType.TICKER,
+                          SecurityIdType.ISIN) is None
+
+    def test__save_load(self, tmp_path):
+        path = str(tmp_path / 'ids.json')
+        id_map = SecurityIdMap(path)
+        id_map.add({SecurityIdType.TICKER: 'F US Equity',
+                    SecurityIdType.SEDOL:  '2615468'})
+        id_map.save()
+
+        loaded_map = SecurityIdMap(path)
+
+        assert len(loaded_map) == 2
+        assert loaded_map.get('2615468',
+                              SecurityIdType.TICKER,
+                              SecurityIdType.SEDOL) == 'F US Equity'
@@ -0,0 +1,59 @@
+import logging
+
+import pytest
+
+from async_blp.utils import log
+from async_blp.utils.log import TRACE
+
+
+@pytest.fixture()
+def trace():
+    """
+    Restore level and handlers of the shared logger after the test
+    """
+    logger = log.get_logger()
+    level = logger.level
+    handlers = list(logger.handlers)
+
+    yield TRACE
+
+    logger.setLevel(level)
+    for handler in list(logger.handlers):
+        if handler not in handlers:
+            logger.removeHandler(handler)
+
+    log.set_trace()
+
+
+class TestTrace:
+
+    def test__refresh(self, trace):
+        logger = log.get_logger()
+
+        logger.setLevel(logging.WARNING)
+        trace.refresh()
+        assert not trace.enabled
+
+        logger.setLevel(logging.DEBUG)
+        trace.refresh()
+        assert trace.enabled
+
+    def test__set_logger(self, trace):
+        log.set_logger(logging.DEBUG)
+
+        assert trace.enabled
+
+    def test__set_trace__disabled(self, trace):
+        log.set_trace(enabled=False)
+
+        assert not trace.enabled
+
+    def test__sample_every(self, trace, caplog):
+        log.set_trace(sample_every=3)
+
+        with caplog.at_level(logging.DEBUG, log.TRACE_LOGGER_NAME):
+            for i in range(9):
+                trace('message %s', i)
+
+        assert [record.getMessage() for record in caplog.records] == [
+            'message 2', 'message 5', 'message 8']
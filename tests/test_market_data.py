@@ -0,0 +1,284 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from async_blp.enums import OverflowPolicy
+from async_blp.market_data import Conflator
+from async_blp.market_data import LastValueCache
+from async_blp.market_data import RingBuffer
+from async_blp.market_data import Tick
+from async_blp.market_data import TickHistory
+from async_blp.market_data import TickStream
+
+
+class TestLastValueCache:
+
+    def test__update(self):
+        cache = LastValueCache(['security_1'], ['field_1'])
+
+        cache.update('security_1', {'field_1': 1.5})
+        cache.update('security_1', {'field_1': 2.5})
+
+        assert cache.get('security_1', 'field_1') == 2.5
+        assert np.isnan(cache.get('security_2', 'field_1'))
+
+    def test__update__changed(self):
+        cache = LastValueCache()
+
+        changed_1 = cache.update('security_1', {'field_1': 1.5,
+                                                'field_2': 'a'})
+        changed_2 = cache.update('security_1', {'field_1': 1.5,
+                                                'field_2': 'b',
+                                                'field_3': 1})
+
+        assert changed_1 == {'field_1': 1.5, 'field_2': 'a'}
+        assert changed_2 == {'field_2': 'b', 'field_3': 1}
+
+    def test__remove(self):
+        cache = LastValueCache()
+        for i in range(3):
+            cache.update(f'security_{i}', {'field_1': i})
+
+        cache.remove(['security_0', 'security_3'])
+
+        assert cache.securities == ['security_1', 'security_2']
+        assert cache.get('security_1', 'field_1') == 1
+        assert cache.get('security_2', 'field_1') == 2
+        assert np.isnan(cache.get('security_0', 'field_1'))
+
+    def test__update__resize(self):
+        cache = LastValueCache()
+
+        for i in range(10):
+            cache.update(f'security_{i}', {f'field_{i}': i})
+
+        assert len(cache.securities) == 10
+        assert len(cache.fields) == 10
+        assert cache.get('security_9', 'field_9') == 9
+        assert cache.get('security_0', 'field_0') == 0
+
+    def test__snapshot(self):
+        cache = LastValueCache(['security_1', 'security_2'], ['field_1'])
+        cache.update('security_2', {'field_1': 1.5})
+
+        data = cache.snapshot()
+        cache.update('security_2', {'field_1': 2.5})
+
+        expected_data = pd.DataFrame([[np.nan], [1.5]],
+                                     index=['security_1', 'security_2'],
+                                     columns=['field_1'],
+                                     dtype=object)
+
+        pd.testing.assert_frame_equal(expected_data, data)
+
+    def test__snapshot__securities(self):
+        cache = LastValueCache(['security_1', 'security_2'], ['field_1'])
+        cache.update('security_2', {'field_1': 1.5})
+
+        data = cache.snapshot(['security_2', 'security_3'])
+
+        assert list(data.index) == ['security_2']
+        assert data.at['security_2', 'field_1'] == 1.5
+
+
+@pytest.mark.asyncio
+class TestTickStream:
+
+    async def test__put__filter(self):
+        stream = TickStream(securities=['security_1'], fields=['field_1'])
+
+        stream.put(Tick('security_2', {'field_1': 1}, 0))
+        stream.put(Tick('security_1', {'field_2': 1}, 0))
+        stream.put(Tick('security_1', {'field_1': 1, 'field_2': 2}, 0))
+
+        assert len(stream) == 1
+        assert stream.get_nowait().values == {'field_1': 1}
+
+    async def test__put__conflate(self):
+        stream = TickStream(maxsize=2, overflow=OverflowPolicy.CONFLATE)
+
+        stream.put(Tick('security_1', {'field_1': 1}, 0))
+        stream.put(Tick('security_2', {'field_1': 2}, 0))
+        stream.put(Tick('security_1', {'field_2': 3}, 1))
+        stream.put(Tick('security_3', {'field_1': 4}, 2))
+
+        assert stream.dropped == 2
+        assert stream.get_nowait() == Tick('security_2', {'field_1': 2}, 0)
+        assert stream.get_nowait() == Tick('security_3', {'field_1': 4}, 2)
+        assert stream.get_nowait() is None
+
+    async def test__put__drop_oldest(self):
+        stream = TickStream(maxsize=1, overflow=OverflowPolicy.DROP_OLDEST)
+
+        stream.put(Tick('security_1', {'field_1': 1}, 0))
+        stream.put(Tick('security_1', {'field_1': 2}, 1))
+
+        assert stream.dropped == 1
+        assert stream.get_nowait() == Tick('security_1', {'field_1': 2}, 1)
+
+    async def test__put__block(self):
+        stream = TickStream(maxsize=1, overflow=OverflowPolicy.BLOCK)
+        stream.put(Tick('security_1', {'field_1': 1}, 0))
+
+        thread = threading.Thread(
+            target=stream.put,
+            args=(Tick('security_1', {'field_1': 2}, 1),))
+        thread.start()
+        thread.join(0.01)
+        assert thread.is_alive()
+
+        assert (await stream.__anext__()).values == {'field_1': 1}
+        thread.join(1)
+        assert (await stream.__anext__()).values == {'field_1': 2}
+
+    async def test__put__block__loop_thread(self):
+        """
+        Ticks put inside the loop can't wait for the reader
+        """
+        stream = TickStream(maxsize=1, overflow=OverflowPolicy.BLOCK)
+
+        stream.put(Tick('security_1', {'field_1': 1}, 0))
+        stream.put(Tick('security_1', {'field_1': 2}, 1))
+
+        assert stream.dropped == 1
+        assert stream.get_nowait().values == {'field_1': 2}
+
+    async def test__async_for(self):
+        stream = TickStream()
+
+        def put_ticks():
+            for i in range(3):
+                stream.put(Tick('security_1', {'field_1': i}, i))
+            stream.close()
+
+        threading.Thread(target=put_ticks).start()
+
+        ticks = [tick async for tick in stream]
+
+        assert [tick.values['field_1'] for tick in ticks] == [0, 1, 2]
+
+
+class TestConflator:
+
+    def test__offer__no_interval(self):
+        conflator = Conflator()
+        tick = Tick('security_1', {'field_1': 1}, 0)
+
+        assert conflator.offer(tick) is tick
+
+    def test__offer(self):
+        conflator = Conflator()
+        conflator.set_interval('security_1', 1)
+
+        first_tick = conflator.offer(Tick('security_1', {'field_1': 1}, 0))
+        delayed_tick = conflator.offer(Tick('security_1', {'field_2': 2}, 0.5))
+        last_tick = conflator.offer(Tick('security_1', {'field_1': 3}, 1))
+
+        assert first_tick.values == {'field_1': 1}
+        assert delayed_tick is None
+        assert last_tick == Tick('security_1', {'field_1': 3, 'field_2': 2}, 1)
+
+    def test__remove(self):
+        conflator = Conflator()
+        conflator.set_interval('security_1', 1)
+        conflator.offer(Tick('security_1', {'field_1': 1}, 0))
+        conflator.offer(Tick('security_1', {'field_1': 2}, 0.5))
+
+        conflator.remove('security_1')
+
+        assert conflator.get_interval('security_1') is None
+        assert conflator.flush(10) == []
+
+    def test__flush(self):
+        conflator = Conflator()
+        conflator.set_interval('security_1', 1)
+        conflator.offer(Tick('security_1', {'field_1': 1}, 0))
+        conflator.offer(Tick('security_1', {'field_1': 2}, 0.5))
+
+        assert conflator.flush(0.9) == []
+        assert conflator.flush(1) == [Tick('security_1', {'field_1': 2}, 0.5)]
+        assert conflator.flush(2) == []
+
+
+class TestRingBuffer:
+
+    def test__window(self):
+        buffer = RingBuffer(3)
+
+        for i in range(5):
+            buffer.append(i, i * 10)
+
+        times, values = buffer.window()
+
+        np.testing.assert_array_equal(times, [2, 3, 4])
+        np.testing.assert_array_equal(values, [20, 30, 40])
+
+    def test__window__size(self):
+        buffer = RingBuffer(3)
+
+        for i in range(2):
+            buffer.append(i, i * 10)
+
+        times, values = buffer.window(5)
+        np.testing.assert_array_equal(times, [0, 1])
+
+        times, values = buffer.window(1)
+        np.testing.assert_array_equal(values, [10])
+
+    def test__window__view(self):
+        buffer = RingBuffer(3)
+        buffer.append(0, 0)
+
+        _, values = buffer.window()
+
+        assert values.base is not None
+
+
+class TestTickHistory:
+
+    def test__put(self):
+        history = TickHistory()
+        history.track('security_1', 2, ['field_1', 'field_2'])
+
+        history.put(Tick('security_1', {'field_1': 1.5, 'field_3': 1}, 10))
+        history.put(Tick('security_1', {'field_1': 2.5, 'field_2': 'a'}, 11))
+        history.put(Tick('security_2', {'field_1': 1.5}, 12))
+
+        times, values = history.window('security_1', 'field_1')
+
+        np.testing.assert_array_equal(times, [10, 11])
+        np.testing.assert_array_equal(values, [1.5, 2.5])
+        assert len(history.window('security_1', 'field_2')[0]) == 0
+        assert len(history.window('security_2', 'field_1')[0]) == 0
+
+    def test__track__resize(self):
+        history = TickHistory()
+        history.track('security_1', 2)
+
+        for i in range(3):
+            history.put(Tick('security_1', {'field_1': i, 'field_2': i}, i))
+
+        history.track('security_1', 100, ['field_1'])
+        for i in range(3, 6):
+            history.put(Tick('security_1', {'field_1': i}, i))
+
+        times, _ = history.window('security_1', 'field_1')
+        np.testing.assert_array_equal(times, [1, 2, 3, 4, 5])
+        assert len(history.window('security_1', 'field_2')[0]) == 0
+
+        history.track('security_1', 2)
+
+        times, _ = history.window('security_1', 'field_1')
+        np.testing.assert_array_equal(times, [4, 5])
+
+    def test__untrack(self):
+        history = TickHistory()
+        history.track('security_1', 2)
+        history.put(Tick('security_1', {'field_1': 1.5}, 10))
+
+        history.untrack('security_1')
+        history.put(Tick('security_1', {'field_1': 1.5}, 10))
+
+        assert len(history.window('security_1', 'field_1')[0]) == 0
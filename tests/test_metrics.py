@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+
+from async_blp import AsyncBloomberg
+from async_blp.metrics import BloombergMetrics
+from async_blp.metrics import MetricsRegistry
+from async_blp.metrics import PeriodicSink
+from async_blp.metrics import PrometheusEndpoint
+from async_blp.utils import env_test
+from async_blp.utils.env_test import EmulatorConfig
+
+
+class TestMetricsRegistry:
+
+    def test__counter(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('messages', 'Messages', ('handler',))
+
+        counter.inc(handler='a')
+        counter.inc(2, handler='a')
+
+        assert counter.get(handler='a') == 3
+        assert counter.get(handler='b') == 0
+
+    def test__counter__wrong_labels(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('messages', 'Messages', ('handler',))
+
+        with pytest.raises(ValueError):
+            counter.inc(service='a')
+
+    def test__register__duplicate(self):
+        registry = MetricsRegistry()
+        registry.gauge('load', 'Load')
+
+        with pytest.raises(ValueError):
+            registry.counter('load', 'Load')
+
+    def test__to_text(self):
+        registry = MetricsRegistry()
+        registry.gauge('load', 'Current load', ('handler',)).set(
+            5, handler='a"b')
+        histogram = registry.histogram('latency', 'Latency', (),
+                                       buckets=(0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        assert registry.to_text() == (
+            '# HELP load Current load\n'
+            '# TYPE load gauge\n'
+            'load{handler="a\\"b"} 5.0\n'
+            '# HELP latency Latency\n'
+            '# TYPE latency histogram\n'
+            'latency_bucket{le="0.1"} 1.0\n'
+            'latency_bucket{le="1.0"} 2.0\n'
+            'latency_bucket{le="+Inf"} 3.0\n'
+            'latency_sum 5.55\n'
+            'latency_count 3.0\n')
+
+    def test__collector(self):
+        registry = MetricsRegistry()
+        gauge = registry.gauge('value', 'Value')
+        registry.add_collector(lambda: gauge.set(10))
+
+        sample, = registry.collect()
+
+        assert sample.value == 10
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(10)
+class TestBloombergMetrics:
+
+    async def test__get_reference_data(self):
+        env_test.enable_emulator(EmulatorConfig(securities_per_message=1))
+        metrics = BloombergMetrics()
+        bloomberg = AsyncBloomberg(max_sessions=1,
+                                   max_securities_per_request=2,
+                                   metrics=metrics)
+
+        try:
+            await bloomberg.get_reference_data(
+                [f'security_{i}' for i in range(4)], ['BID'])
+            text = metrics.registry.to_text()
+            await bloomberg.stop()
+        finally:
+            env_test.disable_emulator()
+
+        assert metrics.request_latency.get_count(
+            request_type='ReferenceDataRequest') == 2
+        assert metrics.service_open_time.get_count(
+            handler='RequestHandler_0', service='//blp/refdata') == 1
+        assert metrics.messages.get(handler='RequestHandler_0',
+                                    event_type='RESPONSE') == 2
+
+        assert 'async_blp_requests_in_flight{handler="RequestHandler_0"} ' \
+               '0.0' in text
+        assert 'async_blp_requests_in_flight{' \
+               not in metrics.registry.to_text()
+
+    async def test__admin_events(self, slow_consumer_event):
+        metrics = BloombergMetrics()
+        bloomberg = AsyncBloomberg(metrics=metrics)
+        handler = bloomberg._get_subscription_handler(0)
+
+        handler(slow_consumer_event, None)
+
+        assert metrics.admin_events.get(
+            handler='SubscriptionHandler_0',
+            message='SlowConsumerWarning') == 1
+        assert metrics.slow_consumer in metrics.registry.get_metrics()
+        assert metrics.slow_consumer.get(handler='SubscriptionHandler_0') == 1
+
+        await bloomberg.stop()
+
+        assert not metrics._handlers
+        assert list(metrics.slow_consumer.samples()) == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(10)
+class TestMetricsSinks:
+
+    async def test__prometheus_endpoint(self):
+        registry = MetricsRegistry()
+        registry.counter('messages', 'Messages').inc()
+        endpoint = PrometheusEndpoint(registry, port=0)
+        await endpoint.start()
+
+        reader, writer = await asyncio.open_connection(endpoint.host,
+                                                       endpoint.port)
+        writer.write(b'GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        response = await reader.read()
+        writer.close()
+        await endpoint.stop()
+
+        assert response.startswith(b'HTTP/1.1 200 OK')
+        assert response.endswith(b'messages 1.0\n')
+
+    async def test__prometheus_endpoint__not_found(self):
+        endpoint = PrometheusEndpoint(MetricsRegistry(), port=0)
+        await endpoint.start()
+
+        reader, writer = await asyncio.open_connection(endpoint.host,
+                                                       endpoint.port)
+        writer.write(b'GET / HTTP/1.1\r\n\r\n')
+        response = await reader.read()
+        writer.close()
+        await endpoint.stop()
+
+        assert response.startswith(b'HTTP/1.1 404 Not Found')
+
+    async def test__periodic_sink(self):
+        registry = MetricsRegistry()
+        registry.counter('messages', 'Messages').inc()
+        exported = []
+        sink = PeriodicSink(registry, exported.append, interval=0.01)
+
+        await sink.start()
+        await asyncio.sleep(0.05)
+        await sink.stop()
+
+        assert exported
+        assert exported[0][0].value == 1
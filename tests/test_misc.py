@@ -0,0 +1,40 @@
+import datetime as dt
+
+import pytest
+
+from async_blp.utils.misc import split_into_chunks
+from async_blp.utils.misc import split_time_range
+
+
+def test__split_into_chunks():
+    chunks = list(split_into_chunks([1, 2, 3, 4, 5], 2))
+
+    assert chunks == [[1, 2], [3, 4], [5]]
+
+
+def test__split_time_range():
+    start = dt.datetime(2020, 1, 2, 14)
+    end = dt.datetime(2020, 1, 2, 16, 30)
+
+    windows = list(split_time_range(start, end, dt.timedelta(hours=1)))
+
+    assert windows == [
+        (start, dt.datetime(2020, 1, 2, 15)),
+        (dt.datetime(2020, 1, 2, 15), dt.datetime(2020, 1, 2, 16)),
+        (dt.datetime(2020, 1, 2, 16), end),
+        ]
+
+
+def test__split_time_range__empty():
+    start = dt.datetime(2020, 1, 2, 14)
+
+    assert not list(split_time_range(start, start, dt.timedelta(hours=1)))
+
+
+def test__split_time_range__wrong_window():
+    start = dt.datetime(2020, 1, 2, 14)
+
+    with pytest.raises(ValueError):
+        list(split_time_range(start,
+                              start + dt.timedelta(hours=1),
+                              dt.timedelta(0)))
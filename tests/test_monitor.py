@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+from async_blp import AsyncBloomberg
+from async_blp.metrics import MetricsRegistry
+from async_blp.monitor import Monitor
+from async_blp.requests import ReferenceDataRequest
+from async_blp.utils import env_test
+from async_blp.utils.env_test import EmulatorConfig
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(10)
+class TestMonitor:
+
+    async def test__loop_lag(self):
+        alerts = []
+        monitor = Monitor(interval=0.01,
+                          loop_lag_threshold=0.02,
+                          on_alert=alerts.append)
+        monitor.start()
+
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+
+        assert monitor.max_loop_lag >= 0.05
+        assert alerts[0].kind == 'loop_lag'
+
+    async def test__on_callback(self):
+        alerts = []
+        registry = MetricsRegistry()
+        monitor = Monitor(callback_time_threshold=0.1,
+                          on_alert=alerts.append,
+                          registry=registry)
+        monitor.start()
+
+        monitor.on_callback(env_test.Event.RESPONSE, 0.01)
+        monitor.on_callback(env_test.Event.RESPONSE, 0.2)
+        await asyncio.sleep(0)
+        await monitor.stop()
+
+        stats = monitor.get_stats()['callback_time']['RESPONSE']
+
+        assert stats['count'] == 2
+        assert stats['total'] == pytest.approx(0.21)
+        assert stats['max'] == 0.2
+        assert alerts == [('callback_time', 0.2, 0.1, 'RESPONSE')]
+        assert 'async_blp_callback_seconds_count{event_type="RESPONSE"} ' \
+               '2.0' in registry.to_text()
+
+    async def test__on_callback__not_started(self):
+        alerts = []
+        monitor = Monitor(callback_time_threshold=0.1,
+                          on_alert=alerts.append)
+
+        monitor.on_callback(env_test.Event.RESPONSE, 0.2)
+        await asyncio.sleep(0)
+
+        assert monitor.alerts == 1
+        assert alerts == []
+
+    async def test__queue_age(self):
+        alerts = []
+        monitor = Monitor(interval=0.01,
+                          queue_age_threshold=0.02,
+                          on_alert=alerts.append)
+        request = ReferenceDataRequest(['security_id'], ['BID'])
+        monitor.add_request(request)
+        monitor.start()
+
+        request.send_queue_message(None)
+        await asyncio.sleep(0.05)
+
+        assert monitor.queue_age >= 0.02
+        assert alerts[0].kind == 'queue_age'
+        assert alerts[0].source == 'ReferenceDataRequest'
+
+        await request.process()
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+
+        assert request.queue_age == 0
+        assert monitor.queue_age == 0
+
+    async def test__async_bloomberg(self):
+        env_test.enable_emulator(EmulatorConfig())
+        monitor = Monitor()
+        bloomberg = AsyncBloomberg(monitor=monitor)
+
+        try:
+            await bloomberg.get_reference_data(['security_1'], ['BID'])
+            await bloomberg.stop()
+        finally:
+            env_test.disable_emulator()
+
+        stats = monitor.get_stats()['callback_time']
+
+        assert stats['RESPONSE']['count'] == 1
+        assert stats['SESSION_STATUS']['count'] == 2
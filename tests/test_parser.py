@@ -1,5 +1,6 @@
 import datetime as dt
 
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -13,7 +14,10 @@ from async_blp.parser import parse_errors
 from async_blp.parser import parse_field_data
 from async_blp.parser import parse_field_exceptions
 from async_blp.parser import parse_historical_security_data
+from async_blp.parser import parse_intraday_bars
+from async_blp.parser import parse_intraday_ticks
 from async_blp.parser import parse_reference_security_data
+from async_blp.utils.env_test import Element
 from async_blp.utils.exc import BloombergException
 
 
@@ -73,6 +77,22 @@ def test___parse_security_data(security_data_array,
     pd.testing.assert_frame_equal(actual_df, required_df)
 
 
+def test___parse_security_data__security_id_type(security_data_with_type,
+                                                simple_field_data,
+                                                ):
+    field_name, field_value, security_id = simple_field_data
+
+    required_df = pd.DataFrame([[field_value]],
+                               index=[security_id],
+                               columns=[field_name],
+                               )
+
+    actual_df = parse_reference_security_data(security_data_with_type,
+                                              SecurityIdType.ISIN)
+
+    pd.testing.assert_frame_equal(actual_df, required_df)
+
+
 def test___parse_field_exceptions(field_exceptions,
                                   simple_field_data):
     field_name, _, security_id = simple_field_data
@@ -168,3 +188,39 @@ def test__parse_historical_security_data(simple_field_data,
                                columns=[field_name])
 
     pd.testing.assert_frame_equal(parsed_df, expected_df)
+
+
+def test__parse_intraday_bars(bar_data_msg, bar_data_values):
+    columns = parse_intraday_bars(bar_data_msg.getElement('barData'))
+
+    assert columns['time'].dtype == np.dtype('datetime64[ns]')
+    assert columns['open'].dtype == np.float64
+    assert columns['volume'].dtype == np.int64
+
+    for name, values in columns.items():
+        expected = [bar[name] for bar in bar_data_values]
+        if name == 'time':
+            expected = pd.DatetimeIndex(expected).values
+
+        np.testing.assert_array_equal(values, expected)
+
+
+def test__parse_intraday_bars__empty():
+    bar_data = Element('barData', None, {
+        'barTickData': Element('barTickData', None, []),
+        })
+
+    columns = parse_intraday_bars(bar_data)
+
+    assert all(len(values) == 0 for values in columns.values())
+    assert columns['time'].dtype == np.dtype('datetime64[ns]')
+
+
+def test__parse_intraday_ticks(tick_data_msg):
+    columns = parse_intraday_ticks(tick_data_msg.getElement('tickData'))
+
+    assert list(columns['type']) == ['TRADE', 'BID']
+    assert columns['time'][1] == np.datetime64('2020-01-02T14:30:01')
+    assert columns['value'].dtype == np.float64
+    assert columns['size'].dtype == np.int64
+    np.testing.assert_array_equal(columns['size'], [200, 1000])
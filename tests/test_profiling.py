@@ -0,0 +1,97 @@
+import asyncio
+import pstats
+
+import pytest
+
+from async_blp import AsyncBloomberg
+from async_blp.profiling import ASSEMBLY
+from async_blp.profiling import PARSE
+from async_blp.profiling import RequestProfiler
+from async_blp.utils import env_test
+from async_blp.utils.env_test import EmulatorConfig
+
+
+def parse_values(size):
+    return [str(i) for i in range(size)]
+
+
+async def process(queue):
+    values = []
+
+    while True:
+        size = await queue.get()
+        if size is None:
+            return values
+
+        values.extend(parse_values(size))
+
+
+@pytest.mark.asyncio
+@pytest.mark.timeout(10)
+class TestRequestProfiler:
+
+    async def test__wrap(self):
+        profiler = RequestProfiler()
+        queue = asyncio.Queue()
+
+        for item in (10, 20, None):
+            queue.put_nowait(item)
+
+        values = await profiler.wrap('Request', process(queue))
+
+        assert len(values) == 30
+        assert profiler.get_request_types() == [('Request', PARSE)]
+        assert 'parse_values' in profiler.format_stats('Request')
+
+    async def test__wrap__cancel(self):
+        profiler = RequestProfiler()
+        task = asyncio.create_task(profiler.wrap('Request',
+                                                 process(asyncio.Queue())))
+        await asyncio.sleep(0)
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    async def test__memory(self):
+        profiler = RequestProfiler(cpu=False, memory=True)
+
+        with profiler.profile('Request'):
+            values = parse_values(1000)
+
+        profiler.stop()
+
+        memory_stats = profiler.get_memory_stats()['Request'][ASSEMBLY]
+        assert memory_stats['steps'] == 1
+        assert memory_stats['memory'] > 0
+        assert profiler.get_stats() is None
+        assert values
+
+    async def test__dump_stats(self, tmp_path):
+        profiler = RequestProfiler()
+
+        with profiler.profile('Request'):
+            parse_values(10)
+
+        path, = profiler.dump_stats(str(tmp_path))
+
+        assert path.endswith('Request.assembly.prof')
+        assert pstats.Stats(path).total_calls > 0
+
+    async def test__async_bloomberg(self):
+        env_test.enable_emulator(EmulatorConfig())
+        profiler = RequestProfiler()
+        bloomberg = AsyncBloomberg(profiler=profiler)
+
+        try:
+            await bloomberg.get_reference_data(['security_1'], ['BID'])
+            await bloomberg.stop()
+        finally:
+            env_test.disable_emulator()
+
+        assert sorted(profiler.get_request_types()) == [
+            ('ReferenceDataRequest', ASSEMBLY),
+            ('ReferenceDataRequest', PARSE),
+            ]
+        assert 'parse_reference_security_data' in profiler.format_stats(
+            stage=PARSE)
@@ -0,0 +1,125 @@
+import datetime as dt
+import time
+
+import pytest
+
+from async_blp.handlers import SubscriptionHandler
+from async_blp.market_data import Tick
+from async_blp.market_data import TickStream
+from async_blp.recording import TickRecorder
+from async_blp.recording import TickReplay
+from async_blp.recording import get_recorded_files
+from async_blp.recording import read_ticks
+
+
+def get_ticks(num_ticks):
+    return [Tick(f'security_{i % 3}', {'BID': float(i), 'ASK': 'n/a'}, i)
+            for i in range(num_ticks)]
+
+
+@pytest.mark.asyncio
+class TestTickRecorder:
+
+    def test__put(self, tmp_path):
+        path = str(tmp_path / 'ticks')
+        recorder = TickRecorder(path, batch_size=4)
+
+        for tick in get_ticks(10):
+            recorder.put(tick)
+        recorder.flush()
+
+        assert list(read_ticks(path)) == get_ticks(10)
+        assert recorder.num_ticks == 10
+
+    def test__rotation(self, tmp_path):
+        path = str(tmp_path / 'ticks')
+        recorder = TickRecorder(path, batch_size=2, max_file_size=1)
+
+        for tick in get_ticks(6):
+            recorder.put(tick)
+        recorder.close()
+
+        assert len(get_recorded_files(path)) == 3
+        assert list(read_ticks(path)) == get_ticks(6)
+
+    def test__put__value_types(self, tmp_path):
+        path = str(tmp_path / 'ticks')
+        values = {'FLOAT':    1.5,
+                  'INT':      2 ** 40,
+                  'BOOL':     True,
+                  'STRING':   'abc',
+                  'NONE':     None,
+                  'DATETIME': dt.datetime(2020, 1, 2, 3, 4, 5, 6,
+                                          tzinfo=dt.timezone.utc),
+                  'DATE':     dt.date(2020, 1, 2),
+                  'TIME':     dt.time(3, 4, 5),
+                  'BULK':     [{'value': 1.5}, {'value': 'abc'}]}
+        recorder = TickRecorder(path)
+
+        recorder.put(Tick('security_1', values, 1.25))
+        recorder.put(Tick('security_2', {}, 2))
+        recorder.close()
+
+        tick_1, tick_2 = read_ticks(path)
+
+        assert tick_1 == Tick('security_1', values, 1.25)
+        assert type(tick_1.values['INT']) is int
+        assert type(tick_1.values['BOOL']) is bool
+        assert tick_2 == Tick('security_2', {}, 2)
+
+    def test__read_ticks__wrong_file(self, tmp_path):
+        path = str(tmp_path / 'ticks')
+        (tmp_path / 'ticks.000000').write_bytes(b'not a recording')
+
+        with pytest.raises(ValueError):
+            list(read_ticks(path))
+
+    def test__append(self, tmp_path):
+        path = str(tmp_path / 'ticks')
+
+        for tick in get_ticks(2):
+            recorder = TickRecorder(path)
+            recorder.put(tick)
+            recorder.close()
+
+        assert len(get_recorded_files(path)) == 2
+        assert list(read_ticks(path)) == get_ticks(2)
+
+
+@pytest.mark.asyncio
+class TestTickReplay:
+
+    async def test__run(self, tmp_path, session_options):
+        path = str(tmp_path / 'ticks')
+        recorder = TickRecorder(path)
+        for tick in get_ticks(10):
+            recorder.put(tick)
+        recorder.close()
+
+        stream = TickStream()
+        handler = SubscriptionHandler(session_options)
+        replay = TickReplay(path, [handler, stream], speed=None)
+
+        await replay.run()
+
+        assert replay.num_ticks == 10
+        assert len(stream) == 10
+        assert handler.last_values.get('security_0', 'BID') == 9
+
+    async def test__run__speed(self, tmp_path):
+        path = str(tmp_path / 'ticks')
+        recorder = TickRecorder(path)
+        for tick in get_ticks(3):
+            recorder.put(tick)
+        recorder.close()
+
+        replay = TickReplay(path, [TickStream()], speed=20)
+
+        start_time = time.monotonic()
+        await replay.run()
+
+        assert 0.1 - 0.01 <= time.monotonic() - start_time < 1
+
+    def test__init__wrong_speed(self):
+        with pytest.raises(ValueError):
+            TickReplay('ticks', [], speed=0)
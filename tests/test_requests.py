@@ -1,14 +1,22 @@
 import asyncio
 import datetime as dt
 
+import numpy as np
 import pandas as pd
 import pytest
 
+from async_blp.base_request import add_lifecycle_callback
+from async_blp.base_request import remove_lifecycle_callback
+from async_blp.enums import RequestStage
+from async_blp.enums import SecurityIdType
 from async_blp.requests import FieldSearchRequest
 from async_blp.requests import HistoricalDataRequest
+from async_blp.requests import IntradayBarRequest
+from async_blp.requests import IntradayTickRequest
 from async_blp.requests import ReferenceDataRequest
 from async_blp.requests import Subscription
 from async_blp.utils.env_test import CorrelationId
+from async_blp.utils.env_test import Element
 from async_blp.utils.env_test import Message
 from async_blp.utils.env_test import Service
 from async_blp.utils.env_test import SubscriptionList
@@ -135,6 +143,56 @@ class TestReferenceDataRequest:
         pd.testing.assert_frame_equal(actual_df, expected_df)
 
 
+class TestRequestLifecycle:
+
+    def test__mark(self):
+        request = ReferenceDataRequest(['security_id'], ['BID'])
+        created_time = request.timestamps[RequestStage.CREATED]
+
+        request.mark(RequestStage.SENT)
+        first_response_time = request.timestamps[RequestStage.SENT]
+        request.mark(RequestStage.SENT)
+
+        assert request.timestamps[RequestStage.SENT] == first_response_time
+        assert request.get_stage_durations() == {
+            RequestStage.SENT: first_response_time - created_time,
+            }
+
+    def test__lifecycle_callback(self):
+        stages = []
+
+        def callback(request, stage, timestamp):
+            stages.append((request, stage, timestamp))
+
+        def failing_callback(*_):
+            raise ValueError
+
+        add_lifecycle_callback(failing_callback)
+        add_lifecycle_callback(callback)
+        try:
+            request = ReferenceDataRequest(['security_id'], ['BID'])
+            request.mark(RequestStage.DISPATCHED)
+        finally:
+            remove_lifecycle_callback(failing_callback)
+            remove_lifecycle_callback(callback)
+
+        request.mark(RequestStage.SENT)
+
+        assert stages == [
+            (request, stage, request.timestamps[stage])
+            for stage in (RequestStage.CREATED, RequestStage.DISPATCHED)
+            ]
+
+    @pytest.mark.asyncio
+    async def test__process__processed(self):
+        request = ReferenceDataRequest(['security_id'], ['BID'])
+        request.send_queue_message(None)
+
+        await request.process()
+
+        assert RequestStage.PROCESSED in request.timestamps
+
+
 class TestHistoricalDataRequest:
 
     def test__weight(self):
@@ -149,6 +207,114 @@ class TestHistoricalDataRequest:
         assert request.weight == 3 * 3 * 9
 
 
+class TestIntradayBarRequest:
+
+    def test__weight(self):
+        request = IntradayBarRequest('security_id',
+                                     dt.datetime(2020, 1, 2, 14),
+                                     dt.datetime(2020, 1, 2, 16),
+                                     interval=5)
+
+        assert request.weight == 24
+
+    def test__create__security_id_type(self):
+        request = IntradayBarRequest('security_id',
+                                     dt.datetime(2020, 1, 2, 14),
+                                     dt.datetime(2020, 1, 2, 16),
+                                     security_id_type=SecurityIdType.ISIN)
+
+        blp_request = request.create(Service())
+
+        assert blp_request.elements['security'] == '/isin/security_id'
+        assert request.security == 'security_id'
+
+    @pytest.mark.asyncio
+    async def test__process(self, bar_data_msg, bar_data_values):
+        request = IntradayBarRequest('security_id',
+                                     dt.datetime(2020, 1, 2, 14),
+                                     dt.datetime(2020, 1, 2, 16))
+
+        request.send_queue_message(bar_data_msg)
+        request.send_queue_message(bar_data_msg)
+        request.send_queue_message(None)
+
+        data, _ = await request.process()
+
+        assert list(data.columns) == ['open', 'high', 'low', 'close',
+                                      'volume', 'numEvents']
+        assert len(data) == 4
+        assert data.index[1] == bar_data_values[1]['time']
+        assert data['numEvents'].dtype == np.int64
+
+    @pytest.mark.asyncio
+    async def test__process__response_error(self):
+        request = IntradayBarRequest('security_id',
+                                     dt.datetime(2020, 1, 2, 14),
+                                     dt.datetime(2020, 1, 2, 16))
+
+        request.send_queue_message(Message('IntradayBarResponse', None, {
+            'responseError': Element('responseError', None, {
+                'category': Element('category', 'BAD_SEC'),
+                }),
+            }))
+        request.send_queue_message(None)
+
+        data, errors = await request.process()
+
+        assert data.empty
+        assert errors.invalid_securities == ['security_id']
+
+    @pytest.mark.asyncio
+    async def test__process__empty(self):
+        request = IntradayBarRequest('security_id',
+                                     dt.datetime(2020, 1, 2, 14),
+                                     dt.datetime(2020, 1, 2, 16))
+        request.send_queue_message(None)
+
+        data, _ = await request.process()
+
+        assert data.empty
+        assert data['close'].dtype == np.float64
+
+
+class TestIntradayTickRequest:
+
+    def test__weight(self):
+        request = IntradayTickRequest('security_id',
+                                      dt.datetime(2020, 1, 2, 14),
+                                      dt.datetime(2020, 1, 2, 15),
+                                      event_types=['BID', 'ASK'])
+
+        assert request.weight == 120
+
+    def test__create(self):
+        request = IntradayTickRequest('security_id',
+                                      dt.datetime(2020, 1, 2, 14),
+                                      dt.datetime(2020, 1, 2, 15),
+                                      event_types=['BID', 'ASK'])
+
+        blp_request = request.create(Service())
+
+        assert blp_request.elements['eventTypes'] == ['BID', 'ASK']
+
+    @pytest.mark.asyncio
+    async def test__process(self, tick_data_msg):
+        request = IntradayTickRequest('security_id',
+                                      dt.datetime(2020, 1, 2, 14),
+                                      dt.datetime(2020, 1, 2, 15))
+
+        request.send_queue_message(tick_data_msg)
+        request.send_queue_message(tick_data_msg)
+        request.send_queue_message(None)
+
+        data, _ = await request.process()
+
+        assert list(data.columns) == ['type', 'value', 'size']
+        assert data.index.name == 'time'
+        assert list(data['type']) == ['TRADE', 'BID'] * 2
+        assert data['size'].dtype == np.int64
+
+
 @pytest.mark.asyncio
 class TestFieldsSearchRequest:
 
@@ -185,14 +351,27 @@ class TestSubscription:
         assert isinstance(sub.create_subscription(corr_id=CorrelationId(None)),
                           SubscriptionList)
 
-    async def test__process(self, market_data_event):
-        security_id = 'F Equity'
-        field_name = 'MKTDATA'
-        sub = Subscription(security_id,
-                           [field_name])
-        msg: Message = list(market_data_event)[0]
-        cor_id = list(msg.correlationIds())[0]
-        sub.send_queue_message(msg)
-        await asyncio.sleep(0.0001)
-        data = await sub.process()
-        assert not data.empty
+    def test__create_subscription__corr_id_dict(self):
+        sub = Subscription(['security_1', 'security_2'], ['field_1'])
+        corr_id = CorrelationId(None)
+
+        subscription_list = sub.create_subscription({'security_2': corr_id})
+
+        assert subscription_list.size() == 1
+        assert subscription_list.topics[0][0] == 'security_2'
+
+    def test__init__options(self):
+        sub = Subscription(['security_1'], ['field_1'],
+                           interval=1.5,
+                           options={'delayed': 'true'})
+
+        assert sub.options == ['delayed=true', 'interval=1.5']
+
+    async def test__process(self):
+        """
+        Subscription data is parsed by SubscriptionHandler
+        """
+        sub = Subscription('F Equity', ['MKTDATA'])
+
+        with pytest.raises(RuntimeError):
+            await sub.process()